@@ -38,6 +38,17 @@ Write or update:
   - file type
 - Per-dataset notes in `/datasets/<slug>.md`.
 
+For every tabular upload (CSV, TSV, Excel, JSON), call `ingest_dataset` once before
+describing it. It writes a Parquet copy and `/datasets/<slug>.schema.json`; list the
+Parquet path in `/datasets/index.md` and take column names and types from the schema
+instead of loading the file in a sandbox.
+Then call `profile_dataset` to add column statistics (null rates, ranges, distinct
+counts, quantiles) to `/datasets/<slug>.md`; it streams the file, so use it even for
+very large files.
+For PDFs, call `ingest_pdf`; it writes page-by-page text, tables and metadata to
+`/datasets/<slug>.pdf.json` and the full text to `/datasets/<slug>.txt`. Read those
+files to write the summary instead of parsing the PDF in a sandbox.
+
 {tools_hint}
 
 Use available filesystem tools to manage metadata.
@@ -24,7 +24,8 @@ def build_literature_system_prompt(
 Your job:
 - Search and synthesize scientific literature relevant to the current research objective.
 - Use available tools for literature lookup, evidence gathering, and citation expansion.
-- Write results into `/literature/<topic>.md` as structured notes.
+- Write results into `/literature/<topic>.md` as structured notes. Add new sections
+  to an existing note with `append_file` instead of rewriting the whole file.
 
 {tools_hint}
 
@@ -37,6 +37,7 @@ You:
    - Which sub-agent(s) should handle each task
 3. Save the plan to `/plans/current_plan.md`.
 4. Update or create `/plans/objective.md` with the current research objective.
+   When revising an existing plan, change several sections at once with `multi_edit`.
 {tools_hint}
 
 Use available tools to mirror the plan into a to-do list that other agents can update.
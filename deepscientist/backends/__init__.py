@@ -0,0 +1,13 @@
+"""Storage backends for DeepScientist agents."""
+
+from .locking import LockingFilesystemBackend, PathLocks, path_locks, replace_file
+from .scratchpad import ScratchpadBackend, scratchpad_backend
+
+__all__ = [
+    "LockingFilesystemBackend",
+    "PathLocks",
+    "ScratchpadBackend",
+    "path_locks",
+    "replace_file",
+    "scratchpad_backend",
+]
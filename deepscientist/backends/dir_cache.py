@@ -0,0 +1,286 @@
+"""In-memory directory tree cache for ``ls`` and ``glob``.
+
+Each directory is listed (and its children stat'ed) once and then served from
+memory. On Linux, cached directories are watched with inotify and an entry is
+dropped as soon as the kernel reports a change in it; pending events are
+drained before every lookup, so no background thread is needed. Elsewhere, or
+when inotify is unavailable (e.g. the watch limit is reached), entries are
+revalidated by the directory's mtime and expire after ``POLL_TTL_S`` so file
+sizes and mtimes stay reasonably fresh.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import struct
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import wcmatch.glob as wcglob
+
+from deepscientist.backends.grep_search import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+# Polling mode: how long a directory listing may be served without re-stat'ing.
+POLL_TTL_S = 2.0
+
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_ISDIR = 0x40000000
+_WATCH_MASK = (
+    _IN_MODIFY | _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO
+    | _IN_CREATE | _IN_DELETE | _IN_DELETE_SELF | _IN_MOVE_SELF | _IN_ONLYDIR
+)
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+@dataclass(frozen=True)
+class EntryInfo:
+    name: str
+    is_dir: bool
+    size: int
+    mtime: float
+
+
+@dataclass
+class _Listing:
+    entries: List[EntryInfo]
+    mtime_ns: int
+    listed_at: float
+
+
+class _Inotify:
+    """Minimal non-blocking inotify wrapper over libc (Linux only)."""
+
+    def __init__(self) -> None:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._rm_watch = libc.inotify_rm_watch
+        self._rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.fd = fd
+
+    def add_watch(self, path: Path) -> int:
+        wd = self._add_watch(self.fd, os.fsencode(path), _WATCH_MASK)
+        if wd < 0:
+            code = ctypes.get_errno()
+            raise OSError(code, os.strerror(code))
+        return wd
+
+    def remove_watch(self, wd: int) -> None:
+        self._rm_watch(self.fd, wd)
+
+    def read_events(self) -> Iterator[Tuple[int, int, str]]:
+        """Yield ``(wd, mask, name)`` for all pending events without blocking."""
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return
+            except OSError as exc:
+                if exc.errno == errno.EINTR:
+                    continue
+                raise
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+                offset += length
+                yield wd, mask, name
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class DirectoryTree:
+    """Cached listings of the directories below ``root``."""
+
+    def __init__(self, root: Path, use_inotify: bool = True) -> None:
+        self.root = root
+        self._lock = threading.Lock()
+        self._listings: Dict[str, _Listing] = {}
+        self._watches: Dict[int, str] = {}
+        self._watched: Dict[str, int] = {}
+        self._inotify: Optional[_Inotify] = None
+        if use_inotify and sys.platform.startswith("linux"):
+            try:
+                self._inotify = _Inotify()
+            except (OSError, AttributeError):
+                logger.info("inotify unavailable; directory cache falls back to mtime polling")
+
+    @property
+    def watching(self) -> bool:
+        return self._inotify is not None
+
+    def close(self) -> None:
+        with self._lock:
+            if self._inotify is not None:
+                self._inotify.close()
+                self._inotify = None
+            self._listings.clear()
+            self._watches.clear()
+            self._watched.clear()
+
+    # ----------------------------------------------------------------------------------
+    # Lookups
+    # ----------------------------------------------------------------------------------
+
+    def list(self, rel_dir: str) -> Optional[List[EntryInfo]]:
+        """Entries of a directory (``""`` is the root), or None if it is not one."""
+        rel_dir = rel_dir.strip("/")
+        with self._lock:
+            self._drain_events()
+            listing = self._listings.get(rel_dir)
+            if listing is not None and self._is_fresh(rel_dir, listing):
+                return listing.entries
+            # Watch before scanning so a change made during the scan is not lost;
+            # the drain then drops the new listing if one happened.
+            self._watch(rel_dir)
+            listing = self._scan(rel_dir)
+            if listing is None:
+                self._forget(rel_dir)
+                return None
+            self._listings[rel_dir] = listing
+            self._drain_events()
+            return listing.entries
+
+    def walk_files(self, rel_dir: str = "") -> Iterator[Tuple[str, EntryInfo]]:
+        """Yield ``(relative path, info)`` for every file at or below ``rel_dir``."""
+        stack = [rel_dir.strip("/")]
+        while stack:
+            current = stack.pop()
+            for entry in self.list(current) or []:
+                rel_path = f"{current}/{entry.name}" if current else entry.name
+                if entry.is_dir:
+                    stack.append(rel_path)
+                else:
+                    yield rel_path, entry
+
+    def glob(self, pattern: str, rel_dir: str = "") -> List[Tuple[str, EntryInfo]]:
+        """Files below ``rel_dir`` matching ``pattern`` at any depth, like ``Path.rglob``."""
+        base = rel_dir.strip("/")
+        pattern = "**/" + pattern.lstrip("/")
+        flags = wcglob.GLOBSTAR | wcglob.DOTGLOB | wcglob.BRACE
+        matches = []
+        for rel_path, entry in self.walk_files(base):
+            relative = rel_path[len(base) + 1 :] if base else rel_path
+            if wcglob.globmatch(relative, pattern, flags=flags):
+                matches.append((rel_path, entry))
+        return sorted(matches)
+
+    def invalidate(self, rel_path: str) -> None:
+        """Drop cached listings for ``rel_path``'s parent and anything below ``rel_path``."""
+        rel_path = rel_path.strip("/")
+        with self._lock:
+            parent = rel_path.rsplit("/", 1)[0] if "/" in rel_path else ""
+            self._listings.pop(parent, None)
+            self._forget(rel_path)
+
+    # ----------------------------------------------------------------------------------
+    # Internals (caller holds the lock)
+    # ----------------------------------------------------------------------------------
+
+    def _is_fresh(self, rel_dir: str, listing: _Listing) -> bool:
+        if self._inotify is not None:
+            return True  # Events would have dropped it.
+        if time.monotonic() - listing.listed_at > POLL_TTL_S:
+            return False
+        try:
+            return os.stat(self.root / rel_dir).st_mtime_ns == listing.mtime_ns
+        except OSError:
+            return False
+
+    def _scan(self, rel_dir: str) -> Optional[_Listing]:
+        directory = self.root / rel_dir
+        try:
+            mtime_ns = os.stat(directory).st_mtime_ns
+            scanned = list(os.scandir(directory))
+        except OSError:
+            return None
+        entries = []
+        for entry in scanned:
+            if not rel_dir and entry.name == CACHE_DIR:
+                continue  # Internal caches are not part of the workspace view.
+            try:
+                # Symlinks are skipped: they could point outside the workspace or loop.
+                is_dir = entry.is_dir(follow_symlinks=False)
+                if not is_dir and not entry.is_file(follow_symlinks=False):
+                    continue
+                stat = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            entries.append(EntryInfo(entry.name, is_dir, 0 if is_dir else stat.st_size, stat.st_mtime))
+        entries.sort(key=lambda info: info.name)
+        return _Listing(entries=entries, mtime_ns=mtime_ns, listed_at=time.monotonic())
+
+    def _watch(self, rel_dir: str) -> None:
+        if self._inotify is None or rel_dir in self._watched:
+            return
+        try:
+            wd = self._inotify.add_watch(self.root / rel_dir)
+        except OSError as exc:
+            if exc.errno in (errno.ENOENT, errno.ENOTDIR):
+                return  # Not a directory; the scan reports that.
+            # Typically ENOSPC (watch limit); polling still keeps results correct.
+            logger.info("Cannot watch %s (%s); directory cache falls back to mtime polling", rel_dir or "/", exc)
+            self._inotify.close()
+            self._inotify = None
+            self._watches.clear()
+            self._watched.clear()
+            return
+        self._watches[wd] = rel_dir
+        self._watched[rel_dir] = wd
+
+    def _drain_events(self) -> None:
+        if self._inotify is None:
+            return
+        for wd, mask, name in self._inotify.read_events():
+            if mask & _IN_Q_OVERFLOW:
+                self._listings.clear()
+                continue
+            rel_dir = self._watches.get(wd)
+            if rel_dir is None:
+                continue
+            if mask & (_IN_IGNORED | _IN_DELETE_SELF | _IN_MOVE_SELF):
+                self._forget(rel_dir)
+                continue
+            self._listings.pop(rel_dir, None)
+            if mask & _IN_ISDIR and mask & (_IN_DELETE | _IN_MOVED_FROM):
+                self._forget(f"{rel_dir}/{name}" if rel_dir else name)
+
+    def _forget(self, rel_dir: str) -> None:
+        """Drop listings and watches for ``rel_dir`` and its subdirectories."""
+        prefix = rel_dir + "/"
+        for key in [key for key in self._listings if key == rel_dir or key.startswith(prefix) or not rel_dir]:
+            del self._listings[key]
+        for key in [key for key in self._watched if key == rel_dir or key.startswith(prefix) or not rel_dir]:
+            wd = self._watched.pop(key)
+            self._watches.pop(wd, None)
+            if self._inotify is not None:
+                self._inotify.remove_watch(wd)
+
+
+__all__ = ["POLL_TTL_S", "DirectoryTree", "EntryInfo"]
@@ -0,0 +1,154 @@
+"""Persistent trigram index for workspace grep.
+
+Every indexed text file is recorded with the set of byte trigrams it contains
+(case-folded), stored in SQLite under the workspace's ``.cache`` directory. A
+literal search only needs to open files containing all trigrams of the
+pattern. ``refresh`` brings the index up to date by comparing file sizes and
+mtimes, so only new or changed files are re-read.
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+from deepscientist.backends.grep_search import BINARY_SNIFF_BYTES, CACHE_DIR, walk_files
+
+_INDEX_FILE = "grep_index.sqlite"
+_REGEX_METACHARACTERS = frozenset(".^$*+?{}[]\\|()")
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    kind TEXT NOT NULL  -- 'text', 'binary' or 'large' (not indexed, always scanned)
+);
+CREATE TABLE IF NOT EXISTS postings (
+    trigram INTEGER NOT NULL,
+    file_id INTEGER NOT NULL,
+    PRIMARY KEY (trigram, file_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_file ON postings (file_id);
+"""
+
+
+def trigrams(data: bytes) -> Set[int]:
+    """Case-folded byte trigrams of ``data`` as 24-bit integers."""
+    data = data.lower()
+    return {int.from_bytes(data[i : i + 3], "big") for i in range(len(data) - 2)}
+
+
+def is_literal(pattern: str) -> bool:
+    """True if ``pattern`` has no regex metacharacters."""
+    return not any(char in _REGEX_METACHARACTERS for char in pattern)
+
+
+class TrigramIndex:
+    """Trigram index over the text files below ``root``."""
+
+    def __init__(self, root: Path, max_file_size_bytes: int) -> None:
+        self.root = root
+        self.max_file_size_bytes = max_file_size_bytes
+        db_path = root / CACHE_DIR / _INDEX_FILE
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    # ----------------------------------------------------------------------------------
+    # Maintenance
+    # ----------------------------------------------------------------------------------
+
+    def refresh(self) -> int:
+        """Re-index files whose size or mtime changed; return how many were read."""
+        with self._lock:
+            known: Dict[str, Tuple[int, int, int]] = {
+                path: (file_id, size, mtime_ns)
+                for file_id, path, size, mtime_ns in self._db.execute(
+                    "SELECT id, path, size, mtime_ns FROM files"
+                )
+            }
+            seen: Set[str] = set()
+            updated = 0
+            self._db.execute("BEGIN")
+            try:
+                for rel_path, stat in walk_files(self.root):
+                    seen.add(rel_path)
+                    entry = known.get(rel_path)
+                    if entry is not None and entry[1:] == (stat.st_size, stat.st_mtime_ns):
+                        continue
+                    if entry is not None:
+                        self._forget(entry[0])
+                    self._index_file(rel_path, stat)
+                    updated += 1
+                for rel_path in known.keys() - seen:
+                    self._forget(known[rel_path][0])
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            return updated
+
+    def _index_file(self, rel_path: str, stat: os.stat_result) -> None:
+        kind, grams = "large", None
+        if stat.st_size <= self.max_file_size_bytes:
+            try:
+                data = (self.root / rel_path).read_bytes()
+            except OSError:
+                return
+            if b"\0" in data[:BINARY_SNIFF_BYTES]:
+                kind = "binary"
+            else:
+                kind, grams = "text", trigrams(data)
+        cursor = self._db.execute(
+            "INSERT INTO files (path, size, mtime_ns, kind) VALUES (?, ?, ?, ?)",
+            (rel_path, stat.st_size, stat.st_mtime_ns, kind),
+        )
+        if grams:
+            file_id = cursor.lastrowid
+            self._db.executemany(
+                "INSERT INTO postings (trigram, file_id) VALUES (?, ?)",
+                ((gram, file_id) for gram in grams),
+            )
+
+    def _forget(self, file_id: int) -> None:
+        self._db.execute("DELETE FROM postings WHERE file_id = ?", (file_id,))
+        self._db.execute("DELETE FROM files WHERE id = ?", (file_id,))
+
+    # ----------------------------------------------------------------------------------
+    # Queries
+    # ----------------------------------------------------------------------------------
+
+    def candidates(self, literal: str) -> List[str]:
+        """Workspace-relative paths that may contain ``literal``."""
+        grams = sorted(trigrams(literal.encode("utf-8")))
+        with self._lock:
+            if not grams:
+                rows = self._db.execute("SELECT path FROM files WHERE kind != 'binary'")
+                return [path for (path,) in rows]
+            placeholders = ",".join("?" * len(grams))
+            rows = self._db.execute(
+                f"""
+                SELECT path FROM files WHERE id IN (
+                    SELECT file_id FROM postings WHERE trigram IN ({placeholders})
+                    GROUP BY file_id HAVING COUNT(*) = ?
+                )
+                UNION ALL
+                SELECT path FROM files WHERE kind = 'large'
+                """,
+                (*grams, len(grams)),
+            )
+            return [path for (path,) in rows]
+
+
+__all__ = ["TrigramIndex", "is_literal", "trigrams"]
@@ -0,0 +1,205 @@
+"""Regex search over workspace files.
+
+Files are searched as bytes: small files are read whole, larger ones are
+memory-mapped so the regex engine scans the page cache directly instead of a
+decoded Python string. Matches are reported per line, like ``grep``. When the
+files to search add up to more than ``_PARALLEL_MIN_BYTES`` they are split into
+batches of roughly equal size and searched in a process pool. Pools start their
+workers with ``forkserver`` (or ``spawn``), never ``fork``: the callers are
+multi-threaded and a forked child could inherit a held lock.
+"""
+
+from __future__ import annotations
+
+import mmap
+import multiprocessing
+import os
+import re
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import wcmatch.glob as wcglob
+
+from deepagents.backends.protocol import GrepMatch
+
+# Workspace-relative directory for internal caches; never indexed or searched.
+CACHE_DIR = ".cache"
+# Files are treated as binary (and skipped) if this prefix contains a NUL byte.
+BINARY_SNIFF_BYTES = 8192
+# Files at least this large are memory-mapped rather than read.
+_MMAP_MIN_BYTES = 1 << 20
+# Below this total size a worker pool costs more than it saves.
+_PARALLEL_MIN_BYTES = 16 << 20
+# Target number of bytes searched by one worker task.
+_BATCH_BYTES = 8 << 20
+
+
+def compile_pattern(pattern: str) -> "re.Pattern[bytes]":
+    """Compile a grep pattern for matching against raw file bytes.
+
+    Raises ``re.error`` for invalid patterns. Character classes such as ``\\w``
+    match ASCII only, as the file contents are not decoded.
+    """
+    return re.compile(pattern.encode("utf-8"), re.MULTILINE)
+
+
+def worker_pool(max_workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """A process pool whose workers do not fork the (multi-threaded) caller."""
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context(method))
+
+
+def walk_files(root: Path) -> Iterator[Tuple[str, os.stat_result]]:
+    """Yield ``(relative posix path, stat)`` for regular files below ``root``.
+
+    Symlinks are not followed and the workspace cache directory is skipped.
+    """
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            continue
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if not (directory == root and entry.name == CACHE_DIR):
+                        stack.append(Path(entry.path))
+                elif entry.is_file(follow_symlinks=False):
+                    rel_path = Path(entry.path).relative_to(root).as_posix()
+                    yield rel_path, entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+
+
+def select_paths(rel_paths: Iterable[str], scope: str, include_glob: Optional[str]) -> List[str]:
+    """Keep paths at or below ``scope`` whose file name matches ``include_glob``."""
+    selected = []
+    for rel_path in rel_paths:
+        if scope not in ("", ".") and rel_path != scope and not rel_path.startswith(scope + "/"):
+            continue
+        if include_glob and not wcglob.globmatch(rel_path.rsplit("/", 1)[-1], include_glob, flags=wcglob.BRACE):
+            continue
+        selected.append(rel_path)
+    return sorted(selected)
+
+
+def search_files(
+    root: Path,
+    rel_paths: List[str],
+    pattern: str,
+    *,
+    first_match_only: bool = False,
+    max_workers: Optional[int] = None,
+    pool: Optional[Executor] = None,
+) -> List[GrepMatch]:
+    """Search ``rel_paths`` below ``root`` for lines matching ``pattern``.
+
+    With ``first_match_only`` each file stops at its first matching line, which
+    is all ``files_with_matches`` output needs. Large searches run in ``pool``,
+    or in a pool of their own if none is given.
+    """
+    sizes = []
+    for rel_path in rel_paths:
+        try:
+            sizes.append((rel_path, (root / rel_path).stat().st_size))
+        except OSError:
+            continue
+    total = sum(size for _, size in sizes)
+    workers = max_workers or os.cpu_count() or 1
+    batches = _batches(sizes)
+    if workers <= 1 or len(batches) <= 1 or total < _PARALLEL_MIN_BYTES:
+        return _search_batch(str(root), [rel_path for rel_path, _ in sizes], pattern, first_match_only)
+
+    if pool is None:
+        with worker_pool(min(workers, len(batches))) as own_pool:
+            return _search_batches(own_pool, root, batches, pattern, first_match_only)
+    return _search_batches(pool, root, batches, pattern, first_match_only)
+
+
+def _search_batches(
+    pool: Executor, root: Path, batches: List[List[str]], pattern: str, first_match_only: bool
+) -> List[GrepMatch]:
+    futures = [pool.submit(_search_batch, str(root), batch, pattern, first_match_only) for batch in batches]
+    matches: List[GrepMatch] = []
+    for future in futures:
+        matches.extend(future.result())
+    return matches
+
+
+def _batches(sizes: List[Tuple[str, int]]) -> List[List[str]]:
+    batches: List[List[str]] = [[]]
+    batch_bytes = 0
+    for rel_path, size in sizes:
+        if batches[-1] and batch_bytes + size > _BATCH_BYTES:
+            batches.append([])
+            batch_bytes = 0
+        batches[-1].append(rel_path)
+        batch_bytes += size
+    return [batch for batch in batches if batch]
+
+
+def _search_batch(root: str, rel_paths: List[str], pattern: str, first_match_only: bool) -> List[GrepMatch]:
+    """Search a batch of files (runs in a worker process for large searches)."""
+    regex = compile_pattern(pattern)
+    matches: List[GrepMatch] = []
+    for rel_path in rel_paths:
+        for line_number, text in _search_file(os.path.join(root, rel_path), regex, first_match_only):
+            matches.append({"path": "/" + rel_path, "line": line_number, "text": text})
+    return matches
+
+
+def _search_file(path: str, regex: "re.Pattern[bytes]", first_match_only: bool) -> List[Tuple[int, str]]:
+    try:
+        with open(path, "rb") as handle:
+            size = os.fstat(handle.fileno()).st_size
+            if size == 0:
+                return []
+            if size < _MMAP_MIN_BYTES:
+                return _search_buffer(handle.read(), regex, first_match_only)
+            with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                return _search_buffer(buffer, regex, first_match_only)
+    except (OSError, ValueError):
+        return []
+
+
+def _search_buffer(buffer, regex: "re.Pattern[bytes]", first_match_only: bool) -> List[Tuple[int, str]]:
+    if b"\0" in buffer[:BINARY_SNIFF_BYTES]:
+        return []
+    results: List[Tuple[int, str]] = []
+    size = len(buffer)
+    line_number, counted_to = 1, 0
+    pos = 0
+    while pos < size:
+        found = regex.search(buffer, pos)
+        if found is None:
+            break
+        start = buffer.rfind(b"\n", 0, found.start()) + 1
+        end = buffer.find(b"\n", found.start())
+        if end == -1:
+            end = size
+        line = buffer[start:end]
+        # A match may span lines (e.g. ``\s``); report it only if the line itself matches.
+        if regex.search(line) is not None:
+            line_number += buffer[counted_to:start].count(b"\n")
+            counted_to = start
+            results.append((line_number, bytes(line).rstrip(b"\r").decode("utf-8", errors="replace")))
+            if first_match_only:
+                break
+            pos = end + 1
+        else:
+            pos = found.start() + 1
+    return results
+
+
+__all__ = [
+    "BINARY_SNIFF_BYTES",
+    "CACHE_DIR",
+    "compile_pattern",
+    "search_files",
+    "select_paths",
+    "walk_files",
+    "worker_pool",
+]
@@ -0,0 +1,176 @@
+"""Sparse line-offset index for paging through large workspace files.
+
+For every ``STRIDE``-th line the byte offset where it starts is recorded, so a
+page starting at any line is reached by one seek and at most ``STRIDE - 1``
+skipped lines instead of reading the file from the beginning. Indexes are kept
+in memory and persisted under the workspace's ``.cache`` directory, and are
+rebuilt whenever the file's size or mtime changes.
+
+Lines are separated by ``\\n`` (a trailing ``\\r`` is dropped), which matches
+``str.splitlines`` for ordinary text.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from stat import S_ISREG
+from typing import List, Optional
+from uuid import uuid4
+
+from deepagents.backends.utils import format_content_with_line_numbers
+
+from deepscientist.backends.grep_search import CACHE_DIR
+
+# Lines between two recorded offsets.
+STRIDE = 1024
+# Smaller files are cheap to read whole and are left to the backend.
+INDEX_MIN_BYTES = 1 << 20
+# Indexes kept in memory per workspace.
+_MEMORY_ENTRIES = 64
+_READ_CHUNK_BYTES = 1 << 20
+
+
+@dataclass
+class LineIndex:
+    """Byte offsets of every ``stride``-th line of a file of known size/mtime."""
+
+    size: int
+    mtime_ns: int
+    stride: int
+    lines: int
+    offsets: List[int]
+
+    def matches(self, stat: os.stat_result) -> bool:
+        return (self.size, self.mtime_ns, self.stride) == (stat.st_size, stat.st_mtime_ns, STRIDE)
+
+
+def build_line_index(handle, stat: os.stat_result) -> LineIndex:
+    """Scan a binary file handle once and record every ``STRIDE``-th line start."""
+    handle.seek(0)
+    offsets = [0]
+    lines = 0
+    position = 0
+    last_byte = b""
+    while True:
+        chunk = handle.read(_READ_CHUNK_BYTES)
+        if not chunk:
+            break
+        start = 0
+        while True:
+            newline = chunk.find(b"\n", start)
+            if newline == -1:
+                break
+            lines += 1
+            if lines % STRIDE == 0:
+                offsets.append(position + newline + 1)
+            start = newline + 1
+        position += len(chunk)
+        last_byte = chunk[-1:]
+    if position and last_byte != b"\n":
+        lines += 1  # Unterminated last line.
+    if offsets[-1] >= position and len(offsets) > 1:
+        offsets.pop()  # Points at EOF, not at a line.
+    return LineIndex(size=stat.st_size, mtime_ns=stat.st_mtime_ns, stride=STRIDE, lines=lines, offsets=offsets)
+
+
+class LineIndexCache:
+    """Line indexes for the files of one workspace, in memory and on disk."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self._real_root = root.resolve()
+        self.cache_dir = root / CACHE_DIR / "line_index"
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, LineIndex]" = OrderedDict()
+
+    def read(self, rel_path: str, offset: int, limit: int) -> Optional[str]:
+        """Return lines ``offset``..``offset + limit - 1`` formatted like ``backend.read``.
+
+        Returns None for files below ``INDEX_MIN_BYTES``, that are not regular
+        files or that resolve outside the root (e.g. through a symlinked
+        directory), which the caller reads through the backend.
+        """
+        try:
+            path = (self.root / rel_path).resolve()
+            rel_path = path.relative_to(self._real_root).as_posix()
+            fd = os.open(path, os.O_RDONLY | getattr(os, "O_NOFOLLOW", 0))
+        except (OSError, ValueError):
+            return None
+        with os.fdopen(fd, "rb") as handle:
+            stat = os.fstat(handle.fileno())
+            if not S_ISREG(stat.st_mode) or stat.st_size < INDEX_MIN_BYTES:
+                return None
+            index = self._get(rel_path, handle, stat)
+            if offset >= index.lines:
+                return f"Error: Line offset {offset} exceeds file length ({index.lines} lines)"
+            try:
+                selected = _read_lines(handle, index, offset, limit)
+            except UnicodeDecodeError as exc:
+                return f"Error reading file '/{rel_path}': {exc}"
+        return format_content_with_line_numbers(selected, start_line=offset + 1)
+
+    def _get(self, rel_path: str, handle, stat: os.stat_result) -> LineIndex:
+        with self._lock:
+            index = self._memory.get(rel_path)
+            if index is not None and index.matches(stat):
+                self._memory.move_to_end(rel_path)
+                return index
+
+        disk_path = self.cache_dir / f"{hashlib.sha1(rel_path.encode('utf-8')).hexdigest()}.json"
+        index = _load(disk_path)
+        if index is None or not index.matches(stat):
+            index = build_line_index(handle, stat)
+            _store(disk_path, index)
+
+        with self._lock:
+            self._memory[rel_path] = index
+            self._memory.move_to_end(rel_path)
+            while len(self._memory) > _MEMORY_ENTRIES:
+                self._memory.popitem(last=False)
+        return index
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+
+
+def _read_lines(handle, index: LineIndex, offset: int, limit: int) -> List[str]:
+    block, skip = divmod(offset, index.stride)
+    handle.seek(index.offsets[block])
+    for _ in range(skip):
+        handle.readline()
+    selected: List[str] = []
+    for _ in range(min(limit, index.lines - offset)):
+        raw = handle.readline()
+        if not raw:
+            break
+        selected.append(raw.rstrip(b"\n").rstrip(b"\r").decode("utf-8"))
+    return selected
+
+
+def _load(path: Path) -> Optional[LineIndex]:
+    try:
+        return LineIndex(**json.loads(path.read_text(encoding="utf-8")))
+    except (OSError, ValueError, TypeError):
+        return None
+
+
+def _store(path: Path, index: LineIndex) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{uuid4().hex}.tmp")
+    try:
+        tmp_path.write_text(json.dumps(asdict(index)), encoding="utf-8")
+        os.replace(tmp_path, path)
+    except OSError:
+        pass  # The index is rebuilt on the next read.
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+__all__ = ["INDEX_MIN_BYTES", "STRIDE", "LineIndex", "LineIndexCache", "build_line_index"]
@@ -0,0 +1,295 @@
+"""Filesystem backend that is safe to share between concurrent agents.
+
+Every read-modify-write of a file holds an exclusive lock for its path: an
+in-process lock for threads, plus an advisory ``fcntl.flock`` for other
+processes working on the same workspace. The flock is taken on a separate
+lock file under ``.cache/locks`` rather than on the file itself, because
+writes replace the file (temp file + rename) and a lock on the old inode would
+not exclude writers that open the new one. Readers are never blocked: they see
+either the old or the new content, never a partial write.
+
+Locks are advisory; only writers that go through ``PathLocks`` are serialized.
+On platforms without ``fcntl`` only the in-process locks apply.
+
+In virtual mode the backend also answers ``ls``, ``glob``, ``grep`` and reads
+of large files from the workspace's shared caches (see ``workspace_cache``),
+so agents going through the backend protocol get the same fast paths as the
+workspace file tools.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from uuid import uuid4
+
+from deepagents.backends.filesystem import FilesystemBackend
+from deepagents.backends.protocol import EditResult, FileInfo, GrepMatch, WriteResult
+from deepagents.backends.utils import perform_string_replacement
+
+from deepscientist.backends.dir_cache import EntryInfo
+from deepscientist.backends.grep_search import compile_pattern
+from deepscientist.backends.workspace_cache import workspace_caches
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Lock files, relative to the workspace root (inside the internal cache directory).
+LOCK_DIR = Path(".cache") / "locks"
+
+
+class PathLocks:
+    """Exclusive per-path locks for one workspace, across threads and processes."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.lock_dir = root / LOCK_DIR
+        self._lock = threading.Lock()
+        # key -> (lock, number of threads holding or waiting for it)
+        self._locks: Dict[str, Tuple[threading.Lock, int]] = {}
+
+    @contextmanager
+    def hold(self, path: str | Path) -> Iterator[None]:
+        """Hold the lock for ``path`` (absolute, or relative to the root)."""
+        key = self._key(path)
+        with self._lock:
+            lock, users = self._locks.get(key) or (threading.Lock(), 0)
+            self._locks[key] = (lock, users + 1)
+        try:
+            with lock, self._file_lock(key):
+                yield
+        finally:
+            with self._lock:
+                lock, users = self._locks[key]
+                if users == 1:
+                    del self._locks[key]
+                else:
+                    self._locks[key] = (lock, users - 1)
+
+    def _key(self, path: str | Path) -> str:
+        candidate = Path(path)
+        if candidate.is_absolute():
+            try:
+                return candidate.relative_to(self.root).as_posix()
+            except ValueError:
+                return candidate.as_posix()
+        return candidate.as_posix().strip("/")
+
+    @contextmanager
+    def _file_lock(self, key: str) -> Iterator[None]:
+        if fcntl is None:
+            yield
+            return
+        self.lock_dir.mkdir(parents=True, exist_ok=True)
+        name = f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}.lock"
+        fd = os.open(self.lock_dir / name, os.O_RDWR | os.O_CREAT | getattr(os, "O_CLOEXEC", 0), 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)  # Releases the flock.
+
+
+_REGISTRY_LOCK = threading.Lock()
+_PATH_LOCKS: Dict[Path, PathLocks] = {}
+
+
+def path_locks(root: str | Path) -> PathLocks:
+    """The ``PathLocks`` shared by everything in this process that writes under ``root``."""
+    root_dir = Path(root).expanduser().resolve()
+    with _REGISTRY_LOCK:
+        locks = _PATH_LOCKS.get(root_dir)
+        if locks is None:
+            locks = PathLocks(root_dir)
+            _PATH_LOCKS[root_dir] = locks
+        return locks
+
+
+def replace_file(path: Path, content: str) -> None:
+    """Replace ``path`` with ``content`` via a temp file and rename, keeping its mode.
+
+    The temp file is fsynced before the rename and the directory after it, so a
+    crash leaves either the old or the new content, never a truncated file.
+    """
+    try:
+        mode = path.stat().st_mode & 0o7777
+    except FileNotFoundError:
+        mode = 0o644
+        path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{uuid4().hex}.tmp")
+    try:
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, mode)
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            handle.write(content)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    _fsync_dir(path.parent)
+
+
+def _fsync_dir(directory: Path) -> None:
+    """Persist a rename in ``directory`` (not supported on Windows)."""
+    try:
+        fd = os.open(directory, os.O_RDONLY | getattr(os, "O_DIRECTORY", 0))
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class LockingFilesystemBackend(FilesystemBackend):
+    """``FilesystemBackend`` whose writes and edits are locked and atomic.
+
+    ``use_inotify`` applies to the workspace's directory tree cache,
+    ``grep_index`` enables the trigram index for literal greps and
+    ``grep_workers`` caps the processes used by large searches.
+    """
+
+    def __init__(
+        self,
+        root_dir: str | Path | None = None,
+        virtual_mode: bool = False,
+        max_file_size_mb: int = 10,
+        *,
+        use_inotify: bool = True,
+        grep_index: bool = True,
+        grep_workers: Optional[int] = None,
+    ) -> None:
+        super().__init__(root_dir=root_dir, virtual_mode=virtual_mode, max_file_size_mb=max_file_size_mb)
+        self.locks = path_locks(self.cwd)
+        self.caches = workspace_caches(self.cwd, use_inotify=use_inotify)
+        self.grep_index = grep_index
+        self.grep_workers = grep_workers
+
+    def _relative(self, file_path: str) -> Optional[str]:
+        """Root-relative posix path (``""`` for the root), or None if ``file_path`` is invalid."""
+        try:
+            rel_path = self._resolve_path(file_path).relative_to(self.cwd).as_posix()
+        except ValueError:
+            return None
+        return "" if rel_path == "." else rel_path
+
+    def _changed(self, resolved_path: Path) -> None:
+        try:
+            self.caches.changed(resolved_path.relative_to(self.cwd).as_posix())
+        except ValueError:
+            pass  # Outside the workspace (non-virtual mode); not cached.
+
+    def ls_info(self, path: str) -> List[FileInfo]:
+        if not self.virtual_mode:
+            return super().ls_info(path)
+        rel_dir = self._relative(path)
+        if rel_dir is None:
+            return []
+        prefix = f"/{rel_dir}/" if rel_dir else "/"
+        infos = [_file_info(prefix + entry.name, entry) for entry in self.caches.tree.list(rel_dir) or []]
+        infos.sort(key=lambda info: info["path"])
+        return infos
+
+    def glob_info(self, pattern: str, path: str = "/") -> List[FileInfo]:
+        if not self.virtual_mode:
+            return super().glob_info(pattern, path)
+        rel_dir = self._relative(path)
+        if rel_dir is None:
+            return []
+        return [_file_info(f"/{rel_path}", entry) for rel_path, entry in self.caches.tree.glob(pattern, rel_dir)]
+
+    def grep_raw(
+        self,
+        pattern: str,
+        path: str | None = None,
+        glob: str | None = None,
+    ) -> List[GrepMatch] | str:
+        if not self.virtual_mode:
+            return super().grep_raw(pattern, path, glob)
+        try:
+            compile_pattern(pattern)
+        except re.error as e:
+            return f"Invalid regex pattern: {e}"
+        rel_dir = self._relative(path or "/")
+        if rel_dir is None or not (self.cwd / rel_dir).exists():
+            return []
+        return self.caches.search(
+            pattern,
+            rel_dir,
+            glob,
+            max_file_size_bytes=self.max_file_size_bytes,
+            use_index=self.grep_index,
+            max_workers=self.grep_workers,
+        )
+
+    def read(self, file_path: str, offset: int = 0, limit: int = 2000) -> str:
+        if self.virtual_mode:
+            rel_path = self._relative(file_path)
+            # Large files are paged through a line-offset index instead of being read whole.
+            paged = self.caches.line_indexes.read(rel_path, offset, limit) if rel_path else None
+            if paged is not None:
+                return paged
+        return super().read(file_path, offset=offset, limit=limit)
+
+    def write(self, file_path: str, content: str) -> WriteResult:
+        resolved_path = self._resolve_path(file_path)
+        try:
+            with self.locks.hold(resolved_path):
+                if resolved_path.exists() or resolved_path.is_symlink():
+                    return WriteResult(
+                        error=f"Cannot write to {file_path} because it already exists. "
+                        "Read and then make an edit, or write to a new path."
+                    )
+                replace_file(resolved_path, content)
+        except (OSError, UnicodeEncodeError) as e:
+            return WriteResult(error=f"Error writing file '{file_path}': {e}")
+        self._changed(resolved_path)
+        return WriteResult(path=file_path, files_update=None)
+
+    def edit(
+        self,
+        file_path: str,
+        old_string: str,
+        new_string: str,
+        replace_all: bool = False,
+    ) -> EditResult:
+        resolved_path = self._resolve_path(file_path)
+        try:
+            with self.locks.hold(resolved_path):
+                if not resolved_path.is_file():
+                    return EditResult(error=f"Error: File '{file_path}' not found")
+                fd = os.open(resolved_path, os.O_RDONLY | getattr(os, "O_NOFOLLOW", 0))
+                with os.fdopen(fd, "r", encoding="utf-8") as f:
+                    content = f.read()
+
+                result = perform_string_replacement(content, old_string, new_string, replace_all)
+                if isinstance(result, str):
+                    return EditResult(error=result)
+                new_content, occurrences = result
+                replace_file(resolved_path, new_content)
+        except (OSError, UnicodeDecodeError, UnicodeEncodeError) as e:
+            return EditResult(error=f"Error editing file '{file_path}': {e}")
+        self._changed(resolved_path)
+        return EditResult(path=file_path, files_update=None, occurrences=int(occurrences))
+
+
+def _file_info(virtual_path: str, entry: EntryInfo) -> FileInfo:
+    return {
+        "path": virtual_path + "/" if entry.is_dir else virtual_path,
+        "is_dir": entry.is_dir,
+        "size": entry.size,
+        "modified_at": datetime.fromtimestamp(entry.mtime).isoformat(),
+    }
+
+
+__all__ = ["LOCK_DIR", "LockingFilesystemBackend", "PathLocks", "path_locks", "replace_file"]
@@ -0,0 +1,395 @@
+"""RAM-backed backend for ephemeral agent notes with write-behind persistence.
+
+Files live in memory as ``FileData`` (the same representation ``StateBackend``
+uses), so reads, edits and searches never touch the disk. Changes are written
+to ``persist_dir`` by a background thread every ``flush_interval_s`` seconds,
+which lets a restarted process recover the scratchpad. When resident content
+exceeds ``max_bytes`` the least recently used files are evicted from memory;
+pending changes are written out first (once the lock is released), and evicted
+files are read back from disk on demand. Without ``persist_dir`` the backend is
+purely in-memory and evicted files are gone.
+
+``persist_dir`` belongs to one backend alone: anything else writing there is
+overwritten by the next flush. Use ``scratchpad_backend`` to share the backend
+of a directory instead of building a second one.
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import os
+import posixpath
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+import wcmatch.glob as wcglob
+
+from deepagents.backends.protocol import (
+    BackendProtocol,
+    EditResult,
+    FileDownloadResponse,
+    FileInfo,
+    FileUploadResponse,
+    GrepMatch,
+    WriteResult,
+)
+from deepagents.backends.utils import (
+    create_file_data,
+    file_data_to_string,
+    format_read_response,
+    grep_matches_from_files,
+    perform_string_replacement,
+    update_file_data,
+)
+
+from deepscientist.backends.locking import replace_file
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _IndexEntry:
+    size: int
+    created_at: str
+    modified_at: str
+
+
+def _normalize(path: str) -> Optional[str]:
+    """Normalize a virtual path; None if it escapes the root."""
+    if ".." in path.split("/"):
+        return None
+    return posixpath.normpath("/" + path.lstrip("/"))
+
+
+class ScratchpadBackend(BackendProtocol):
+    """In-memory file backend with LRU eviction and background flushing."""
+
+    def __init__(
+        self,
+        persist_dir: Optional[str | Path] = None,
+        *,
+        max_bytes: int = 64 << 20,
+        flush_interval_s: float = 1.0,
+    ) -> None:
+        self.persist_dir = Path(persist_dir).expanduser().resolve() if persist_dir is not None else None
+        self.max_bytes = max_bytes
+        self.flush_interval_s = flush_interval_s
+        self._lock = threading.RLock()
+        # Resident files in LRU order (least recently used first).
+        self._files: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._resident_bytes = 0
+        # Every known file, resident or only on disk.
+        self._index: Dict[str, _IndexEntry] = {}
+        self._dirty: Set[str] = set()
+        # Dirty files evicted from memory but not yet written out; still served from here.
+        self._evicting: Dict[str, Dict[str, Any]] = {}
+        # Content version per file and the newest version on disk, so a slow
+        # background flush never overwrites a newer eviction write.
+        self._versions: Dict[str, int] = {}
+        self._persisted: Dict[str, int] = {}
+        self._io_lock = threading.Lock()
+        self._closed = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+
+        if self.persist_dir is not None:
+            self.persist_dir.mkdir(parents=True, exist_ok=True)
+            self._recover()
+            self._flusher = threading.Thread(target=self._flush_loop, name="scratchpad-flush", daemon=True)
+            self._flusher.start()
+            atexit.register(self.close)
+
+    # ----------------------------------------------------------------------------------
+    # Lifecycle
+    # ----------------------------------------------------------------------------------
+
+    @property
+    def closed(self) -> bool:
+        return self._closed.is_set()
+
+    def flush(self) -> None:
+        """Write all pending changes to ``persist_dir`` now."""
+        self._write_pending(evicted_only=False)
+
+    def _write_evicted(self) -> None:
+        """Write out files evicted under the lock; called once it is released."""
+        if self._evicting:
+            self._write_pending(evicted_only=True)
+
+    def _write_pending(self, *, evicted_only: bool) -> None:
+        if self.persist_dir is None:
+            return
+        with self._lock:
+            pending = {}
+            for path in list(self._evicting) if evicted_only else self._dirty:
+                file_data = self._files.get(path) or self._evicting.get(path)
+                if path in self._dirty and file_data is not None:
+                    pending[path] = (self._versions[path], file_data_to_string(file_data))
+        for path, (version, content) in pending.items():
+            try:
+                self._persist(path, version, content)
+            except OSError:
+                logger.warning("Failed to persist scratchpad file %s", path, exc_info=True)
+                continue
+            # Clean only once on disk, and only if nothing changed it meanwhile:
+            # eviction drops clean files from memory and reloads them from disk.
+            with self._lock:
+                if self._versions.get(path) == version:
+                    self._dirty.discard(path)
+                    self._evicting.pop(path, None)
+
+    def close(self) -> None:
+        """Stop the background flusher after a final flush."""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+
+    def _flush_loop(self) -> None:
+        while not self._closed.wait(self.flush_interval_s):
+            self.flush()
+
+    def _recover(self) -> None:
+        assert self.persist_dir is not None
+        for dirpath, _, filenames in os.walk(self.persist_dir):
+            for name in filenames:
+                if name.startswith(".") and name.endswith(".tmp"):
+                    continue  # Interrupted flush.
+                host = Path(dirpath) / name
+                stat = host.stat()
+                modified_at = datetime.fromtimestamp(stat.st_mtime, UTC).isoformat()
+                virtual = "/" + host.relative_to(self.persist_dir).as_posix()
+                self._index[virtual] = _IndexEntry(stat.st_size, modified_at, modified_at)
+
+    def _persist(self, path: str, version: int, content: str) -> None:
+        assert self.persist_dir is not None
+        with self._io_lock:
+            if version <= self._persisted.get(path, 0):
+                return
+            replace_file(self.persist_dir / path.lstrip("/"), content)
+            self._persisted[path] = version
+
+    # ----------------------------------------------------------------------------------
+    # Memory management (caller holds the lock)
+    # ----------------------------------------------------------------------------------
+
+    def _get(self, path: str) -> Optional[Dict[str, Any]]:
+        """FileData for ``path``, loading it from disk if it was evicted."""
+        file_data = self._files.get(path)
+        if file_data is not None:
+            self._files.move_to_end(path)
+            return file_data
+        file_data = self._evicting.pop(path, None)
+        if file_data is not None:
+            # Still dirty: the pending write (or the next flush) stores it.
+            self._store(path, file_data, dirty=False)
+            return file_data
+        entry = self._index.get(path)
+        if entry is None or self.persist_dir is None:
+            return None
+        try:
+            content = (self.persist_dir / path.lstrip("/")).read_text(encoding="utf-8")
+        except (OSError, UnicodeDecodeError):
+            return None
+        file_data = create_file_data(content, created_at=entry.created_at)
+        file_data["modified_at"] = entry.modified_at
+        self._store(path, file_data, dirty=False)
+        return file_data
+
+    def _store(self, path: str, file_data: Dict[str, Any], *, dirty: bool = True) -> None:
+        size = len(file_data_to_string(file_data).encode("utf-8"))
+        previous = self._files.pop(path, None)
+        self._evicting.pop(path, None)
+        if previous is not None:
+            self._resident_bytes -= self._index[path].size
+        self._files[path] = file_data
+        self._resident_bytes += size
+        self._index[path] = _IndexEntry(size, file_data["created_at"], file_data["modified_at"])
+        if dirty:
+            self._versions[path] = self._versions.get(path, 0) + 1
+            self._dirty.add(path)
+        self._evict()
+
+    def _evict(self) -> None:
+        # The most recently used file always stays resident.
+        while self._resident_bytes > self.max_bytes and len(self._files) > 1:
+            path, file_data = self._files.popitem(last=False)
+            self._resident_bytes -= self._index[path].size
+            if self.persist_dir is None:
+                del self._index[path]
+            elif path in self._dirty:
+                # Memory is the only copy of this change: keep it until
+                # _write_evicted has stored it, outside the lock.
+                self._evicting[path] = file_data
+
+    def _all_files(self) -> Dict[str, Dict[str, Any]]:
+        """Every file as FileData; evicted files are read from disk without caching them."""
+        files: Dict[str, Dict[str, Any]] = {}
+        for path, entry in self._index.items():
+            file_data = self._files.get(path) or self._evicting.get(path)
+            if file_data is None and self.persist_dir is not None:
+                try:
+                    content = (self.persist_dir / path.lstrip("/")).read_text(encoding="utf-8")
+                except (OSError, UnicodeDecodeError):
+                    continue
+                file_data = {"content": content.split("\n"), "created_at": entry.created_at, "modified_at": entry.modified_at}
+            if file_data is not None:
+                files[path] = file_data
+        return files
+
+    # ----------------------------------------------------------------------------------
+    # BackendProtocol
+    # ----------------------------------------------------------------------------------
+
+    def ls_info(self, path: str) -> List[FileInfo]:
+        directory = _normalize(path)
+        if directory is None:
+            return []
+        prefix = directory.rstrip("/") + "/"
+        infos: List[FileInfo] = []
+        subdirs: Set[str] = set()
+        with self._lock:
+            for file_path, entry in self._index.items():
+                if not file_path.startswith(prefix):
+                    continue
+                relative = file_path[len(prefix) :]
+                if "/" in relative:
+                    subdirs.add(prefix + relative.split("/", 1)[0] + "/")
+                    continue
+                infos.append({"path": file_path, "is_dir": False, "size": entry.size, "modified_at": entry.modified_at})
+        infos.extend({"path": subdir, "is_dir": True, "size": 0, "modified_at": ""} for subdir in subdirs)
+        infos.sort(key=lambda info: info["path"])
+        return infos
+
+    def read(self, file_path: str, offset: int = 0, limit: int = 2000) -> str:
+        path = _normalize(file_path)
+        try:
+            with self._lock:
+                file_data = self._get(path) if path is not None else None
+                if file_data is None:
+                    return f"Error: File '{file_path}' not found"
+                return format_read_response(file_data, offset, limit)
+        finally:
+            self._write_evicted()
+
+    def write(self, file_path: str, content: str) -> WriteResult:
+        path = _normalize(file_path)
+        if path is None or path == "/":
+            return WriteResult(error=f"Error: Invalid path '{file_path}'")
+        with self._lock:
+            if path in self._index:
+                return WriteResult(
+                    error=f"Cannot write to {file_path} because it already exists. "
+                    "Read and then make an edit, or write to a new path."
+                )
+            self._store(path, create_file_data(content))
+        self._write_evicted()
+        return WriteResult(path=file_path, files_update=None)
+
+    def edit(
+        self,
+        file_path: str,
+        old_string: str,
+        new_string: str,
+        replace_all: bool = False,
+    ) -> EditResult:
+        path = _normalize(file_path)
+        try:
+            with self._lock:
+                file_data = self._get(path) if path is not None else None
+                if file_data is None:
+                    return EditResult(error=f"Error: File '{file_path}' not found")
+                result = perform_string_replacement(file_data_to_string(file_data), old_string, new_string, replace_all)
+                if isinstance(result, str):
+                    return EditResult(error=result)
+                new_content, occurrences = result
+                self._store(path, update_file_data(file_data, new_content))
+        finally:
+            self._write_evicted()
+        return EditResult(path=file_path, files_update=None, occurrences=int(occurrences))
+
+    def grep_raw(self, pattern: str, path: Optional[str] = None, glob: Optional[str] = None) -> List[GrepMatch] | str:
+        with self._lock:
+            files = self._all_files()
+        return grep_matches_from_files(files, pattern, path, glob)
+
+    def glob_info(self, pattern: str, path: str = "/") -> List[FileInfo]:
+        base = _normalize(path)
+        if base is None:
+            return []
+        prefix = base.rstrip("/") + "/"
+        pattern = "**/" + pattern.lstrip("/")
+        flags = wcglob.GLOBSTAR | wcglob.DOTGLOB | wcglob.BRACE
+        infos: List[FileInfo] = []
+        with self._lock:
+            for file_path, entry in self._index.items():
+                if file_path.startswith(prefix) and wcglob.globmatch(file_path[len(prefix) :], pattern, flags=flags):
+                    infos.append({"path": file_path, "is_dir": False, "size": entry.size, "modified_at": entry.modified_at})
+        infos.sort(key=lambda info: info["path"])
+        return infos
+
+    def upload_files(self, files: List[tuple[str, bytes]]) -> List[FileUploadResponse]:
+        responses = []
+        for file_path, data in files:
+            path = _normalize(file_path)
+            try:
+                content = data.decode("utf-8")
+            except UnicodeDecodeError:
+                path = None
+            if path is None or path == "/":
+                responses.append(FileUploadResponse(path=file_path, error="invalid_path"))
+                continue
+            with self._lock:
+                existing = self._get(path)
+                file_data = update_file_data(existing, content) if existing else create_file_data(content)
+                self._store(path, file_data)
+            responses.append(FileUploadResponse(path=file_path, error=None))
+        self._write_evicted()
+        return responses
+
+    def download_files(self, paths: List[str]) -> List[FileDownloadResponse]:
+        responses = []
+        for file_path in paths:
+            path = _normalize(file_path)
+            with self._lock:
+                file_data = self._get(path) if path is not None else None
+            if file_data is None:
+                responses.append(FileDownloadResponse(path=file_path, content=None, error="file_not_found"))
+            else:
+                content = file_data_to_string(file_data).encode("utf-8")
+                responses.append(FileDownloadResponse(path=file_path, content=content, error=None))
+        self._write_evicted()
+        return responses
+
+
+_REGISTRY_LOCK = threading.Lock()
+_BACKENDS: Dict[Path, ScratchpadBackend] = {}
+
+
+def scratchpad_backend(
+    persist_dir: str | Path,
+    *,
+    max_bytes: int = 64 << 20,
+    flush_interval_s: float = 1.0,
+) -> ScratchpadBackend:
+    """The ``ScratchpadBackend`` shared by everything in this process that persists to ``persist_dir``.
+
+    ``max_bytes`` and ``flush_interval_s`` only apply when the backend is first
+    created; a closed backend is replaced by a new one.
+    """
+    directory = Path(persist_dir).expanduser().resolve()
+    with _REGISTRY_LOCK:
+        backend = _BACKENDS.get(directory)
+        if backend is None or backend.closed:
+            backend = ScratchpadBackend(directory, max_bytes=max_bytes, flush_interval_s=flush_interval_s)
+            _BACKENDS[directory] = backend
+        return backend
+
+
+__all__ = ["ScratchpadBackend", "scratchpad_backend"]
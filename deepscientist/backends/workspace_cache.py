@@ -0,0 +1,142 @@
+"""Listing, paging and search caches shared per workspace root.
+
+Every ``LockingFilesystemBackend`` (and the workspace file tools, which use
+one) serves ``ls``/``glob`` from a ``DirectoryTree``, pages large files through
+a ``LineIndexCache`` and narrows literal greps with a ``TrigramIndex``; large
+greps run in one worker pool. These are built once per resolved root and shared
+by everything in the process, so several backends on one workspace neither
+duplicate the work nor open the SQLite index twice. The tree, the index and the
+pool's workers are created on first use.
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from deepagents.backends.protocol import GrepMatch
+
+from deepscientist.backends.dir_cache import DirectoryTree
+from deepscientist.backends.grep_index import TrigramIndex, is_literal
+from deepscientist.backends.grep_search import search_files, select_paths, walk_files, worker_pool
+from deepscientist.backends.line_index import LineIndexCache
+
+
+class WorkspaceCaches:
+    """Directory tree, line-offset indexes and grep index for one workspace root."""
+
+    def __init__(self, root: Path, *, use_inotify: bool = True) -> None:
+        self.root = root
+        self.use_inotify = use_inotify
+        self.line_indexes = LineIndexCache(root)
+        self._lock = threading.Lock()
+        self._tree: Optional[DirectoryTree] = None
+        self._index: Optional[TrigramIndex] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def tree(self) -> DirectoryTree:
+        with self._lock:
+            if self._tree is None:
+                self._tree = DirectoryTree(self.root, use_inotify=self.use_inotify)
+            return self._tree
+
+    def index(self, max_file_size_bytes: int) -> TrigramIndex:
+        with self._lock:
+            if self._index is None:
+                self._index = TrigramIndex(self.root, max_file_size_bytes)
+            return self._index
+
+    def pool(self, max_workers: Optional[int] = None) -> ProcessPoolExecutor:
+        """Worker processes for large greps; ``max_workers`` applies on first use."""
+        with self._lock:
+            if self._pool is None:
+                self._pool = worker_pool(max_workers)
+            return self._pool
+
+    def changed(self, rel_path: str) -> None:
+        """Record a write to ``rel_path`` (inotify may lag or be off)."""
+        with self._lock:
+            tree = self._tree
+        if tree is not None:
+            tree.invalidate(rel_path)
+
+    def search(
+        self,
+        pattern: str,
+        scope: str,
+        glob: Optional[str],
+        *,
+        max_file_size_bytes: int,
+        use_index: bool = True,
+        first_match_only: bool = False,
+        max_workers: Optional[int] = None,
+        literal: bool = False,
+    ) -> List[GrepMatch]:
+        """Grep the files below ``scope`` (relative to the root), narrowing literals by trigram.
+
+        ``pattern`` is a regex unless ``literal`` is set. Regexes with
+        metacharacters, and patterns shorter than a trigram, cannot be narrowed
+        and are matched against every file in scope.
+        """
+        if use_index and len(pattern) >= 3 and (literal or is_literal(pattern)):
+            index = self.index(max_file_size_bytes)
+            index.refresh()
+            paths = index.candidates(pattern)
+        else:
+            paths = [rel_path for rel_path, _ in walk_files(self.root)]
+        paths = select_paths(paths, scope, glob)
+        return search_files(
+            self.root,
+            paths,
+            re.escape(pattern) if literal else pattern,
+            first_match_only=first_match_only,
+            max_workers=max_workers,
+            pool=self.pool(max_workers),
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+            if self._index is not None:
+                self._index.close()
+                self._index = None
+            if self._tree is not None:
+                self._tree.close()
+                self._tree = None
+        self.line_indexes.clear()
+
+
+_REGISTRY_LOCK = threading.Lock()
+_CACHES: Dict[Path, WorkspaceCaches] = {}
+
+
+def workspace_caches(root: str | Path, *, use_inotify: bool = True) -> WorkspaceCaches:
+    """The ``WorkspaceCaches`` shared by everything in this process that reads ``root``.
+
+    ``use_inotify`` only applies when the caches are first created.
+    """
+    root_dir = Path(root).expanduser().resolve()
+    with _REGISTRY_LOCK:
+        caches = _CACHES.get(root_dir)
+        if caches is None:
+            caches = WorkspaceCaches(root_dir, use_inotify=use_inotify)
+            _CACHES[root_dir] = caches
+        return caches
+
+
+def close_workspace_caches(root: str | Path) -> None:
+    """Close and forget the caches for ``root``; the next lookup starts fresh."""
+    root_dir = Path(root).expanduser().resolve()
+    with _REGISTRY_LOCK:
+        caches = _CACHES.pop(root_dir, None)
+    if caches is not None:
+        caches.close()
+
+
+__all__ = ["WorkspaceCaches", "close_workspace_caches", "workspace_caches"]
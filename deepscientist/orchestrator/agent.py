@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from pathlib import Path
 from typing import Any
 
 from langchain.chat_models import init_chat_model
@@ -8,18 +9,27 @@ from langchain.agents.middleware.summarization import SummarizationMiddleware
 from langgraph.store.memory import InMemoryStore
 
 from deepagents import create_deep_agent
-from deepagents.backends import FilesystemBackend, CompositeBackend
+from deepagents.backends import CompositeBackend
 from deepagents.middleware import (
     FilesystemMiddleware,
     PatchToolCallsMiddleware,
 )
 
 from deepscientist.tools import (
+    append_file,
     clear_papers_and_evidence,
     create_sandbox,
     delete_sandbox,
     execute_code,
+    execute_code_batch,
+    ingest_dataset,
+    ingest_pdf,
+    interrupt_sandbox,
     list_sandboxes,
+    multi_edit,
+    profile_dataset,
+    query_dataset,
+    reset_sandbox,
     gather_evidence,
     search_citations,
     search_paper_by_doi,
@@ -27,6 +37,7 @@ from deepscientist.tools import (
     search_papers,
     search_web,
 )
+from deepscientist.backends import LockingFilesystemBackend, scratchpad_backend
 from deepscientist.settings import Settings
 
 from deepscientist.agents import (
@@ -93,13 +104,18 @@ def create_orchestrator_agent(
     orchestrator_tools = []
     
     file_upload_tools = [
+        ingest_dataset,
+        profile_dataset,
+        ingest_pdf,
         create_sandbox,
         delete_sandbox,
         execute_code,
         list_sandboxes,
     ]
     
-    planning_tools = []
+    planning_tools = [
+        multi_edit,
+    ]
     
     literature_tools = [
         search_web,
@@ -109,14 +125,22 @@ def create_orchestrator_agent(
         gather_evidence,
         search_citations,
         clear_papers_and_evidence,
+        append_file,
+        multi_edit,
     ]
     
     hypothesis_tools = []
     
     analyst_tools = [
+        query_dataset,
+        append_file,
+        multi_edit,
         create_sandbox,
         delete_sandbox,
         execute_code,
+        execute_code_batch,
+        reset_sandbox,
+        interrupt_sandbox,
         list_sandboxes,
     ]
     
@@ -124,11 +148,22 @@ def create_orchestrator_agent(
     
     reply_tools = []
 
+    workspace_backend = LockingFilesystemBackend(
+        root_dir=root_dir,
+        virtual_mode=True,
+        use_inotify=settings.workspace_watch,
+        grep_index=settings.workspace_grep_index,
+        grep_workers=settings.grep_workers,
+    )
     composite_backend = CompositeBackend(
-        default=FilesystemBackend(root_dir=root_dir, virtual_mode=True),
+        default=workspace_backend,
         routes={
-            "/memories/": FilesystemBackend(root_dir=root_dir, virtual_mode=True),
-            "/scratchpad/": FilesystemBackend(root_dir=root_dir, virtual_mode=True),
+            "/memories/": workspace_backend,
+            "/scratchpad/": scratchpad_backend(
+                Path(root_dir) / ".cache" / "scratchpad",
+                max_bytes=settings.scratchpad_max_bytes,
+                flush_interval_s=settings.scratchpad_flush_interval_s,
+            ),
         }
     )
 
@@ -5,7 +5,7 @@ import httpx
 import os
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Callable, Dict, Optional
 from langfuse import get_client
 from langfuse.langchain import CallbackHandler
 
@@ -24,12 +24,35 @@ class Settings:
     lm_temperature: Optional[float] = 0.0
     lm_max_input_tokens: int = 32768
     workspace_root: str = "./workspace"
+    workspace_grep_index: bool = True
+    workspace_watch: bool = True
+    grep_workers: Optional[int] = None
+    workspace_fsync_interval_s: float = 1.0
+    # "reference" keeps only path/hash/size of written files in graph state; "content" keeps everything.
+    scratchpad_max_bytes: int = 64 << 20
+    scratchpad_flush_interval_s: float = 1.0
+    sandbox_output_limit_bytes: int = 32768
+    sandbox_output_excerpt_bytes: int = 4096
+    sandbox_plot_max_dim: Optional[int] = None
+    sandbox_idle_timeout_s: float = 1800.0
+    sandbox_max_live: int = 8
+    sandbox_batch_concurrency: Optional[int] = None
+    sandbox_timeout_s: float = 600.0
+    sandbox_memory_limit_mb: Optional[int] = None
+    sandbox_cpu_limit: Optional[float] = None
+    sandbox_local_pool_size: int = 2
+    sandbox_local_cpu_seconds: Optional[int] = None
+    sandbox_local_memory_mb: Optional[int] = None
+    sandbox_cache_enabled: bool = False
+    pdf_ingest_workers: Optional[int] = None
     langfuse_public_key: Optional[str] = None
     langfuse_secret_key: Optional[str] = None
     langfuse_base_url: Optional[str] = None
     client: Optional[httpx.Client] = field(default=None, repr=False)
     langfuse_client: Optional[Any] = field(default=None, repr=False)
     langfuse_handler: Optional[Any] = field(default=None, repr=False)
+    # Called as hook(event, payload) with sandbox timings, e.g. "sandbox.execute".
+    sandbox_metrics_hook: Optional[Callable[[str, Dict[str, Any]], None]] = field(default=None, repr=False)
 
     def __post_init__(self) -> None:
         self._try_load_dotenv_from_project_root()
@@ -73,6 +96,86 @@ class Settings:
         if env_workspace and self.workspace_root == "./workspace":
             self.workspace_root = env_workspace
 
+        env_grep_index = self._get_env_value("WORKSPACE_GREP_INDEX")
+        if env_grep_index and self.workspace_grep_index:
+            self.workspace_grep_index = env_grep_index.strip().lower() in {"1", "true", "yes", "on"}
+
+        env_watch = self._get_env_value("WORKSPACE_WATCH")
+        if env_watch and self.workspace_watch:
+            self.workspace_watch = env_watch.strip().lower() in {"1", "true", "yes", "on"}
+
+        env_grep_workers = self._get_env_value("GREP_WORKERS")
+        if env_grep_workers and self.grep_workers is None:
+            self.grep_workers = int(env_grep_workers)
+
+        env_fsync_interval = self._get_env_value("WORKSPACE_FSYNC_INTERVAL_S")
+        if env_fsync_interval and self.workspace_fsync_interval_s == 1.0:
+            self.workspace_fsync_interval_s = float(env_fsync_interval)
+
+        env_scratchpad_max = self._get_env_value("SCRATCHPAD_MAX_BYTES")
+        if env_scratchpad_max and self.scratchpad_max_bytes == 64 << 20:
+            self.scratchpad_max_bytes = int(env_scratchpad_max)
+
+        env_scratchpad_flush = self._get_env_value("SCRATCHPAD_FLUSH_INTERVAL_S")
+        if env_scratchpad_flush and self.scratchpad_flush_interval_s == 1.0:
+            self.scratchpad_flush_interval_s = float(env_scratchpad_flush)
+
+        env_output_limit = self._get_env_value("SANDBOX_OUTPUT_LIMIT_BYTES")
+        if env_output_limit and self.sandbox_output_limit_bytes == 32768:
+            self.sandbox_output_limit_bytes = int(env_output_limit)
+
+        env_output_excerpt = self._get_env_value("SANDBOX_OUTPUT_EXCERPT_BYTES")
+        if env_output_excerpt and self.sandbox_output_excerpt_bytes == 4096:
+            self.sandbox_output_excerpt_bytes = int(env_output_excerpt)
+
+        env_plot_max_dim = self._get_env_value("SANDBOX_PLOT_MAX_DIM")
+        if env_plot_max_dim and self.sandbox_plot_max_dim is None:
+            self.sandbox_plot_max_dim = int(env_plot_max_dim)
+
+        env_idle_timeout = self._get_env_value("SANDBOX_IDLE_TIMEOUT_S")
+        if env_idle_timeout and self.sandbox_idle_timeout_s == 1800.0:
+            self.sandbox_idle_timeout_s = float(env_idle_timeout)
+
+        env_max_live = self._get_env_value("SANDBOX_MAX_LIVE")
+        if env_max_live and self.sandbox_max_live == 8:
+            self.sandbox_max_live = int(env_max_live)
+
+        env_batch_concurrency = self._get_env_value("SANDBOX_BATCH_CONCURRENCY")
+        if env_batch_concurrency and self.sandbox_batch_concurrency is None:
+            self.sandbox_batch_concurrency = int(env_batch_concurrency)
+
+        env_sandbox_timeout = self._get_env_value("SANDBOX_TIMEOUT_S")
+        if env_sandbox_timeout and self.sandbox_timeout_s == 600.0:
+            self.sandbox_timeout_s = float(env_sandbox_timeout)
+
+        env_memory_limit = self._get_env_value("SANDBOX_MEMORY_LIMIT_MB")
+        if env_memory_limit and self.sandbox_memory_limit_mb is None:
+            self.sandbox_memory_limit_mb = int(env_memory_limit)
+
+        env_cpu_limit = self._get_env_value("SANDBOX_CPU_LIMIT")
+        if env_cpu_limit and self.sandbox_cpu_limit is None:
+            self.sandbox_cpu_limit = float(env_cpu_limit)
+
+        env_local_pool_size = self._get_env_value("SANDBOX_LOCAL_POOL_SIZE")
+        if env_local_pool_size and self.sandbox_local_pool_size == 2:
+            self.sandbox_local_pool_size = int(env_local_pool_size)
+
+        env_local_cpu_seconds = self._get_env_value("SANDBOX_LOCAL_CPU_SECONDS")
+        if env_local_cpu_seconds and self.sandbox_local_cpu_seconds is None:
+            self.sandbox_local_cpu_seconds = int(env_local_cpu_seconds)
+
+        env_local_memory_mb = self._get_env_value("SANDBOX_LOCAL_MEMORY_MB")
+        if env_local_memory_mb and self.sandbox_local_memory_mb is None:
+            self.sandbox_local_memory_mb = int(env_local_memory_mb)
+
+        env_cache_enabled = self._get_env_value("SANDBOX_CACHE_ENABLED")
+        if env_cache_enabled and not self.sandbox_cache_enabled:
+            self.sandbox_cache_enabled = env_cache_enabled.strip().lower() in {"1", "true", "yes", "on"}
+
+        env_pdf_workers = self._get_env_value("PDF_INGEST_WORKERS")
+        if env_pdf_workers and self.pdf_ingest_workers is None:
+            self.pdf_ingest_workers = int(env_pdf_workers)
+
         env_langfuse_public_key = self._get_env_value("LANGFUSE_PUBLIC_KEY")
         if env_langfuse_public_key and self.langfuse_public_key is None:
             self.langfuse_public_key = env_langfuse_public_key
@@ -9,7 +9,18 @@ from .literature import (
     search_paper_by_title,
     search_papers,
 )
-from .sandbox import create_sandbox, delete_sandbox, execute_code, list_sandboxes
+from .datasets import ingest_dataset, profile_dataset, query_dataset
+from .documents import ingest_pdf
+from .filesystem import append_file, edit_file, glob, grep, ls, multi_edit, read_file, write_file
+from .sandbox import (
+    create_sandbox,
+    delete_sandbox,
+    execute_code,
+    execute_code_batch,
+    interrupt_sandbox,
+    list_sandboxes,
+    reset_sandbox,
+)
 
 __all__ = [
     # Search tools
@@ -25,12 +36,23 @@ __all__ = [
     "create_sandbox",
     "delete_sandbox",
     "execute_code",
+    "execute_code_batch",
+    "reset_sandbox",
+    "interrupt_sandbox",
     "list_sandboxes",
+    # Dataset tools
+    "ingest_dataset",
+    "profile_dataset",
+    "query_dataset",
+    # Document tools
+    "ingest_pdf",
     # Filesystem tools
     "ls",
     "read_file",
     "write_file",
+    "append_file",
     "edit_file",
+    "multi_edit",
     "glob",
     "grep",
 ]
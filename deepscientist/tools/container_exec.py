@@ -0,0 +1,173 @@
+"""Process control and streaming runs inside llm-sandbox Docker containers.
+
+llm-sandbox runs code with blocking ``exec_run`` calls that neither report
+output before they return nor can be stopped from another thread. These
+helpers go through the Docker API of the session's container instead.
+Sandboxes run one piece of code at a time (see ``SandboxHandle.lock``), so
+every process in the container apart from its init process belongs to the
+current run.
+"""
+
+from __future__ import annotations
+
+import codecs
+import logging
+import os
+import tempfile
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+logger = logging.getLogger(__name__)
+
+
+def docker_api(session: Any) -> Optional[Tuple[Any, str]]:
+    """``(low-level Docker API client, container id)`` for a session, if it has one."""
+    container = getattr(session, "container", None)
+    api = getattr(getattr(container, "client", None), "api", None)
+    if api is None or not callable(getattr(api, "exec_create", None)):
+        return None
+    return api, container.id
+
+
+def kill_processes(session: Any) -> bool:
+    """SIGKILL everything in the session's container except its init process.
+
+    Returns False if the session has no Docker container or the kill failed.
+    """
+    target = docker_api(session)
+    if target is None:
+        return False
+    api, container_id = target
+    try:
+        # kill(-1) signals every process except PID 1 and the caller itself.
+        exec_id = api.exec_create(container_id, ["sh", "-c", "kill -9 -1"], user="root")["Id"]
+        api.exec_start(exec_id)
+    except Exception:
+        logger.warning("Failed to kill processes in container %s", container_id, exc_info=True)
+        return False
+    return True
+
+
+@dataclass(frozen=True)
+class StreamedRun:
+    """Result of ``stream_run``, shaped like llm-sandbox's ``ConsoleOutput``."""
+
+    stdout: str
+    stderr: str
+    exit_code: Optional[int]
+    timed_out: bool = False
+    stopped: bool = False
+
+
+def stream_run(
+    session: Any,
+    code: str,
+    timeout: Optional[float],
+    on_output: Callable[[str, str], bool],
+) -> Optional[StreamedRun]:
+    """Run ``code`` the way ``session.run`` does, reporting output as it arrives.
+
+    ``on_output(stream, text)`` is called for every chunk; returning True kills
+    the run. Past ``timeout`` the run is killed as well. Returns None, before
+    running anything, if the session cannot be driven this way; the caller
+    then falls back to ``session.run``.
+    """
+    target = docker_api(session)
+    if target is None:
+        return None
+    api, container_id = target
+    try:
+        workdir = session.config.workdir
+        code_file = f"{workdir}/{uuid4().hex}.{session.language_handler.file_extension}"
+        commands = session.language_handler.get_execution_commands(
+            code_file, runtime_context=_runtime_context(session)
+        )
+        _copy_code(session, code, code_file)
+    except Exception:
+        logger.debug("Streaming unavailable for this session; using session.run", exc_info=True)
+        return None
+
+    chunks: Dict[str, List[bytes]] = {"stdout": [], "stderr": []}
+    decoders = {name: codecs.getincrementaldecoder("utf-8")(errors="replace") for name in chunks}
+    state = {"stopped": False, "timed_out": False}
+
+    def expire() -> None:
+        state["timed_out"] = True
+        kill_processes(session)
+
+    timer = threading.Timer(timeout, expire) if timeout else None
+    if timer is not None:
+        timer.daemon = True
+        timer.start()
+    exit_code: Optional[int] = None
+    try:
+        for command in commands:
+            exec_id = api.exec_create(
+                container_id,
+                command,
+                workdir=workdir,
+                environment={"PYTHONUNBUFFERED": "1"},
+            )["Id"]
+            for stdout_data, stderr_data in api.exec_start(exec_id, stream=True, demux=True):
+                for name, data in (("stdout", stdout_data), ("stderr", stderr_data)):
+                    if not data:
+                        continue
+                    chunks[name].append(data)
+                    text = decoders[name].decode(data)
+                    if text and not state["stopped"] and on_output(name, text):
+                        state["stopped"] = True
+                        kill_processes(session)
+            exit_code = api.exec_inspect(exec_id).get("ExitCode")
+            if exit_code or state["stopped"] or state["timed_out"]:
+                break
+    finally:
+        if timer is not None:
+            timer.cancel()
+    for name, decoder in decoders.items():
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            on_output(name, tail)
+
+    stdout = b"".join(chunks["stdout"]).decode("utf-8", errors="replace")
+    stderr = b"".join(chunks["stderr"]).decode("utf-8", errors="replace")
+    if state["timed_out"]:
+        stderr += f"\nExecution timed out after {timeout} seconds\n"
+    return StreamedRun(
+        stdout=stdout,
+        stderr=stderr,
+        exit_code=exit_code,
+        timed_out=state["timed_out"],
+        stopped=state["stopped"],
+    )
+
+
+def _runtime_context(session: Any) -> Any:
+    """The interpreter paths llm-sandbox's own ``run`` would use."""
+    from llm_sandbox.language_handlers.runtime_context import RuntimeContext
+
+    use_venv = (
+        session.language_handler.name == "python"
+        and not session.config.skip_environment_setup
+        and not session.using_existing_container
+    )
+    return RuntimeContext(
+        workdir=session.config.workdir,
+        python_executable_path=session.python_executable_path if use_venv else None,
+        pip_executable_path=session.pip_executable_path if use_venv else None,
+        pip_cache_dir=session.pip_cache_dir_path if use_venv else None,
+    )
+
+
+def _copy_code(session: Any, code: str, dest: str) -> None:
+    fd, host_path = tempfile.mkstemp(suffix=os.path.splitext(dest)[1])
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            handle.write(code)
+        session.copy_to_runtime(host_path, dest)
+    finally:
+        os.unlink(host_path)
+
+
+__all__ = ["StreamedRun", "docker_api", "kill_processes", "stream_run"]
@@ -0,0 +1,820 @@
+from __future__ import annotations
+
+import importlib
+import json
+import logging
+import math
+import os
+import posixpath
+import re
+import time
+from functools import partial
+from itertools import islice
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+from uuid import uuid4
+
+from langchain.tools import ToolRuntime
+from langchain_core.tools import StructuredTool
+
+from deepscientist.settings import Settings
+from deepscientist.tools.filesystem import _validate_path
+from deepscientist.tools.utils import get_settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Columnar copies of uploaded tables and their schema sidecars live here.
+_DATASETS_DIR = "/datasets"
+# Source suffix -> reader. Parquet sources are registered in place, not copied.
+_FORMATS = {
+    ".csv": "csv",
+    ".tsv": "tsv",
+    ".xlsx": "excel",
+    ".xlsm": "excel",
+    ".xls": "excel",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+    ".json": "json",
+    ".parquet": "parquet",
+}
+# Large CSV blocks make pyarrow's type inference (done on the first block) reliable.
+_CSV_BLOCK_SIZE = 16 << 20
+# Columns retyped as strings before giving up on typed CSV conversion.
+_MAX_CSV_RETRIES = 16
+# Streaming profile parameters: rows per batch, HLL precision, quantile sample size.
+_PROFILE_BATCH_ROWS = 65536
+_HLL_PRECISION = 12
+_RESERVOIR_SIZE = 8192
+_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+# Markers delimiting the generated section in /datasets/<slug>.md.
+_PROFILE_START = "<!-- profile_dataset:start -->"
+_PROFILE_END = "<!-- profile_dataset:end -->"
+# query_dataset: default and maximum number of result rows returned.
+_QUERY_DEFAULT_LIMIT = 200
+_QUERY_MAX_LIMIT = 10000
+_EXTRA_HINT = "Install the optional dependencies with `pip install deepscientist[datasets]`."
+
+
+def _require(module: str) -> Any:
+    """Import an optional dependency, explaining how to install it if missing."""
+    try:
+        return importlib.import_module(module)
+    except ImportError as exc:
+        raise ImportError(f"{module} is required for dataset tools. {_EXTRA_HINT}") from exc
+
+
+def _workspace_root(settings: Settings) -> Path:
+    return Path(settings.workspace_root).expanduser().resolve()
+
+
+def _host_path(settings: Settings, path: str) -> Tuple[str, Path]:
+    """Map a virtual workspace path to (normalized virtual path, resolved host path).
+
+    Raises ``ValueError`` if the path resolves outside the workspace (e.g.
+    through a symlink).
+    """
+    virtual = _validate_path(path)
+    root = _workspace_root(settings)
+    host = (root / virtual.lstrip("/")).resolve()
+    try:
+        host.relative_to(root)
+    except ValueError:
+        raise ValueError(f"Path outside the workspace: {virtual}") from None
+    return virtual, host
+
+
+def _slugify(name: str) -> str:
+    slug = re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+    return slug or "dataset"
+
+
+def _fingerprint(path: Path) -> Dict[str, int]:
+    stat = path.stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _load_ingest_record(path: Path) -> Optional[Dict[str, Any]]:
+    """Read an ingest_dataset schema sidecar, or None if missing or unreadable."""
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def _describe_schema(schema: Any) -> List[Dict[str, Any]]:
+    return [
+        {"name": field.name, "type": str(field.type), "nullable": field.nullable}
+        for field in schema
+    ]
+
+
+# --------------------------------------------------------------------------------------
+# Converters: each writes one Parquet file and returns (rows, arrow schema)
+# --------------------------------------------------------------------------------------
+
+
+def _read_csv(source: Path, delimiter: str, consume: Callable[[Any], T]) -> T:
+    """Stream a CSV through ``consume(reader)`` block by block, in bounded memory.
+
+    Type inference happens on the first block; if a later block does not fit
+    the inferred type, the offending column is read as strings and ``consume``
+    is called again with a fresh reader.
+    """
+    pa = _require("pyarrow")
+    pa_csv = _require("pyarrow.csv")
+
+    column_types: Dict[str, Any] = {}
+    for _ in range(_MAX_CSV_RETRIES):
+        reader = pa_csv.open_csv(
+            source,
+            read_options=pa_csv.ReadOptions(block_size=_CSV_BLOCK_SIZE),
+            parse_options=pa_csv.ParseOptions(delimiter=delimiter),
+            convert_options=pa_csv.ConvertOptions(column_types=column_types, strings_can_be_null=True),
+        )
+        try:
+            return consume(reader)
+        except pa.ArrowInvalid as exc:
+            match = re.search(r"column #(\d+)", str(exc))
+            if match is None:
+                raise
+            name = reader.schema.names[int(match.group(1))]
+            if name in column_types:
+                raise
+            logger.info("Reading CSV column %r of %s as strings: %s", name, source, exc)
+            column_types[name] = pa.string()
+        finally:
+            reader.close()
+    raise ValueError(f"Could not infer consistent column types for {source}")
+
+
+def _csv_to_parquet(source: Path, dest: Path, delimiter: str) -> Tuple[int, Any]:
+    pq = _require("pyarrow.parquet")
+
+    def write(reader: Any) -> Tuple[int, Any]:
+        rows = 0
+        with pq.ParquetWriter(dest, reader.schema, compression="zstd") as writer:
+            for batch in reader:
+                writer.write_batch(batch)
+                rows += batch.num_rows
+        return rows, reader.schema
+
+    return _read_csv(source, delimiter, write)
+
+
+def _frame_to_table(frame: Any) -> Any:
+    """Convert a pandas DataFrame to Arrow, stringifying mixed-type object columns."""
+    pa = _require("pyarrow")
+
+    try:
+        return pa.Table.from_pandas(frame, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        frame = frame.copy()
+        for column in frame.columns[frame.dtypes == object]:
+            frame[column] = frame[column].map(lambda value: None if value is None else str(value))
+        return pa.Table.from_pandas(frame, preserve_index=False)
+
+
+def _frame_to_parquet(frame: Any, dest: Path) -> Tuple[int, Any]:
+    pq = _require("pyarrow.parquet")
+
+    table = _frame_to_table(frame)
+    pq.write_table(table, dest, compression="zstd")
+    return table.num_rows, table.schema
+
+
+def _jsonl_to_parquet(source: Path, dest: Path) -> Tuple[int, Any]:
+    pa_json = _require("pyarrow.json")
+    pq = _require("pyarrow.parquet")
+
+    table = pa_json.read_json(source)
+    pq.write_table(table, dest, compression="zstd")
+    return table.num_rows, table.schema
+
+
+def _convert(
+    fmt: str,
+    source: Path,
+    datasets_host: Path,
+    slug: str,
+) -> List[Dict[str, Any]]:
+    """Convert ``source`` into one or more Parquet tables under ``datasets_host``."""
+    if fmt == "parquet":
+        pq = _require("pyarrow.parquet")
+        metadata = pq.read_metadata(source)
+        return [
+            {
+                "name": slug,
+                "host_path": source,
+                "rows": metadata.num_rows,
+                "schema": metadata.schema.to_arrow_schema(),
+            }
+        ]
+
+    writers: List[Tuple[str, Callable[[Path], Tuple[int, Any]]]] = []
+    if fmt in {"csv", "tsv"}:
+        writers.append((slug, partial(_csv_to_parquet, source, delimiter="\t" if fmt == "tsv" else ",")))
+    elif fmt == "jsonl":
+        writers.append((slug, partial(_jsonl_to_parquet, source)))
+    elif fmt == "json":
+        pd = _require("pandas")
+        writers.append((slug, partial(_frame_to_parquet, pd.read_json(source))))
+    elif fmt == "excel":
+        pd = _require("pandas")
+        sheets = pd.read_excel(source, sheet_name=None)
+        for sheet_name, frame in sheets.items():
+            name = slug if len(sheets) == 1 else f"{slug}--{_slugify(str(sheet_name))}"
+            writers.append((name, partial(_frame_to_parquet, frame)))
+    else:  # pragma: no cover - guarded by _FORMATS
+        raise ValueError(f"Unsupported format: {fmt}")
+
+    tables = []
+    for name, write in writers:
+        dest = datasets_host / f"{name}.parquet"
+        tmp_path = dest.with_name(f".{dest.name}.{uuid4().hex}.tmp")
+        try:
+            rows, schema = write(tmp_path)
+            os.replace(tmp_path, dest)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        tables.append({"name": name, "host_path": dest, "rows": rows, "schema": schema})
+    return tables
+
+
+# --------------------------------------------------------------------------------------
+# Streaming profile: bounded-memory sketches updated batch by batch
+# --------------------------------------------------------------------------------------
+
+
+class _HyperLogLog:
+    """HyperLogLog distinct counter over 64-bit hashes (~1.6% error at p=12)."""
+
+    def __init__(self, precision: int = _HLL_PRECISION) -> None:
+        np = _require("numpy")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update(self, hashes: Any) -> None:
+        np = _require("numpy")
+        if len(hashes) == 0:
+            return
+        hashes = hashes.astype(np.uint64, copy=False)
+        index = (hashes >> np.uint64(64 - self.precision)).astype(np.int64)
+        rest = hashes & np.uint64((1 << (64 - self.precision)) - 1)
+        # Rank = position of the leftmost 1-bit in the remaining bits.
+        _, exponent = np.frexp(rest.astype(np.float64))
+        rank = np.where(rest == 0, 64 - self.precision + 1, 64 - self.precision - exponent + 1)
+        np.maximum.at(self.registers, index, rank.astype(np.uint8))
+
+    def estimate(self) -> int:
+        np = _require("numpy")
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / float(np.sum(np.power(2.0, -self.registers.astype(np.float64))))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            return int(round(m * math.log(m / zeros)))
+        return int(round(raw))
+
+
+class _Reservoir:
+    """Uniform sample of a numeric stream (Algorithm R) for approximate quantiles."""
+
+    def __init__(self, size: int = _RESERVOIR_SIZE, seed: int = 0) -> None:
+        np = _require("numpy")
+        self.size = size
+        self.seen = 0
+        self.sample = np.empty(0, dtype=np.float64)
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values: Any) -> None:
+        np = _require("numpy")
+        values = values.astype(np.float64, copy=False)
+        free = self.size - len(self.sample)
+        if free > 0:
+            self.sample = np.concatenate([self.sample, values[:free]])
+            self.seen += min(free, len(values))
+            values = values[free:]
+        if len(values) == 0:
+            return
+        # Value i of this batch replaces a random slot with probability size/(seen+i+1).
+        positions = self._rng.integers(0, self.seen + np.arange(1, len(values) + 1))
+        keep = positions < self.size
+        self.sample[positions[keep]] = values[keep]
+        self.seen += len(values)
+
+    def quantiles(self, probabilities: Tuple[float, ...]) -> List[Optional[float]]:
+        np = _require("numpy")
+        if len(self.sample) == 0:
+            return [None for _ in probabilities]
+        return [float(value) for value in np.quantile(self.sample, probabilities)]
+
+
+class _ColumnProfile:
+    """Running statistics for one column."""
+
+    def __init__(self, name: str, arrow_type: Any) -> None:
+        self.name = name
+        self.type = arrow_type
+        self.mixed = False
+        self.count = 0
+        self.nulls = 0
+        self.minimum: Any = None
+        self.maximum: Any = None
+        self.distinct = _HyperLogLog()
+        self.reservoir: Optional[_Reservoir] = _Reservoir() if _is_numeric(arrow_type) else None
+
+    def update(self, column: Any) -> None:
+        pa = _require("pyarrow")
+        pc = _require("pyarrow.compute")
+        pd = _require("pandas")
+
+        if pa.types.is_null(self.type) and not pa.types.is_null(column.type):
+            # Leading all-null batches say nothing about the type.
+            self.type = column.type
+            self.reservoir = _Reservoir() if _is_numeric(column.type) else None
+        elif column.type != self.type and not pa.types.is_null(column.type):
+            if not (_is_numeric(column.type) and _is_numeric(self.type)):
+                self.mixed = True
+
+        self.count += len(column)
+        self.nulls += column.null_count
+        values = pc.drop_null(column)
+        if len(values) == 0:
+            return
+
+        self.distinct.update(pd.util.hash_array(values.to_numpy(zero_copy_only=False)))
+        if self.mixed:
+            self.minimum = self.maximum = None
+            self.reservoir = None
+            return
+        try:
+            bounds = pc.min_max(values).as_py()
+        except (pa.ArrowNotImplementedError, pa.ArrowInvalid):
+            bounds = {"min": None, "max": None}
+        if bounds["min"] is not None and (self.minimum is None or bounds["min"] < self.minimum):
+            self.minimum = bounds["min"]
+        if bounds["max"] is not None and (self.maximum is None or bounds["max"] > self.maximum):
+            self.maximum = bounds["max"]
+        if self.reservoir is not None:
+            self.reservoir.update(values.cast(pa.float64()).to_numpy(zero_copy_only=False))
+
+    def result(self) -> Dict[str, Any]:
+        quantiles = (
+            self.reservoir.quantiles(_QUANTILES)
+            if self.reservoir is not None
+            else [None for _ in _QUANTILES]
+        )
+        return {
+            "name": self.name,
+            "type": "mixed" if self.mixed else str(self.type),
+            "count": self.count,
+            "null_rate": self.nulls / self.count if self.count else 0.0,
+            "min": _jsonable(self.minimum),
+            "max": _jsonable(self.maximum),
+            "approx_distinct": min(self.distinct.estimate(), self.count - self.nulls),
+            "approx_quantiles": {
+                f"p{int(probability * 100)}": value for probability, value in zip(_QUANTILES, quantiles)
+            },
+        }
+
+
+def _is_numeric(arrow_type: Any) -> bool:
+    pa = _require("pyarrow")
+    return pa.types.is_integer(arrow_type) or pa.types.is_floating(arrow_type) or pa.types.is_decimal(arrow_type)
+
+
+def _jsonable(value: Any) -> Any:
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+
+def _profile_batches(batches: Any) -> Tuple[int, List[Dict[str, Any]]]:
+    """Fold Arrow record batches into per-column profiles."""
+    rows = 0
+    columns: Dict[str, _ColumnProfile] = {}
+    for batch in batches:
+        rows += batch.num_rows
+        for name, column in zip(batch.schema.names, batch.columns):
+            profile = columns.get(name)
+            if profile is None:
+                profile = columns[name] = _ColumnProfile(name, column.type)
+                # Columns first seen in a later batch were missing before.
+                profile.count = profile.nulls = rows - batch.num_rows
+            profile.update(column)
+    return rows, [profile.result() for profile in columns.values()]
+
+
+def _excel_batches(source: Path, sheet: Optional[str]) -> Iterator[Any]:
+    """Yield Arrow batches from a workbook sheet without loading it whole."""
+    pd = _require("pandas")
+    if source.suffix.lower() == ".xls":
+        # Legacy .xls files have no streaming reader.
+        frame = pd.read_excel(source, sheet_name=sheet or 0)
+        yield from _frame_to_table(frame).to_batches(_PROFILE_BATCH_ROWS)
+        return
+
+    openpyxl = _require("openpyxl")
+    workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet] if sheet else workbook.worksheets[0]
+        rows = worksheet.iter_rows(values_only=True)
+        header = [str(value) if value is not None else f"column_{index}" for index, value in enumerate(next(rows, ()))]
+        while True:
+            chunk = list(islice(rows, _PROFILE_BATCH_ROWS))
+            if not chunk:
+                return
+            frame = pd.DataFrame([row[: len(header)] for row in chunk], columns=header)
+            yield from _frame_to_table(frame).to_batches()
+    finally:
+        workbook.close()
+
+
+def _profile_source(fmt: str, source: Path, sheet: Optional[str]) -> Tuple[int, List[Dict[str, Any]]]:
+    """Profile a dataset file in one streaming pass."""
+    if fmt == "parquet":
+        pq = _require("pyarrow.parquet")
+        return _profile_batches(pq.ParquetFile(source).iter_batches(batch_size=_PROFILE_BATCH_ROWS))
+    if fmt in {"csv", "tsv"}:
+        return _read_csv(source, "\t" if fmt == "tsv" else ",", _profile_batches)
+    if fmt == "jsonl":
+        pa_json = _require("pyarrow.json")
+        return _profile_batches(pa_json.open_json(source))
+    if fmt == "json":
+        pd = _require("pandas")
+        return _profile_batches(_frame_to_table(pd.read_json(source)).to_batches(_PROFILE_BATCH_ROWS))
+    if fmt == "excel":
+        return _profile_batches(_excel_batches(source, sheet))
+    raise ValueError(f"Unsupported format: {fmt}")  # pragma: no cover - guarded by _FORMATS
+
+
+def _format_number(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        return f"{value:.4g}"
+    text = str(value).replace("|", "\\|").replace("\n", " ")
+    return text if len(text) <= 40 else text[:37] + "..."
+
+
+def _profile_markdown(source: str, rows: int, columns: List[Dict[str, Any]]) -> str:
+    quantile_names = [f"p{int(probability * 100)}" for probability in _QUANTILES]
+    lines = [
+        _PROFILE_START,
+        "## Profile",
+        "",
+        f"Source: `{source}` · rows: {rows} · columns: {len(columns)}",
+        "",
+        "| column | type | null % | min | max | ~distinct | " + " | ".join(quantile_names) + " |",
+        "|---|---|---|---|---|---|" + "---|" * len(quantile_names),
+    ]
+    for column in columns:
+        cells = [
+            f"`{column['name']}`",
+            column["type"],
+            f"{column['null_rate'] * 100:.1f}",
+            _format_number(column["min"]),
+            _format_number(column["max"]),
+            str(column["approx_distinct"]),
+            *(_format_number(column["approx_quantiles"][name]) for name in quantile_names),
+        ]
+        lines.append("| " + " | ".join(cells) + " |")
+    lines.append(_PROFILE_END)
+    return "\n".join(lines) + "\n"
+
+
+def _write_profile_section(path: Path, title: str, section: str) -> None:
+    """Insert or replace the generated profile section, keeping hand-written notes."""
+    existing = path.read_text(encoding="utf-8") if path.is_file() else f"# {title}\n\n"
+    start, end = existing.find(_PROFILE_START), existing.find(_PROFILE_END)
+    if start != -1 and end > start:
+        updated = existing[:start] + section + existing[end + len(_PROFILE_END) + 1 :]
+    else:
+        updated = existing.rstrip("\n") + "\n\n" + section
+    tmp_path = path.with_name(f".{path.name}.{uuid4().hex}.tmp")
+    tmp_path.write_text(updated, encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+# --------------------------------------------------------------------------------------
+# SQL over /datasets/ (DuckDB)
+# --------------------------------------------------------------------------------------
+
+
+def _view_name(file_name: str) -> str:
+    stem = file_name.rsplit(".", 1)[0]
+    name = re.sub(r"[^0-9a-zA-Z]+", "_", stem).strip("_").lower() or "dataset"
+    return f"t_{name}" if name[0].isdigit() else name
+
+
+def _dataset_views(datasets_host: Path) -> Dict[str, Tuple[str, Path]]:
+    """Map view names to (reader function, file) for tables under /datasets/."""
+    views: Dict[str, Tuple[str, Path]] = {}
+    if not datasets_host.is_dir():
+        return views
+    # Parquet wins over a CSV of the same name: it is the ingested copy.
+    for suffix, reader in ((".csv", "read_csv_auto"), (".tsv", "read_csv_auto"), (".parquet", "read_parquet")):
+        for path in sorted(datasets_host.glob(f"*{suffix}")):
+            if not path.name.startswith("."):
+                views[_view_name(path.name)] = (reader, path)
+    return views
+
+
+def _connect(datasets_host: Path, views: Dict[str, Tuple[str, Path]]) -> Any:
+    """Open an in-memory DuckDB that can only read files under /datasets/."""
+    duckdb = _require("duckdb")
+    con = duckdb.connect()
+    con.execute(f"SET allowed_directories = [{_sql_literal(f'{datasets_host}/')}]")
+    con.execute("SET enable_external_access = false")
+    con.execute("SET lock_configuration = true")
+    for name, (reader, path) in views.items():
+        # Views keep scans lazy, so DuckDB pushes projections and filters into the reader.
+        con.execute(f'CREATE VIEW "{name}" AS SELECT * FROM {reader}({_sql_literal(str(path))})')
+    return con
+
+
+def _sql_literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+_STRING_LITERAL = re.compile(r"'((?:[^']|'')*)'")
+
+
+def _resolve_dataset_paths(sql: str, datasets_host: Path) -> str:
+    """Rewrite 'datasets/...' and '/datasets/...' string literals to absolute host paths.
+
+    DuckDB checks ``allowed_directories`` against the path as written, so only
+    absolute paths under /datasets/ are readable. Paths that would leave
+    /datasets/ are left unchanged and rejected by DuckDB.
+    """
+
+    def resolve(match: "re.Match[str]") -> str:
+        value = match.group(1).replace("''", "'")
+        relative = value.lstrip("/")
+        if not relative.startswith(f"{_DATASETS_DIR.strip('/')}/"):
+            return match.group(0)
+        normalized = posixpath.normpath(relative)
+        if not normalized.startswith(f"{_DATASETS_DIR.strip('/')}/"):
+            return match.group(0)
+        return _sql_literal(str(datasets_host.parent / normalized))
+
+    return _STRING_LITERAL.sub(resolve, sql)
+
+
+# --------------------------------------------------------------------------------------
+# Tool descriptions (fixed)
+# --------------------------------------------------------------------------------------
+
+_INGEST_DATASET_DESC = """Convert an uploaded tabular file into Parquet under /datasets/.
+
+Run this once per uploaded CSV/TSV, Excel, JSON/JSONL file. The Parquet copy
+keeps column types, so analysis code can load only the columns it needs
+(e.g. pandas.read_parquet(path, columns=[...])) instead of re-parsing the
+original file. Re-running on an unchanged file returns the existing result.
+
+Args:
+- path: absolute virtual path of the uploaded file (e.g. /uploads/data.csv)
+- slug: optional dataset name used for output files (default: file name)
+- force: convert again even if the file is unchanged (default: false)
+
+Returns:
+- dataset: slug
+- source: path of the original file
+- schema_path: /datasets/<slug>.schema.json with the stored schema
+- tables: list of {name, path, rows, columns: [{name, type, nullable}]};
+  Excel workbooks produce one table per sheet
+- cached: true if the file had already been ingested
+- error (if the file could not be ingested)
+"""
+
+
+_PROFILE_DATASET_DESC = """Profile a tabular dataset in one streaming pass and record it in /datasets/.
+
+Works on CSV/TSV, Excel, JSON/JSONL and Parquet files of any size without a
+sandbox. If the file was ingested with ingest_dataset, its Parquet copy is read.
+
+Args:
+- path: absolute virtual path of the dataset file
+- slug: optional dataset name (default: file name); the profile is written to
+  /datasets/<slug>.md, replacing an earlier profile but keeping other notes
+- sheet: optional Excel sheet name (default: first sheet)
+
+Returns:
+- dataset, source, notes_path, rows
+- columns: list of {name, type, count, null_rate, min, max, approx_distinct,
+  approx_quantiles: {p5, p25, p50, p75, p95}}; distinct counts (HyperLogLog)
+  and quantiles (sampled) are approximate
+- error (if the file could not be profiled)
+"""
+
+
+_QUERY_DATASET_DESC = """Run a read-only SQL query (DuckDB dialect) over the datasets in /datasets/.
+
+Every Parquet/CSV/TSV file in /datasets/ is available as a view named after the
+file (e.g. /datasets/sales-2024.parquet -> sales_2024; names starting with a
+digit get a t_ prefix). Files can also be read directly by their path under
+/datasets/, e.g. read_parquet('/datasets/sales-2024.parquet') or
+read_csv('/datasets/*.csv'). Only the columns and rows the query
+needs are read, so simple aggregations over large files return quickly without
+a sandbox. Use execute_code for modelling, plotting or multi-step analyses.
+
+Args:
+- sql: a single SELECT (or WITH ... SELECT) statement
+- limit: maximum number of rows to return (default: 200, max: 10000)
+
+Returns:
+- columns: result column names
+- rows: list of rows (lists of values)
+- row_count: number of rows returned
+- truncated: true if the result had more rows than limit
+- elapsed_ms
+- tables: available view names (also returned with errors)
+- error (if the query failed)
+"""
+
+
+# --------------------------------------------------------------------------------------
+# Tool implementations (SYNC ONLY, runtime-aware)
+# --------------------------------------------------------------------------------------
+
+
+def _ingest_dataset(
+    runtime: ToolRuntime,
+    path: str,
+    slug: Optional[str] = None,
+    force: bool = False,
+) -> Dict[str, Any]:
+    """Convert an uploaded tabular file to Parquet and store its schema."""
+    settings = get_settings(runtime)
+
+    try:
+        virtual, source = _host_path(settings, path)
+    except ValueError as exc:
+        return {"error": str(exc)}
+    if not source.is_file():
+        return {"error": f"File not found: {virtual}"}
+
+    fmt = _FORMATS.get(source.suffix.lower())
+    if fmt is None:
+        return {"error": f"Unsupported file type {source.suffix!r}; expected one of {sorted(_FORMATS)}"}
+
+    slug = _slugify(slug or source.stem)
+    datasets_host = _workspace_root(settings) / _DATASETS_DIR.lstrip("/")
+    datasets_host.mkdir(parents=True, exist_ok=True)
+    schema_host = datasets_host / f"{slug}.schema.json"
+    fingerprint = _fingerprint(source)
+
+    if not force:
+        existing = _load_ingest_record(schema_host)
+        if existing and existing.get("source") == virtual and existing.get("fingerprint") == fingerprint:
+            return {**existing, "cached": True}
+
+    try:
+        tables = _convert(fmt, source, datasets_host, slug)
+    except ImportError as exc:
+        return {"error": str(exc)}
+    except Exception as exc:
+        logger.warning("Failed to ingest %s", virtual, exc_info=True)
+        return {"error": f"Failed to ingest {virtual}: {exc}"}
+
+    root = _workspace_root(settings)
+    record = {
+        "dataset": slug,
+        "source": virtual,
+        "format": fmt,
+        "fingerprint": fingerprint,
+        "schema_path": f"{_DATASETS_DIR}/{schema_host.name}",
+        "tables": [
+            {
+                "name": table["name"],
+                "path": "/" + table["host_path"].relative_to(root).as_posix(),
+                "rows": table["rows"],
+                "columns": _describe_schema(table["schema"]),
+            }
+            for table in tables
+        ],
+    }
+    tmp_path = schema_host.with_name(f".{schema_host.name}.{uuid4().hex}.tmp")
+    tmp_path.write_text(json.dumps(record, indent=2), encoding="utf-8")
+    os.replace(tmp_path, schema_host)
+    return {**record, "cached": False}
+
+
+def _profile_dataset(
+    runtime: ToolRuntime,
+    path: str,
+    slug: Optional[str] = None,
+    sheet: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Compute a bounded-memory profile of a dataset and write it to /datasets/<slug>.md."""
+    settings = get_settings(runtime)
+
+    try:
+        virtual, source = _host_path(settings, path)
+    except ValueError as exc:
+        return {"error": str(exc)}
+    if not source.is_file():
+        return {"error": f"File not found: {virtual}"}
+
+    fmt = _FORMATS.get(source.suffix.lower())
+    if fmt is None:
+        return {"error": f"Unsupported file type {source.suffix!r}; expected one of {sorted(_FORMATS)}"}
+
+    slug = _slugify(slug or source.stem)
+    datasets_host = _workspace_root(settings) / _DATASETS_DIR.lstrip("/")
+    datasets_host.mkdir(parents=True, exist_ok=True)
+
+    # Prefer an up-to-date single-table Parquet copy from ingest_dataset.
+    profiled, profiled_fmt = source, fmt
+    record = _load_ingest_record(datasets_host / f"{slug}.schema.json")
+    if record and record.get("source") == virtual and record.get("fingerprint") == _fingerprint(source):
+        if len(record["tables"]) == 1 and sheet is None:
+            profiled = _workspace_root(settings) / record["tables"][0]["path"].lstrip("/")
+            profiled_fmt = "parquet"
+
+    try:
+        rows, columns = _profile_source(profiled_fmt, profiled, sheet)
+    except ImportError as exc:
+        return {"error": str(exc)}
+    except Exception as exc:
+        logger.warning("Failed to profile %s", virtual, exc_info=True)
+        return {"error": f"Failed to profile {virtual}: {exc}"}
+
+    notes_host = datasets_host / f"{slug}.md"
+    _write_profile_section(notes_host, slug, _profile_markdown(virtual, rows, columns))
+    return {
+        "dataset": slug,
+        "source": virtual,
+        "notes_path": f"{_DATASETS_DIR}/{notes_host.name}",
+        "rows": rows,
+        "columns": columns,
+    }
+
+
+def _query_dataset(runtime: ToolRuntime, sql: str, limit: int = _QUERY_DEFAULT_LIMIT) -> Dict[str, Any]:
+    """Run a single read-only SQL query over /datasets/ with an embedded DuckDB."""
+    settings = get_settings(runtime)
+
+    datasets_host = _workspace_root(settings) / _DATASETS_DIR.lstrip("/")
+    views = _dataset_views(datasets_host)
+    limit = max(1, min(limit, _QUERY_MAX_LIMIT))
+
+    try:
+        con = _connect(datasets_host, views)
+    except ImportError as exc:
+        return {"error": str(exc)}
+
+    started = time.perf_counter()
+    try:
+        statements = con.extract_statements(sql)
+        if len(statements) != 1 or statements[0].type.name != "SELECT":
+            return {"error": "Only a single SELECT statement is allowed", "tables": sorted(views)}
+        relation = con.sql(_resolve_dataset_paths(sql, datasets_host))
+        columns = list(relation.columns)
+        rows = relation.limit(limit + 1).fetchall()
+    except Exception as exc:
+        return {"error": f"Query failed: {exc}", "tables": sorted(views)}
+    finally:
+        con.close()
+
+    truncated = len(rows) > limit
+    rows = [[_jsonable(value) for value in row] for row in rows[:limit]]
+    return {
+        "columns": columns,
+        "rows": rows,
+        "row_count": len(rows),
+        "truncated": truncated,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+        "tables": sorted(views),
+    }
+
+
+# --------------------------------------------------------------------------------------
+# Public tool objects (ONLY exports)
+# --------------------------------------------------------------------------------------
+
+ingest_dataset = StructuredTool.from_function(
+    name="ingest_dataset",
+    description=_INGEST_DATASET_DESC,
+    func=_ingest_dataset,
+)
+
+profile_dataset = StructuredTool.from_function(
+    name="profile_dataset",
+    description=_PROFILE_DATASET_DESC,
+    func=_profile_dataset,
+)
+
+query_dataset = StructuredTool.from_function(
+    name="query_dataset",
+    description=_QUERY_DATASET_DESC,
+    func=_query_dataset,
+)
+
+__all__ = [
+    "ingest_dataset",
+    "profile_dataset",
+    "query_dataset",
+]
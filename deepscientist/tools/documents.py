@@ -0,0 +1,285 @@
+from __future__ import annotations
+
+import hashlib
+import importlib
+import json
+import logging
+import os
+import re
+from concurrent.futures import as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+from langchain.tools import ToolRuntime
+from langchain_core.tools import StructuredTool
+
+from deepscientist.backends.grep_search import worker_pool
+from deepscientist.settings import Settings
+from deepscientist.tools.filesystem import _validate_path
+from deepscientist.tools.utils import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Structured PDF output is written next to the other dataset metadata.
+_DATASETS_DIR = "/datasets"
+# Per-page extraction results, keyed by file hash and extractor.
+_PDF_CACHE_DIR = "/datasets/.cache/pdf"
+# Pages handed to one worker task; each task opens the PDF once.
+_PAGES_PER_TASK = 8
+_EXTRA_HINT = "Install the optional dependencies with `pip install deepscientist[documents]`."
+
+
+def _require(module: str) -> Any:
+    """Import an optional dependency, explaining how to install it if missing."""
+    try:
+        return importlib.import_module(module)
+    except ImportError as exc:
+        raise ImportError(f"{module} is required for document tools. {_EXTRA_HINT}") from exc
+
+
+def _has_module(module: str) -> bool:
+    try:
+        importlib.import_module(module)
+    except ImportError:
+        return False
+    return True
+
+
+def _extractor_name() -> str:
+    # Tables need pdfplumber; without it only text is extracted.
+    return "pypdf+pdfplumber" if _has_module("pdfplumber") else "pypdf"
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for chunk in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _slugify(name: str) -> str:
+    slug = re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+    return slug or "document"
+
+
+def _write_atomically(path: Path, text: str) -> None:
+    tmp_path = path.with_name(f".{path.name}.{uuid4().hex}.tmp")
+    try:
+        tmp_path.write_text(text, encoding="utf-8")
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def _extract_page_range(path: str, start: int, stop: int, with_tables: bool) -> List[Dict[str, Any]]:
+    """Extract pages ``start``..``stop - 1`` of a PDF (runs in a worker process)."""
+    pypdf = _require("pypdf")
+    reader = pypdf.PdfReader(path)
+    plumber = _require("pdfplumber").open(path) if with_tables else None
+    pages = []
+    try:
+        for index in range(start, stop):
+            try:
+                text = reader.pages[index].extract_text() or ""
+            except Exception as exc:  # Damaged pages should not fail the document.
+                text, error = "", str(exc)
+            else:
+                error = None
+            tables: List[Any] = []
+            if plumber is not None:
+                try:
+                    tables = plumber.pages[index].extract_tables()
+                except Exception as exc:
+                    error = error or str(exc)
+            page: Dict[str, Any] = {"page": index + 1, "text": text, "tables": tables}
+            if error is not None:
+                page["error"] = error
+            pages.append(page)
+    finally:
+        if plumber is not None:
+            plumber.close()
+    return pages
+
+
+def _page_ranges(indices: List[int]) -> List[Tuple[int, int]]:
+    """Group sorted page indices into contiguous ranges of at most _PAGES_PER_TASK."""
+    ranges: List[Tuple[int, int]] = []
+    for index in indices:
+        if ranges and ranges[-1][1] == index and index - ranges[-1][0] < _PAGES_PER_TASK:
+            ranges[-1] = (ranges[-1][0], index + 1)
+        else:
+            ranges.append((index, index + 1))
+    return ranges
+
+
+def _metadata(reader: Any) -> Dict[str, Any]:
+    info = reader.metadata or {}
+    metadata: Dict[str, Any] = {}
+    for key, value in dict(info).items():
+        name = str(key).lstrip("/").lower()
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        metadata[name] = str(value)
+    return metadata
+
+
+def _extract_pages(
+    source: Path,
+    cache_dir: Path,
+    page_count: int,
+    with_tables: bool,
+    max_workers: int,
+) -> Tuple[List[Dict[str, Any]], int]:
+    """Return all pages, extracting only those missing from the cache.
+
+    Each extracted page is cached as soon as its task finishes, so an
+    interrupted run resumes where it stopped.
+    """
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def cache_path(index: int) -> Path:
+        return cache_dir / f"{index + 1:05d}.json"
+
+    missing = [index for index in range(page_count) if not cache_path(index).is_file()]
+    ranges = _page_ranges(missing)
+
+    def store(pages: List[Dict[str, Any]]) -> None:
+        for page in pages:
+            _write_atomically(cache_path(page["page"] - 1), json.dumps(page))
+
+    if len(ranges) <= 1 or max_workers <= 1:
+        # Not worth starting worker processes.
+        for start, stop in ranges:
+            store(_extract_page_range(str(source), start, stop, with_tables))
+    elif ranges:
+        with worker_pool(min(max_workers, len(ranges))) as pool:
+            futures = [
+                pool.submit(_extract_page_range, str(source), start, stop, with_tables)
+                for start, stop in ranges
+            ]
+            for future in as_completed(futures):
+                store(future.result())
+
+    pages = [json.loads(cache_path(index).read_text(encoding="utf-8")) for index in range(page_count)]
+    return pages, len(missing)
+
+
+# --------------------------------------------------------------------------------------
+# Tool descriptions (fixed)
+# --------------------------------------------------------------------------------------
+
+_INGEST_PDF_DESC = """Extract text, tables and metadata from an uploaded PDF.
+
+Pages are processed in parallel worker processes and cached by file hash, so a
+PDF is never parsed twice. Use this instead of parsing PDFs in a sandbox.
+
+Args:
+- path: absolute virtual path of the PDF (e.g. /uploads/report.pdf)
+- slug: optional document name used for output files (default: file name)
+
+Returns:
+- document: slug
+- source, sha256, page_count, metadata (title, author, dates, ...)
+- json_path: /datasets/<slug>.pdf.json with {metadata, pages: [{page, text, tables}]}
+- text_path: /datasets/<slug>.txt with the full text and page markers
+- pages_extracted / pages_cached: pages parsed now vs. reused from the cache
+- tables: number of tables found (requires pdfplumber)
+- error (if the file could not be processed)
+"""
+
+
+# --------------------------------------------------------------------------------------
+# Tool implementations (SYNC ONLY, runtime-aware)
+# --------------------------------------------------------------------------------------
+
+
+def _ingest_pdf(runtime: ToolRuntime, path: str, slug: Optional[str] = None) -> Dict[str, Any]:
+    """Extract a PDF page by page in a process pool and write structured output."""
+    settings: Settings = get_settings(runtime)
+
+    try:
+        virtual = _validate_path(path)
+    except ValueError as exc:
+        return {"error": str(exc)}
+    root = Path(settings.workspace_root).expanduser().resolve()
+    source = (root / virtual.lstrip("/")).resolve()
+    try:
+        source.relative_to(root)
+    except ValueError:
+        return {"error": f"Path outside the workspace: {virtual}"}
+    if not source.is_file():
+        return {"error": f"File not found: {virtual}"}
+    if source.suffix.lower() != ".pdf":
+        return {"error": f"Not a PDF file: {virtual}"}
+
+    try:
+        pypdf = _require("pypdf")
+        reader = pypdf.PdfReader(str(source))
+        page_count = len(reader.pages)
+        metadata = _metadata(reader)
+    except ImportError as exc:
+        return {"error": str(exc)}
+    except Exception as exc:
+        return {"error": f"Failed to open {virtual}: {exc}"}
+
+    sha256 = _file_sha256(source)
+    extractor = _extractor_name()
+    cache_dir = root / _PDF_CACHE_DIR.lstrip("/") / f"{sha256}.{extractor}"
+    max_workers = settings.pdf_ingest_workers or os.cpu_count() or 1
+
+    try:
+        pages, extracted = _extract_pages(source, cache_dir, page_count, extractor != "pypdf", max_workers)
+    except Exception as exc:
+        logger.warning("Failed to extract %s", virtual, exc_info=True)
+        return {"error": f"Failed to extract {virtual}: {exc}"}
+
+    slug = _slugify(slug or source.stem)
+    datasets_host = root / _DATASETS_DIR.lstrip("/")
+    datasets_host.mkdir(parents=True, exist_ok=True)
+    json_host = datasets_host / f"{slug}.pdf.json"
+    text_host = datasets_host / f"{slug}.txt"
+
+    document = {
+        "source": virtual,
+        "sha256": sha256,
+        "extractor": extractor,
+        "page_count": page_count,
+        "metadata": metadata,
+        "pages": pages,
+    }
+    _write_atomically(json_host, json.dumps(document, ensure_ascii=False))
+    _write_atomically(
+        text_host,
+        "".join(f"\n\n--- page {page['page']} ---\n\n{page['text']}" for page in pages).lstrip("\n"),
+    )
+
+    return {
+        "document": slug,
+        "source": virtual,
+        "sha256": sha256,
+        "page_count": page_count,
+        "metadata": metadata,
+        "json_path": f"{_DATASETS_DIR}/{json_host.name}",
+        "text_path": f"{_DATASETS_DIR}/{text_host.name}",
+        "pages_extracted": extracted,
+        "pages_cached": page_count - extracted,
+        "tables": sum(len(page["tables"]) for page in pages),
+    }
+
+
+# --------------------------------------------------------------------------------------
+# Public tool objects (ONLY exports)
+# --------------------------------------------------------------------------------------
+
+ingest_pdf = StructuredTool.from_function(
+    name="ingest_pdf",
+    description=_INGEST_PDF_DESC,
+    func=_ingest_pdf,
+)
+
+__all__ = [
+    "ingest_pdf",
+]
@@ -1,20 +1,30 @@
 from __future__ import annotations
 
+import atexit
 import os
 import re
+import threading
+from datetime import datetime
 from pathlib import Path
-from typing import Literal
+from typing import Dict, List, Literal
 
 from langchain.tools import ToolRuntime
 from langchain_core.messages import ToolMessage
 from langchain_core.tools import StructuredTool
 from langgraph.types import Command
+from typing_extensions import Required, TypedDict
 
+from deepscientist.backends import LockingFilesystemBackend, replace_file
 from deepscientist.settings import Settings
-from deepagents.backends.filesystem import FilesystemBackend
 from deepagents.backends.protocol import EditResult, WriteResult
-from deepagents.backends.utils import format_grep_matches, truncate_if_too_long
-
+from deepagents.backends.utils import format_grep_matches, perform_string_replacement, truncate_if_too_long
+
+from deepscientist.backends.dir_cache import DirectoryTree, EntryInfo
+from deepscientist.backends.grep_index import TrigramIndex
+from deepscientist.backends.grep_search import compile_pattern
+from deepscientist.backends.line_index import LineIndexCache
+from deepscientist.backends.workspace_cache import WorkspaceCaches, close_workspace_caches
+from deepscientist.tools.workspace_writer import SyncBatcher, WorkspaceWriter
 from deepscientist.tools.utils import get_settings
 
 DEFAULT_READ_OFFSET = 0
@@ -43,13 +53,159 @@ def _validate_path(path: str) -> str:
     return normalized
 
 
-def _backend(settings: Settings) -> FilesystemBackend:
-    """Instantiate a FilesystemBackend rooted at settings.workspace_root."""
-    root_dir = Path(settings.workspace_root).expanduser().resolve()
-    root_dir.mkdir(parents=True, exist_ok=True)
-    # Preserve your prior behavior (virtual paths). If your FilesystemBackend
-    # defaults differ, keep virtual_mode=True as you did in orchestrator.
-    return FilesystemBackend(root_dir=str(root_dir), virtual_mode=True)
+# Served from memory by the agents' ScratchpadBackend; its files are not on disk
+# at the mapped path, so tools that write the workspace directly must not touch it.
+_SCRATCHPAD_PREFIX = "/scratchpad/"
+
+
+def _scratchpad_error(validated: str, tool: str) -> str | None:
+    if validated.rstrip("/") + "/" == _SCRATCHPAD_PREFIX or validated.startswith(_SCRATCHPAD_PREFIX):
+        return (
+            f"Error: {tool} cannot modify '{validated}'; files under {_SCRATCHPAD_PREFIX} "
+            "are kept in memory. Use write_file/edit_file on the agent filesystem instead."
+        )
+    return None
+
+
+class _BackendRegistry:
+    """LockingFilesystemBackend instances shared per resolved workspace root.
+
+    Resolving the root, creating it and building a backend happen once per
+    ``settings.workspace_root`` value; changing the setting yields a different
+    key, so the next call picks up (or creates) the backend for the new root.
+    The grep trigram index, line-offset indexes and directory tree cache come
+    from the backend's ``WorkspaceCaches``, which agents' backends on the same
+    root share.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._roots: Dict[str, Path] = {}
+        self._backends: Dict[Path, LockingFilesystemBackend] = {}
+
+    def _root(self, key: str) -> Path:
+        # Caller holds the lock.
+        root_dir = self._roots.get(key)
+        if root_dir is None:
+            root_dir = Path(key).expanduser().resolve()
+            root_dir.mkdir(parents=True, exist_ok=True)
+            self._roots[key] = root_dir
+        return root_dir
+
+    def get(self, settings: Settings) -> LockingFilesystemBackend:
+        key = settings.workspace_root
+        root_dir = self._roots.get(key)
+        if root_dir is not None:
+            backend = self._backends.get(root_dir)
+            if backend is not None:
+                return backend
+
+        with self._lock:
+            root_dir = self._root(key)
+            backend = self._backends.get(root_dir)
+            if backend is None:
+                # Preserve your prior behavior (virtual paths). If your FilesystemBackend
+                # defaults differ, keep virtual_mode=True as you did in orchestrator.
+                backend = LockingFilesystemBackend(
+                    root_dir=str(root_dir),
+                    virtual_mode=True,
+                    use_inotify=settings.workspace_watch,
+                )
+                self._backends[root_dir] = backend
+            return backend
+
+    def root(self, settings: Settings) -> Path:
+        self.get(settings)
+        return self._roots[settings.workspace_root]
+
+    def caches(self, settings: Settings) -> WorkspaceCaches:
+        return self.get(settings).caches
+
+    def index(self, settings: Settings) -> TrigramIndex:
+        backend = self.get(settings)
+        return backend.caches.index(backend.max_file_size_bytes)
+
+    def line_indexes(self, settings: Settings) -> LineIndexCache:
+        return self.caches(settings).line_indexes
+
+    def tree(self, settings: Settings) -> DirectoryTree:
+        return self.caches(settings).tree
+
+    def clear(self) -> None:
+        with self._lock:
+            for root_dir in self._backends:
+                close_workspace_caches(root_dir)
+            self._roots.clear()
+            self._backends.clear()
+
+
+_BACKENDS = _BackendRegistry()
+# fsync state shared by append_file calls, so frequent appends sync once per
+# interval; one batcher per configured interval.
+_APPEND_SYNC_LOCK = threading.Lock()
+_APPEND_SYNC: Dict[float, SyncBatcher] = {}
+
+
+def _append_sync(settings: Settings) -> SyncBatcher:
+    """The SyncBatcher for ``settings.workspace_fsync_interval_s``."""
+    interval_s = settings.workspace_fsync_interval_s
+    with _APPEND_SYNC_LOCK:
+        batcher = _APPEND_SYNC.get(interval_s)
+        if batcher is None:
+            batcher = SyncBatcher(interval_s=interval_s)
+            _APPEND_SYNC[interval_s] = batcher
+            atexit.register(batcher.flush)
+        return batcher
+
+
+def _backend(settings: Settings) -> LockingFilesystemBackend:
+    """Return the shared LockingFilesystemBackend rooted at settings.workspace_root."""
+    return _BACKENDS.get(settings)
+
+
+def _changed(settings: Settings, virtual_path: str) -> None:
+    """Tell the directory cache a tool changed ``virtual_path`` (inotify may lag or be off)."""
+    _BACKENDS.caches(settings).changed(virtual_path)
+
+
+def _describe_entry(virtual_path: str, info: EntryInfo) -> str:
+    modified = datetime.fromtimestamp(info.mtime).isoformat(timespec="seconds")
+    if info.is_dir:
+        return f"{virtual_path}/ (dir, modified {modified})"
+    return f"{virtual_path} ({info.size} bytes, modified {modified})"
+
+
+def _search_workspace(
+    settings: Settings,
+    pattern: str,
+    path: str | None,
+    glob: str | None,
+    first_match_only: bool = False,
+    literal: bool = False,
+) -> list:
+    """Grep the workspace, narrowing literal patterns with the trigram index."""
+    backend = _backend(settings)
+    base = backend.cwd / _validate_path(path or "/").lstrip("/")
+    if not base.exists():
+        return []
+    return backend.caches.search(
+        pattern,
+        base.relative_to(backend.cwd).as_posix(),
+        glob,
+        max_file_size_bytes=backend.max_file_size_bytes,
+        use_index=settings.workspace_grep_index,
+        first_match_only=first_match_only,
+        max_workers=settings.grep_workers,
+        literal=literal,
+    )
+
+
+class EditSpec(TypedDict, total=False):
+    """One multi_edit replacement; same semantics as an edit_file call."""
+
+    old_string: Required[str]
+    new_string: Required[str]
+    replace_all: bool
 
 
 # --------------------------------------------------------------------------------------
@@ -60,6 +216,7 @@ _LS_DESC = """Lists all files in the filesystem.
 
 Usage:
 - path must be an absolute virtual path (starting with /)
+- Each entry shows its size in bytes (files) and last modification time
 - Use this to explore the workspace before reading or editing files.
 """
 
@@ -69,6 +226,7 @@ Usage:
 - file_path must be an absolute virtual path (starting with /)
 - Use offset and limit to page through large files
 - Defaults to reading the first 500 lines
+- Pages of large files are served from a line-offset index, so any offset is fast
 """
 
 _WRITE_DESC = """Writes content to a file in the filesystem.
@@ -79,6 +237,17 @@ Usage:
 - Creates or overwrites the file
 """
 
+_APPEND_DESC = """Appends content to the end of a file.
+
+Usage:
+- file_path must be an absolute virtual path (starting with /)
+- content is added verbatim; include a leading or trailing newline if needed
+- Creates the file if it does not exist
+- Not available for /scratchpad/ files; use write_file/edit_file there
+- Prefer this over write_file/edit_file when adding sections or log entries to
+  a growing file: only the new content is sent and written
+"""
+
 _EDIT_DESC = """Performs exact string replacements in a file.
 
 Usage:
@@ -87,6 +256,18 @@ Usage:
 - Set replace_all=True to replace multiple occurrences
 """
 
+_MULTI_EDIT_DESC = """Applies several exact string replacements to one file at once.
+
+Usage:
+- file_path must be an absolute virtual path
+- edits is a list of {old_string, new_string, replace_all?}, applied in order;
+  each edit sees the result of the previous ones
+- Every edit is checked before anything is written: if any edit fails, the file
+  is left unchanged and the per-edit results show which ones to fix
+- Not available for /scratchpad/ files; use edit_file there
+- Prefer this over several edit_file calls when changing multiple sections
+"""
+
 _GLOB_DESC = """Find files matching a glob pattern.
 
 Usage:
@@ -98,7 +279,9 @@ Usage:
 _GREP_DESC = """Search for a literal string in files.
 
 Usage:
-- pattern is a literal string (not regex)
+- pattern is a literal string (not regex); literal searches are answered
+  from a trigram index and are the fastest
+- regex: set to true to match pattern as a Python regular expression, line by line
 - path optionally scopes the search
 - glob filters which files to search
 - output_mode: files_with_matches | content | count
@@ -112,11 +295,11 @@ Usage:
 
 def _ls(runtime: ToolRuntime, path: str) -> str:
     settings = get_settings(runtime)
-    backend = _backend(settings)
     validated = _validate_path(path)
-    infos = backend.ls_info(validated)
-    paths = [fi.get("path", "") for fi in infos]
-    return str(truncate_if_too_long(paths))
+    entries = _BACKENDS.tree(settings).list(validated)
+    prefix = validated.rstrip("/")
+    lines = [_describe_entry(f"{prefix}/{info.name}", info) for info in entries or []]
+    return str(truncate_if_too_long(lines))
 
 
 def _read_file(
@@ -125,9 +308,10 @@ def _read_file(
     offset: int = DEFAULT_READ_OFFSET,
     limit: int = DEFAULT_READ_LIMIT,
 ) -> str:
-    settings = _get_settings(runtime)
+    settings = get_settings(runtime)
     backend = _backend(settings)
     validated = _validate_path(file_path)
+    # The backend pages large files through the shared line-offset index.
     return backend.read(validated, offset=offset, limit=limit)
 
 
@@ -136,13 +320,17 @@ def _write_file(
     file_path: str,
     content: str,
 ) -> Command | str:
-    settings = _get_settings(runtime)
+    settings = get_settings(runtime)
     backend = _backend(settings)
     validated = _validate_path(file_path)
+    error = _scratchpad_error(validated, "write_file")
+    if error:
+        return error
     res: WriteResult = backend.write(validated, content)
 
     if res.error:
         return res.error
+    _changed(settings, validated)
 
     if res.files_update is not None:
         return Command(
@@ -160,6 +348,36 @@ def _write_file(
     return f"Updated file {res.path}"
 
 
+def _append_file(
+    runtime: ToolRuntime,
+    file_path: str,
+    content: str,
+) -> str:
+    settings = get_settings(runtime)
+    validated = _validate_path(file_path)
+    if validated == "/":
+        return "Error: file_path must name a file"
+    error = _scratchpad_error(validated, "append_file")
+    if error:
+        return error
+    # Writes only the delta; fsyncs are batched per file and completed by a timer.
+    backend = _backend(settings)
+    try:
+        # Resolved first so a symlinked directory cannot redirect the append outside the workspace.
+        target = backend._resolve_path(validated)
+    except ValueError as exc:
+        return f"Error appending to file '{validated}': {exc}"
+    try:
+        # Locked so the append cannot land on an inode a concurrent edit is replacing.
+        with backend.locks.hold(target), \
+             WorkspaceWriter(target, batcher=_append_sync(settings), sync_on_close=False) as writer:
+            written = writer.write(content)
+    except OSError as exc:
+        return f"Error appending to file '{validated}': {exc}"
+    _changed(settings, validated)
+    return f"Appended {written} bytes to {validated}"
+
+
 def _edit_file(
     runtime: ToolRuntime,
     file_path: str,
@@ -168,13 +386,17 @@ def _edit_file(
     *,
     replace_all: bool = False,
 ) -> Command | str:
-    settings = _get_settings(runtime)
+    settings = get_settings(runtime)
     backend = _backend(settings)
     validated = _validate_path(file_path)
+    error = _scratchpad_error(validated, "edit_file")
+    if error:
+        return error
     res: EditResult = backend.edit(validated, old_string, new_string, replace_all=replace_all)
 
     if res.error:
         return res.error
+    _changed(settings, validated)
 
     if res.files_update is not None:
         return Command(
@@ -192,11 +414,73 @@ def _edit_file(
     return f"Successfully replaced {res.occurrences} instance(s) in '{res.path}'"
 
 
-def _glob(runtime: ToolRuntime, pattern: str, path: str = "/") -> str:
-    settings = _get_settings(runtime)
+def _multi_edit(
+    runtime: ToolRuntime,
+    file_path: str,
+    edits: List[EditSpec],
+) -> str:
+    settings = get_settings(runtime)
+    validated = _validate_path(file_path)
+    if not edits:
+        return "Error: edits must contain at least one edit"
+    error = _scratchpad_error(validated, "multi_edit")
+    if error:
+        return error
     backend = _backend(settings)
-    infos = backend.glob_info(pattern, path=path)
-    paths = [fi.get("path", "") for fi in infos]
+    try:
+        target = backend._resolve_path(validated)
+    except ValueError as exc:
+        return f"Error editing file '{validated}': {exc}"
+    # Held from the read to the rename so concurrent edits cannot lose updates.
+    with backend.locks.hold(target):
+        return _apply_edits(settings, validated, target, edits)
+
+
+def _apply_edits(settings: Settings, validated: str, target: Path, edits: List[EditSpec]) -> str:
+    if not target.is_file():
+        return f"Error: File '{validated}' not found"
+
+    try:
+        fd = os.open(target, os.O_RDONLY | getattr(os, "O_NOFOLLOW", 0))
+        with os.fdopen(fd, "r", encoding="utf-8") as handle:
+            content = handle.read()
+    except (OSError, UnicodeDecodeError) as exc:
+        return f"Error editing file '{validated}': {exc}"
+
+    # Validate by applying every edit in memory; failed edits are skipped so the
+    # report covers all of them, not just the first failure.
+    report: List[str] = []
+    failed = replaced = 0
+    for number, edit in enumerate(edits, 1):
+        result = perform_string_replacement(
+            content, edit["old_string"], edit["new_string"], edit.get("replace_all", False)
+        )
+        if isinstance(result, str):
+            failed += 1
+            report.append(f"- edit {number}: {result}")
+            continue
+        content, occurrences = result
+        replaced += occurrences
+        report.append(f"- edit {number}: replaced {occurrences} instance(s)")
+
+    if failed:
+        header = f"No changes made to '{validated}'; {failed} of {len(edits)} edit(s) failed:"
+        return "\n".join([header, *report])
+
+    try:
+        replace_file(target, content)
+    except (OSError, UnicodeEncodeError) as exc:
+        return f"Error editing file '{validated}': {exc}"
+    _changed(settings, validated)
+    header = f"Applied {len(edits)} edit(s) to '{validated}' ({replaced} replacement(s)):"
+    return "\n".join([header, *report])
+
+
+def _glob(runtime: ToolRuntime, pattern: str, path: str = "/") -> str:
+    settings = get_settings(runtime)
+    validated = _validate_path(path)
+    matches = _BACKENDS.tree(settings).glob(pattern, validated)
+    paths = [f"/{rel_path}" for rel_path, _ in matches]
     return str(truncate_if_too_long(paths))
 
 
@@ -206,12 +490,22 @@ def _grep(
     path: str | None = None,
     glob: str | None = None,
     output_mode: Literal["files_with_matches", "content", "count"] = "files_with_matches",
+    regex: bool = False,
 ) -> str:
-    settings = _get_settings(runtime)
-    backend = _backend(settings)
-    raw = backend.grep_raw(pattern, path=path, glob=glob)
-    if isinstance(raw, str):
-        return raw
+    settings = get_settings(runtime)
+    if regex:
+        try:
+            compile_pattern(pattern)
+        except re.error as exc:
+            return f"Invalid regex pattern: {exc}"
+    raw = _search_workspace(
+        settings,
+        pattern,
+        path,
+        glob,
+        first_match_only=output_mode == "files_with_matches",
+        literal=not regex,
+    )
     formatted = format_grep_matches(raw, output_mode)
     return truncate_if_too_long(formatted)  # type: ignore[arg-type]
 
@@ -238,12 +532,24 @@ write_file = StructuredTool.from_function(
     func=_write_file,
 )
 
+append_file = StructuredTool.from_function(
+    name="append_file",
+    description=_APPEND_DESC,
+    func=_append_file,
+)
+
 edit_file = StructuredTool.from_function(
     name="edit_file",
     description=_EDIT_DESC,
     func=_edit_file,
 )
 
+multi_edit = StructuredTool.from_function(
+    name="multi_edit",
+    description=_MULTI_EDIT_DESC,
+    func=_multi_edit,
+)
+
 glob = StructuredTool.from_function(
     name="glob",
     description=_GLOB_DESC,
@@ -260,7 +566,9 @@ __all__ = [
     "ls",
     "read_file",
     "write_file",
+    "append_file",
     "edit_file",
+    "multi_edit",
     "glob",
     "grep",
 ]
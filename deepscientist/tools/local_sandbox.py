@@ -0,0 +1,345 @@
+"""Local-subprocess sandbox backend.
+
+Runs Python code in pre-started local worker processes instead of containers.
+Intended for trusted, single-tenant and CI deployments where container round
+trips dominate the latency of small snippets. There is no isolation beyond
+rlimits and a per-run timeout; the workspace is the working directory.
+"""
+
+from __future__ import annotations
+
+import codecs
+import logging
+import os
+import re
+import signal
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from importlib import metadata
+from typing import Any, Callable, Deque, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Receives (stream name, decoded text chunk) as output arrives; returning True
+# stops the run.
+OutputCallback = Callable[[str, str], bool]
+
+# Worker bootstrap: preload modules, apply rlimits, then block on stdin until the
+# parent sends the code to run. Each worker runs exactly one snippet and exits,
+# so rlimits (CPU time in particular) never accumulate across runs.
+_WORKER_BOOTSTRAP = r"""
+import contextlib, io, resource, sys
+
+cpu_seconds, memory_bytes = int(sys.argv[1]), int(sys.argv[2])
+with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+    for _name in sys.argv[3:]:
+        try:
+            __import__(_name)
+        except Exception:
+            pass
+
+if cpu_seconds > 0:
+    _usage = resource.getrusage(resource.RUSAGE_SELF)
+    _limit = int(_usage.ru_utime + _usage.ru_stime) + cpu_seconds
+    resource.setrlimit(resource.RLIMIT_CPU, (_limit, _limit + 1))
+if memory_bytes > 0:
+    resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+
+_code = sys.stdin.read()
+sys.argv = ["<sandbox>"]
+exec(compile(_code, "<sandbox>", "exec"), {"__name__": "__main__", "__builtins__": __builtins__})
+"""
+
+
+@dataclass(frozen=True)
+class LocalRunResult:
+    """Result of one local run; mirrors llm-sandbox's ConsoleOutput fields."""
+
+    exit_code: int
+    stdout: str
+    stderr: str
+    timed_out: bool = False
+    cpu_s: Optional[float] = None
+    peak_rss_bytes: Optional[int] = None
+    stopped: bool = False
+
+
+class LocalSandboxSession:
+    """Session-compatible runner backed by a pool of warm local Python workers.
+
+    Implements the subset of the llm-sandbox session API used by the sandbox
+    tools: context manager, ``open``/``close`` and ``run(code, libraries, timeout)``.
+    """
+
+    def __init__(
+        self,
+        workdir: str,
+        lang: str = "python",
+        pool_size: int = 2,
+        cpu_seconds: Optional[int] = None,
+        memory_limit_mb: Optional[int] = None,
+        timeout: Optional[float] = None,
+        preload: Sequence[str] = (),
+    ) -> None:
+        if lang != "python":
+            raise ValueError(f"Local sandbox backend only supports python, not {lang!r}")
+        self.workdir = workdir
+        self.pool_size = max(pool_size, 1)
+        self.cpu_seconds = cpu_seconds
+        self.memory_limit_mb = memory_limit_mb
+        self.timeout = timeout
+        self.preload = list(preload)
+        self._workers: Deque[subprocess.Popen] = deque()
+        self._running: set[subprocess.Popen] = set()
+        self._lock = threading.Lock()
+        self.is_open = False
+
+    def __enter__(self) -> "LocalSandboxSession":
+        self.open()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def open(self) -> None:
+        with self._lock:
+            self.is_open = True
+            while len(self._workers) < self.pool_size:
+                self._workers.append(self._spawn())
+
+    def close(self) -> None:
+        """Kill every worker; runs in progress return early and reap their own."""
+        with self._lock:
+            self.is_open = False
+            workers, self._workers = list(self._workers), deque()
+            running = list(self._running)
+        for worker in running:
+            _kill(worker)
+        for worker in workers:
+            _kill(worker)
+            worker.communicate()
+            _close_pipes(worker)
+
+    def interrupt(self) -> None:
+        """Kill the workers currently running code; their runs return early."""
+        with self._lock:
+            running = list(self._running)
+        for worker in running:
+            _kill(worker)
+
+    def run(
+        self,
+        code: str,
+        libraries: Optional[list[str]] = None,
+        timeout: Optional[float] = None,
+        on_output: Optional[OutputCallback] = None,
+    ) -> LocalRunResult:
+        """Run ``code`` in a warm worker and return its stdout/stderr/exit code.
+
+        ``on_output`` is called from reader threads with each chunk of output as
+        it is produced; if it returns True the worker is killed and the result
+        is marked ``stopped``.
+        """
+        missing = [name for name in libraries or [] if not _is_installed(name)]
+        if missing:
+            return LocalRunResult(
+                exit_code=1,
+                stdout="",
+                stderr=(
+                    "The local sandbox backend does not install packages; missing: "
+                    + ", ".join(missing)
+                ),
+            )
+
+        worker = self._checkout()
+        with self._lock:
+            self._running.add(worker)
+        try:
+            return self._run_worker(worker, code, timeout or self.timeout, on_output)
+        finally:
+            with self._lock:
+                self._running.discard(worker)
+
+    def _run_worker(
+        self,
+        worker: subprocess.Popen,
+        code: str,
+        effective_timeout: Optional[float],
+        on_output: Optional[OutputCallback],
+    ) -> LocalRunResult:
+        stdout_chunks: List[bytes] = []
+        stderr_chunks: List[bytes] = []
+        stop = threading.Event()
+
+        def notify(name: str, text: str) -> None:
+            if on_output is not None and not stop.is_set() and on_output(name, text):
+                stop.set()
+                _kill(worker)
+
+        def feed() -> None:
+            assert worker.stdin is not None
+            try:
+                worker.stdin.write(code.encode("utf-8"))
+                worker.stdin.close()
+            except (OSError, ValueError):
+                pass  # The worker died or was killed before reading all of it.
+
+        # The code is written from a thread too: a worker that stops reading
+        # would otherwise block the write before the timeout starts.
+        threads = [
+            threading.Thread(target=feed, daemon=True),
+            threading.Thread(target=_drain, args=(worker.stdout, stdout_chunks, "stdout", notify), daemon=True),
+            threading.Thread(target=_drain, args=(worker.stderr, stderr_chunks, "stderr", notify), daemon=True),
+        ]
+        # CPU already spent preloading modules is not part of this run.
+        cpu_baseline = _proc_cpu_seconds(worker.pid)
+        for thread in threads:
+            thread.start()
+
+        timed_out = not _join(threads, effective_timeout)
+        if timed_out:
+            _kill(worker)
+            _join(threads, None)
+        exit_code, rusage = _reap(worker)
+        _close_pipes(worker)
+
+        stdout = b"".join(stdout_chunks).decode("utf-8", errors="replace")
+        stderr = b"".join(stderr_chunks).decode("utf-8", errors="replace")
+        if timed_out:
+            stderr += f"\nExecution timed out after {effective_timeout} seconds\n"
+
+        cpu_s: Optional[float] = None
+        peak_rss_bytes: Optional[int] = None
+        if rusage is not None:
+            cpu_s = max(rusage.ru_utime + rusage.ru_stime - cpu_baseline, 0.0)
+            # ru_maxrss is reported in KiB on Linux and bytes on macOS.
+            peak_rss_bytes = rusage.ru_maxrss if sys.platform == "darwin" else rusage.ru_maxrss * 1024
+        return LocalRunResult(
+            exit_code=exit_code,
+            stdout=stdout,
+            stderr=stderr,
+            timed_out=timed_out,
+            cpu_s=cpu_s,
+            peak_rss_bytes=peak_rss_bytes,
+            stopped=stop.is_set(),
+        )
+
+    def _checkout(self) -> subprocess.Popen:
+        """Take a warm worker and start its replacement."""
+        with self._lock:
+            worker = self._workers.popleft() if self._workers else self._spawn()
+            if self.is_open:
+                self._workers.append(self._spawn())
+        return worker
+
+    def _spawn(self) -> subprocess.Popen:
+        memory_bytes = (self.memory_limit_mb or 0) * 1024 * 1024
+        return subprocess.Popen(
+            [
+                sys.executable,
+                "-u",
+                "-c",
+                _WORKER_BOOTSTRAP,
+                str(self.cpu_seconds or 0),
+                str(memory_bytes),
+                *self.preload,
+            ],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd=self.workdir,
+            # Own process group so a timeout also kills anything the code spawned.
+            start_new_session=True,
+        )
+
+
+def _kill(worker: subprocess.Popen) -> None:
+    # Never poll() here: that would reap the worker and lose its usage in _reap.
+    if worker.returncode is not None:
+        return
+    try:
+        os.killpg(worker.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        return  # Already exited; _reap collects it.
+    except PermissionError:
+        try:
+            os.kill(worker.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+    except OSError:
+        logger.debug("Failed to kill local sandbox worker %s", worker.pid, exc_info=True)
+
+
+def _drain(stream: Any, chunks: List[bytes], name: str, notify: Callable[[str, str], None]) -> None:
+    """Read a worker pipe until EOF, reporting decoded chunks as they arrive."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    while True:
+        chunk = stream.read1(65536)
+        if not chunk:
+            text = decoder.decode(b"", final=True)
+            if text:
+                notify(name, text)
+            return
+        chunks.append(chunk)
+        text = decoder.decode(chunk)
+        if text:
+            notify(name, text)
+
+
+def _join(threads: List[threading.Thread], timeout: Optional[float]) -> bool:
+    """Join all threads within a shared deadline; return False on timeout."""
+    deadline = None if timeout is None else time.monotonic() + timeout
+    for thread in threads:
+        remaining = None if deadline is None else max(deadline - time.monotonic(), 0.0)
+        thread.join(remaining)
+        if thread.is_alive():
+            return False
+    return True
+
+
+def _reap(worker: subprocess.Popen) -> Tuple[int, Optional[Any]]:
+    """Wait for a worker and return its exit code and resource usage."""
+    if worker.returncode is not None:
+        return worker.returncode, None
+    try:
+        _, status, rusage = os.wait4(worker.pid, 0)
+    except ChildProcessError:
+        # Already reaped elsewhere (e.g. by Popen.poll); usage is lost.
+        return worker.wait(), None
+    worker.returncode = os.waitstatus_to_exitcode(status)
+    return worker.returncode, rusage
+
+
+def _proc_cpu_seconds(pid: int) -> float:
+    """CPU seconds a process has used so far (Linux /proc; 0.0 elsewhere)."""
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as handle:
+            fields = handle.read().rsplit(b")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, IndexError, ValueError):
+        return 0.0
+
+
+def _close_pipes(worker: subprocess.Popen) -> None:
+    for stream in (worker.stdin, worker.stdout, worker.stderr):
+        if stream is not None and not stream.closed:
+            try:
+                stream.close()
+            except OSError:
+                pass  # Unflushed stdin of a killed worker.
+
+
+def _is_installed(requirement: str) -> bool:
+    distribution = re.split(r"[<>=!~\[;\s]", requirement.strip(), maxsplit=1)[0]
+    try:
+        metadata.distribution(distribution)
+    except metadata.PackageNotFoundError:
+        return False
+    return True
+
+
+__all__ = ["LocalRunResult", "LocalSandboxSession", "OutputCallback"]
@@ -1,19 +1,61 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import ast
+import asyncio
+import atexit
+import base64
+import binascii
+import hashlib
+import io
+import json
+import logging
+import mimetypes
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import IO, Any, Callable, Dict, List, Optional, Pattern, Tuple
 from uuid import uuid4
 
+from typing_extensions import Required, TypedDict
+
 from langchain.tools import ToolRuntime
 from langchain_core.tools import StructuredTool
 
+from deepscientist.settings import Settings
+from deepscientist.tools import container_exec
+from deepscientist.tools.local_sandbox import LocalSandboxSession, OutputCallback
 from deepscientist.tools.utils import get_settings
 import inspect
 
-from llm_sandbox import SandboxSession
+from llm_sandbox import InteractiveSandboxSession, SandboxSession
+from llm_sandbox.exceptions import SandboxTimeoutError
+
+try:  # Optional: only needed to downscale plots.
+    from PIL import Image
+except ImportError:  # pragma: no cover - depends on the environment
+    Image = None
+
+logger = logging.getLogger(__name__)
 
-_SANDBOXES: Dict[str, "SandboxHandle"] = {}
+# Virtual workspace directory receiving stdout/stderr that exceeds the output limit.
+_LOGS_DIR = "/analysis/logs"
+# Backend name selecting LocalSandboxSession instead of an llm-sandbox container.
+_LOCAL_BACKEND = "local"
+# Content-addressed store for plots and artifacts produced by sandbox runs.
+_ARTIFACTS_DIR = "/analysis/artifacts"
+_RASTER_FORMATS = {"png", "jpeg", "jpg"}
+# Interval between "running" progress events of the async tool variants.
+_PROGRESS_INTERVAL_S = 5.0
+# Trailing output kept per stream so stop patterns can match across chunk boundaries.
+_STOP_WINDOW_CHARS = 4096
+# Memoized execute_code results, one JSON file per cache key.
+_CACHE_DIR = "/.cache/execute_code"
 
 
 @dataclass
@@ -21,6 +63,198 @@ class SandboxHandle:
     session: Any
     workspace_host: Path
     workspace_container: str
+    stateful: bool = False
+    timeout: Optional[float] = None
+    lang: str = "python"
+    backend: Optional[str] = None
+    image: Optional[str] = None
+    startup_s: Optional[float] = None
+    last_used: float = field(default_factory=time.monotonic)
+    # Held while code runs so runs on one sandbox never overlap and busy
+    # sandboxes are never reaped or evicted.
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+    closed: bool = False
+    # The run currently holding ``lock``, so cancelling a call interrupts only its own run.
+    active_run: Optional["_RunToken"] = field(default=None, repr=False)
+
+
+class _RunToken:
+    """One execute_code call; cancelling it stops that run and no other."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._handle: Optional[SandboxHandle] = None
+        self.cancelled = False
+
+    def start(self, handle: SandboxHandle) -> bool:
+        """Mark the run as active on ``handle`` (caller holds ``handle.lock``); False if cancelled."""
+        with self._lock:
+            if self.cancelled:
+                return False
+            self._handle = handle
+            handle.active_run = self
+            return True
+
+    def finish(self) -> None:
+        with self._lock:
+            if self._handle is not None:
+                self._handle.active_run = None
+                self._handle = None
+
+    def cancel(self) -> bool:
+        """Stop the run if it is executing, or keep it from starting.
+
+        Returns False only if the run is executing and cannot be interrupted.
+        """
+        with self._lock:
+            # Held while interrupting so the run cannot finish and hand the
+            # sandbox to another caller's run in between.
+            self.cancelled = True
+            handle = self._handle
+            if handle is None or handle.active_run is not self:
+                return True
+            return _interrupt_handle(handle)
+
+
+def _close_handle(sandbox_id: str, handle: SandboxHandle) -> None:
+    handle.closed = True
+    try:
+        handle.session.__exit__(None, None, None)
+    except Exception:
+        logger.warning("Failed to close sandbox %s", sandbox_id, exc_info=True)
+
+
+def _close_claimed(sandbox_id: str, handle: SandboxHandle) -> None:
+    """Close a handle whose ``lock`` the caller acquired, then release it."""
+    try:
+        _close_handle(sandbox_id, handle)
+    finally:
+        handle.lock.release()
+
+
+class _SandboxRegistry:
+    """Thread-safe registry of live sandboxes.
+
+    - Every lookup refreshes the sandbox's ``last_used`` timestamp.
+    - A daemon reaper thread closes sandboxes idle for longer than ``idle_timeout``.
+    - Adding a sandbox beyond ``max_live`` evicts the least recently used idle one.
+    - All remaining sandboxes are closed when the interpreter exits.
+    """
+
+    def __init__(
+        self,
+        idle_timeout: float = 1800.0,
+        max_live: int = 8,
+        reap_interval: float = 60.0,
+    ) -> None:
+        self.idle_timeout = idle_timeout
+        self.max_live = max_live
+        self.reap_interval = reap_interval
+        self._handles: "OrderedDict[str, SandboxHandle]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._reaper: Optional[threading.Thread] = None
+
+    def configure(self, idle_timeout: float, max_live: int) -> None:
+        with self._lock:
+            self.idle_timeout = idle_timeout
+            self.max_live = max_live
+
+    def add(self, sandbox_id: str, handle: SandboxHandle) -> None:
+        with self._lock:
+            self._handles[sandbox_id] = handle
+            evicted = self._evict_over_capacity()
+            self._ensure_reaper()
+        for evicted_id, evicted_handle in evicted:
+            logger.info("Evicting least recently used sandbox %s", evicted_id)
+            _close_claimed(evicted_id, evicted_handle)
+
+    def get(self, sandbox_id: str) -> Optional[SandboxHandle]:
+        with self._lock:
+            handle = self._handles.get(sandbox_id)
+            if handle is not None:
+                handle.last_used = time.monotonic()
+                self._handles.move_to_end(sandbox_id)
+            return handle
+
+    def pop(self, sandbox_id: str) -> Optional[SandboxHandle]:
+        with self._lock:
+            return self._handles.pop(sandbox_id, None)
+
+    def items(self) -> List[Tuple[str, SandboxHandle]]:
+        with self._lock:
+            return list(self._handles.items())
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._handles)
+
+    def __contains__(self, sandbox_id: object) -> bool:
+        with self._lock:
+            return sandbox_id in self._handles
+
+    def reap_idle(self) -> List[str]:
+        """Close sandboxes that have been idle longer than ``idle_timeout``."""
+        now = time.monotonic()
+        with self._lock:
+            expired = [
+                (sandbox_id, handle)
+                for sandbox_id, handle in list(self._handles.items())
+                if now - handle.last_used > self.idle_timeout and handle.lock.acquire(blocking=False)
+            ]
+            for sandbox_id, _ in expired:
+                del self._handles[sandbox_id]
+        for sandbox_id, handle in expired:
+            logger.info("Reaping idle sandbox %s", sandbox_id)
+            _close_claimed(sandbox_id, handle)
+        return [sandbox_id for sandbox_id, _ in expired]
+
+    def close_all(self) -> None:
+        """Stop the reaper and close every registered sandbox."""
+        self._stop.set()
+        with self._lock:
+            handles = list(self._handles.items())
+            self._handles.clear()
+        for sandbox_id, handle in handles:
+            _close_handle(sandbox_id, handle)
+
+    def _evict_over_capacity(self) -> List[Tuple[str, SandboxHandle]]:
+        evicted: List[Tuple[str, SandboxHandle]] = []
+        overflow = len(self._handles) - self.max_live
+        # OrderedDict iterates from least to most recently used.
+        for sandbox_id, handle in list(self._handles.items()):
+            if overflow <= 0:
+                break
+            # Claim the handle so a caller that already looked it up cannot
+            # start a run on it while it is being closed.
+            if not handle.lock.acquire(blocking=False):
+                continue
+            del self._handles[sandbox_id]
+            evicted.append((sandbox_id, handle))
+            overflow -= 1
+        return evicted
+
+    def _ensure_reaper(self) -> None:
+        if self._reaper is not None and self._reaper.is_alive() and not self._stop.is_set():
+            return
+        # A fresh event per thread so a reaper that is still winding down after
+        # close_all() cannot be confused with the new one.
+        self._stop = threading.Event()
+        self._reaper = threading.Thread(
+            target=self._reap_loop, args=(self._stop,), name="sandbox-reaper", daemon=True
+        )
+        self._reaper.start()
+
+    def _reap_loop(self, stop: threading.Event) -> None:
+        while not stop.wait(self.reap_interval):
+            try:
+                self.reap_idle()
+            except Exception:
+                logger.warning("Sandbox reaper iteration failed", exc_info=True)
+
+
+_SANDBOXES = _SandboxRegistry()
+atexit.register(_SANDBOXES.close_all)
 
 
 def _filter_kwargs(callable_obj: Any, kwargs: Dict[str, Any]) -> Dict[str, Any]:
@@ -31,6 +265,30 @@ def _filter_kwargs(callable_obj: Any, kwargs: Dict[str, Any]) -> Dict[str, Any]:
     return {key: value for key, value in kwargs.items() if key in signature.parameters}
 
 
+def _accepts_kwarg(callable_obj: Any, name: str) -> bool:
+    """Whether ``callable_obj`` takes ``name`` explicitly or through ``**kwargs``."""
+    try:
+        parameters = inspect.signature(callable_obj).parameters
+    except (TypeError, ValueError):
+        return True
+    return name in parameters or any(
+        parameter.kind is inspect.Parameter.VAR_KEYWORD for parameter in parameters.values()
+    )
+
+
+def _resource_runtime_configs(
+    memory_limit_mb: Optional[int],
+    cpu_limit: Optional[float],
+) -> Dict[str, Any]:
+    """Container runtime options capping memory (MB) and CPU (cores)."""
+    runtime_configs: Dict[str, Any] = {}
+    if memory_limit_mb:
+        runtime_configs["mem_limit"] = f"{memory_limit_mb}m"
+    if cpu_limit:
+        runtime_configs["nano_cpus"] = int(cpu_limit * 1e9)
+    return runtime_configs
+
+
 def _mount_kwargs(workspace_host: Path, workspace_container: str) -> Dict[str, Any]:
     volumes = {
         str(workspace_host): {
@@ -56,6 +314,669 @@ def _mount_kwargs(workspace_host: Path, workspace_container: str) -> Dict[str, A
     }
 
 
+class _OutputSink:
+    """Collect one output stream, spilling it to a workspace file past a size limit.
+
+    Below the limit the stream is kept in memory and returned verbatim. Once it
+    grows past the limit, everything is written to ``host_path`` and only a
+    head/tail excerpt is kept in memory for the tool response.
+    """
+
+    def __init__(self, host_path: Path, virtual_path: str, limit: int, excerpt: int) -> None:
+        self.host_path = host_path
+        self.virtual_path = virtual_path
+        self.limit = limit
+        self.excerpt = excerpt
+        self.total_bytes = 0
+        self._buffer = bytearray()
+        self._head = b""
+        self._tail = bytearray()
+        self._file: Optional[IO[bytes]] = None
+        self.spilled = False
+
+    def write(self, text: str) -> None:
+        data = text.encode("utf-8", errors="replace")
+        if not data:
+            return
+        self.total_bytes += len(data)
+
+        if not self.spilled:
+            self._buffer.extend(data)
+            if len(self._buffer) <= self.limit:
+                return
+            self.host_path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = self.host_path.open("wb")
+            self.spilled = True
+            data = bytes(self._buffer)
+            self._head = data[: self.excerpt]
+            self._buffer = bytearray()
+
+        if self._file is not None:
+            self._file.write(data)
+        self._tail.extend(data)
+        if len(self._tail) > self.excerpt:
+            del self._tail[: len(self._tail) - self.excerpt]
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def summary(self, name: str) -> Dict[str, Any]:
+        """Return the response fields for this stream under the key ``name``."""
+        if not self.spilled:
+            return {name: self._buffer.decode("utf-8", errors="replace")}
+
+        # Never repeat bytes already shown in the head when the stream is short.
+        tail_len = min(len(self._tail), self.total_bytes - len(self._head))
+        tail = bytes(self._tail[len(self._tail) - tail_len :])
+        omitted = self.total_bytes - len(self._head) - tail_len
+        excerpt = (
+            self._head.decode("utf-8", errors="ignore")
+            + f"\n... [{omitted} bytes omitted; full {name} in {self.virtual_path}] ...\n"
+            + tail.decode("utf-8", errors="ignore")
+        )
+        return {
+            name: excerpt,
+            f"{name}_truncated": True,
+            f"{name}_path": self.virtual_path,
+            f"{name}_bytes": self.total_bytes,
+        }
+
+
+def _collect_output(
+    handle: SandboxHandle,
+    settings: Settings,
+    run_id: str,
+    name: str,
+    text: Optional[str],
+) -> Dict[str, Any]:
+    """Return ``name`` output inline, or spill it under /analysis/logs/ if too large."""
+    if text is None:
+        return {name: None}
+
+    filename = f"{run_id}.{name}.log"
+    sink = _OutputSink(
+        host_path=handle.workspace_host / _LOGS_DIR.lstrip("/") / filename,
+        virtual_path=f"{_LOGS_DIR}/{filename}",
+        limit=settings.sandbox_output_limit_bytes,
+        excerpt=settings.sandbox_output_excerpt_bytes,
+    )
+    try:
+        sink.write(text)
+    finally:
+        sink.close()
+    return sink.summary(name)
+
+
+def _artifact_payload(item: Any) -> tuple[bytes, str, Optional[int], Optional[int]]:
+    """Extract (content, extension, width, height) from a plot or artifact object."""
+    if isinstance(item, dict):
+        content = item.get("content_base64", item.get("content", item.get("data", b"")))
+        fmt = item.get("format") or Path(str(item.get("name", ""))).suffix.lstrip(".")
+        width, height = item.get("width"), item.get("height")
+    else:
+        content = getattr(item, "content_base64", item)
+        fmt = getattr(item, "format", None)
+        width, height = getattr(item, "width", None), getattr(item, "height", None)
+
+    if isinstance(content, str):
+        try:
+            data = base64.b64decode(content, validate=True)
+        except (binascii.Error, ValueError):
+            data = content.encode("utf-8")
+    else:
+        data = bytes(content)
+
+    ext = str(getattr(fmt, "value", fmt) or "bin").lower()
+    return data, ext, width, height
+
+
+def _downscale(data: bytes, ext: str, max_dim: int) -> tuple[bytes, Optional[int], Optional[int]]:
+    """Shrink a raster image so its longest side is at most ``max_dim`` pixels.
+
+    Images that cannot be decoded (truncated, unsupported, decompression bombs)
+    are kept as they are: the run already happened and its result must survive.
+    """
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            if max(image.size) > max_dim:
+                image.thumbnail((max_dim, max_dim))
+                fmt = "PNG" if ext == "png" else "JPEG"
+                if fmt == "JPEG" and image.mode not in ("RGB", "L"):
+                    image = image.convert("RGB")
+                buffer = io.BytesIO()
+                image.save(buffer, format=fmt, optimize=True)
+                return buffer.getvalue(), image.width, image.height
+            return data, image.width, image.height
+    except Exception:
+        logger.warning("Could not downscale %s artifact; storing it unchanged", ext, exc_info=True)
+        return (data, *_image_size(data, ext))
+
+
+def _image_size(data: bytes, ext: str) -> tuple[Optional[int], Optional[int]]:
+    """Best-effort pixel dimensions of a raster image."""
+    if ext == "png" and data[:8] == b"\x89PNG\r\n\x1a\n" and len(data) >= 24:
+        return int.from_bytes(data[16:20], "big"), int.from_bytes(data[20:24], "big")
+    if Image is not None and ext in _RASTER_FORMATS:
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                return image.width, image.height
+        except Exception:
+            return None, None
+    return None, None
+
+
+def _store_artifact(handle: SandboxHandle, settings: Settings, item: Any) -> Dict[str, Any]:
+    """Persist a plot/artifact under /analysis/artifacts/ and return a lightweight reference."""
+    data, ext, width, height = _artifact_payload(item)
+
+    if settings.sandbox_plot_max_dim and Image is not None and ext in _RASTER_FORMATS:
+        data, width, height = _downscale(data, ext, settings.sandbox_plot_max_dim)
+    elif width is None or height is None:
+        width, height = _image_size(data, ext)
+
+    digest = hashlib.sha256(data).hexdigest()
+    filename = f"{digest}.{ext}"
+    host_path = handle.workspace_host / _ARTIFACTS_DIR.lstrip("/") / filename
+    if not host_path.exists():
+        host_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = host_path.with_name(f".{filename}.{uuid4().hex}.tmp")
+        tmp_path.write_bytes(data)
+        tmp_path.replace(host_path)
+
+    return {
+        "path": f"{_ARTIFACTS_DIR}/{filename}",
+        "mime_type": mimetypes.guess_type(filename)[0] or "application/octet-stream",
+        "width": width,
+        "height": height,
+        "bytes": len(data),
+        "sha256": digest,
+    }
+
+
+def _open_handle(
+    settings: Settings,
+    lang: str = "python",
+    backend: Optional[str] = None,
+    image: Optional[str] = None,
+    libraries: Optional[list[str]] = None,
+    stateful: bool = False,
+    timeout: Optional[float] = None,
+    memory_limit_mb: Optional[int] = None,
+    cpu_limit: Optional[float] = None,
+) -> SandboxHandle:
+    """Open a sandbox session with the workspace mounted and wrap it in a handle."""
+    memory_limit_mb = memory_limit_mb or settings.sandbox_memory_limit_mb
+    cpu_limit = cpu_limit or settings.sandbox_cpu_limit
+
+    workspace_host = Path(settings.workspace_root).expanduser().resolve()
+    workspace_host.mkdir(parents=True, exist_ok=True)
+
+    if backend == _LOCAL_BACKEND:
+        if stateful:
+            raise ValueError("The local backend does not support stateful sandboxes")
+        # Requested libraries cannot be installed locally; pre-import them in
+        # the warm workers instead so the first run does not pay for it.
+        session = LocalSandboxSession(
+            workdir=str(workspace_host),
+            lang=lang,
+            pool_size=settings.sandbox_local_pool_size,
+            cpu_seconds=settings.sandbox_local_cpu_seconds,
+            memory_limit_mb=memory_limit_mb or settings.sandbox_local_memory_mb,
+            preload=libraries or (),
+        )
+        started = time.perf_counter()
+        session.__enter__()
+        return SandboxHandle(
+            session=session,
+            workspace_host=workspace_host,
+            workspace_container=str(workspace_host),
+            timeout=timeout,
+            lang=lang,
+            backend=backend,
+            startup_s=time.perf_counter() - started,
+        )
+
+    workspace_container = "/workspace"
+
+    session_kwargs: Dict[str, Any] = {
+        "lang": lang,
+        "backend": backend,
+        "image": image,
+        "libraries": libraries,
+    }
+    session_kwargs = {key: value for key, value in session_kwargs.items() if value is not None}
+
+    # Stateful sandboxes run an IPython kernel that outlives individual runs.
+    session_factory = InteractiveSandboxSession if stateful else SandboxSession
+
+    mount_kwargs = _mount_kwargs(workspace_host, workspace_container)
+    session_kwargs.update(_filter_kwargs(session_factory, mount_kwargs))
+    session_kwargs = _filter_kwargs(session_factory, session_kwargs)
+
+    # Resource caps are forwarded even when the factory only takes **kwargs
+    # (as llm-sandbox's create_session does) so they reach the container.
+    runtime_configs = _resource_runtime_configs(memory_limit_mb, cpu_limit)
+    if runtime_configs and _accepts_kwarg(session_factory, "runtime_configs"):
+        session_kwargs["runtime_configs"] = runtime_configs
+
+    session = session_factory(**session_kwargs)
+    started = time.perf_counter()
+    session.__enter__()
+
+    return SandboxHandle(
+        session=session,
+        workspace_host=workspace_host,
+        workspace_container=workspace_container,
+        stateful=stateful,
+        timeout=timeout,
+        lang=lang,
+        backend=backend,
+        image=image,
+        startup_s=time.perf_counter() - started,
+    )
+
+
+def _discard_output(stream: str, text: str) -> bool:
+    """``on_output`` for runs nobody watches: keep going."""
+    return False
+
+
+def _run_code(
+    settings: Settings,
+    sandbox_id: str,
+    handle: SandboxHandle,
+    code: str,
+    libraries: Optional[list[str]] = None,
+    timeout: Optional[float] = None,
+    on_output: Optional[OutputCallback] = None,
+    token: Optional[_RunToken] = None,
+) -> Dict[str, Any]:
+    """Run code in an open sandbox and build the execute_code response.
+
+    ``on_output`` receives output chunks while the code runs: the local backend
+    reports them itself and stateless Docker sandboxes are streamed through
+    the exec API. Other sessions (stateful kernels, non-Docker containers) pass
+    the full stdout and stderr once the run has finished. Stateless Docker runs
+    are streamed even without ``on_output`` so a timed-out run keeps the output
+    it produced.
+    """
+    effective_timeout = timeout or handle.timeout or settings.sandbox_timeout_s
+    # Install libraries as a separate step where the session supports it so
+    # install time is not reported as execution time.
+    install_separately = bool(libraries) and callable(getattr(handle.session, "install", None))
+    run_kwargs: Dict[str, Any] = {"timeout": effective_timeout}
+    if libraries is not None and not install_separately:
+        run_kwargs["libraries"] = libraries
+    run_kwargs = _filter_kwargs(handle.session.run, run_kwargs)
+    live_output = on_output is not None and _accepts_kwarg(handle.session.run, "on_output")
+    if live_output:
+        run_kwargs["on_output"] = on_output
+    stream_container = (
+        not live_output
+        and not handle.stateful
+        and "libraries" not in run_kwargs
+        and container_exec.docker_api(handle.session) is not None
+    )
+
+    token = token or _RunToken()
+    install_s: Optional[float] = None
+    with handle.lock:
+        if handle.closed:
+            return {"error": f"Sandbox {sandbox_id} was closed before the code could run"}
+        if not token.start(handle):
+            return {"error": "Execution was cancelled before it started"}
+        try:
+            if install_separately:
+                started = time.perf_counter()
+                handle.session.install(libraries)
+                install_s = time.perf_counter() - started
+            stats_before = _container_stats(handle.session)
+            started = time.perf_counter()
+            result = None
+            if stream_container:
+                result = container_exec.stream_run(
+                    handle.session, code, effective_timeout, on_output or _discard_output
+                )
+                live_output = result is not None
+            if result is None:
+                try:
+                    result = handle.session.run(code, **run_kwargs)
+                except SandboxTimeoutError:
+                    result = _recover_from_timeout(sandbox_id, handle, effective_timeout)
+            wall_s = time.perf_counter() - started
+            stats_after = _container_stats(handle.session)
+            handle.last_used = time.monotonic()
+        finally:
+            token.finish()
+
+    if on_output is not None and not live_output:
+        for name in ("stdout", "stderr"):
+            text = getattr(result, name, None)
+            if text:
+                on_output(name, text)
+
+    metrics = _run_metrics(result, wall_s, install_s, stats_before, stats_after)
+    _emit_metrics(
+        settings,
+        "sandbox.execute",
+        {"sandbox_id": sandbox_id, "backend": handle.backend, **metrics},
+    )
+
+    run_id = f"{sandbox_id[:8]}-{uuid4().hex[:12]}"
+    response: Dict[str, Any] = {}
+    response.update(_collect_output(handle, settings, run_id, "stdout", getattr(result, "stdout", None)))
+    response.update(_collect_output(handle, settings, run_id, "stderr", getattr(result, "stderr", None)))
+    response["exit_code"] = getattr(result, "exit_code", None)
+    if getattr(result, "timed_out", False):
+        response["timed_out"] = True
+    if getattr(result, "stopped", False):
+        response["stopped"] = True
+    response["workspace_container"] = handle.workspace_container
+    if hasattr(result, "plots"):
+        response["plots"] = [_store_artifact(handle, settings, plot) for plot in result.plots or []]
+    if hasattr(result, "artifacts"):
+        response["artifacts"] = [_store_artifact(handle, settings, item) for item in result.artifacts or []]
+    response["metrics"] = metrics
+    return response
+
+
+class _OutputWatcher:
+    """Forward run output to the graph's stream and watch for a stop pattern."""
+
+    def __init__(
+        self,
+        runtime: ToolRuntime,
+        sandbox_id: str,
+        stream: bool,
+        stop_pattern: Optional[Pattern[str]],
+    ) -> None:
+        self.writer = getattr(runtime, "stream_writer", None) if stream else None
+        self.sandbox_id = sandbox_id
+        self.stop_pattern = stop_pattern
+        self.match: Optional[str] = None
+        self._tails = {"stdout": "", "stderr": ""}
+        self._lock = threading.Lock()
+
+    def __call__(self, name: str, text: str) -> bool:
+        # Called from both output reader threads.
+        with self._lock:
+            if self.writer is not None:
+                try:
+                    self.writer({"type": "sandbox_output", "sandbox_id": self.sandbox_id, "stream": name, "text": text})
+                except Exception:
+                    logger.debug("Failed to stream sandbox output", exc_info=True)
+            if self.stop_pattern is None or self.match is not None:
+                return False
+            window = self._tails.get(name, "") + text
+            found = self.stop_pattern.search(window)
+            if found is not None:
+                self.match = found.group(0)
+                return True
+            self._tails[name] = window[-_STOP_WINDOW_CHARS:]
+            return False
+
+
+def _container_stats(session: Any) -> Optional[Tuple[int, Optional[int]]]:
+    """Best-effort (cumulative CPU ns, peak memory bytes) for a container session."""
+    container = getattr(session, "container", None)
+    stats = getattr(container, "stats", None)
+    if not callable(stats):
+        return None
+    try:
+        data = stats(stream=False)
+        cpu_ns = int(data["cpu_stats"]["cpu_usage"]["total_usage"])
+    except Exception:
+        logger.debug("Container stats unavailable", exc_info=True)
+        return None
+    # max_usage is only reported under cgroup v1.
+    peak = (data.get("memory_stats") or {}).get("max_usage")
+    return cpu_ns, int(peak) if peak is not None else None
+
+
+def _run_metrics(
+    result: Any,
+    wall_s: float,
+    install_s: Optional[float],
+    stats_before: Optional[Tuple[int, Optional[int]]],
+    stats_after: Optional[Tuple[int, Optional[int]]],
+) -> Dict[str, Any]:
+    """Timing and resource usage for one run; unknown values are None."""
+    cpu_s = getattr(result, "cpu_s", None)
+    peak_rss_bytes = getattr(result, "peak_rss_bytes", None)
+    if cpu_s is None and stats_before is not None and stats_after is not None:
+        cpu_s = max(stats_after[0] - stats_before[0], 0) / 1e9
+        peak_rss_bytes = stats_after[1]
+    return {
+        "wall_s": round(wall_s, 6),
+        "install_s": round(install_s, 6) if install_s is not None else None,
+        "cpu_s": round(cpu_s, 6) if cpu_s is not None else None,
+        "peak_rss_bytes": peak_rss_bytes,
+    }
+
+
+def _emit_metrics(settings: Settings, event: str, payload: Dict[str, Any]) -> None:
+    """Forward sandbox metrics to the configured hook; never fail the tool call."""
+    logger.debug("%s %s", event, payload)
+    hook = settings.sandbox_metrics_hook
+    if hook is None:
+        return
+    try:
+        hook(event, payload)
+    except Exception:
+        logger.warning("Sandbox metrics hook failed for %s", event, exc_info=True)
+
+
+class _FileHashCache:
+    """sha256 of workspace files, recomputed only when size or mtime change."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._hashes: Dict[Path, Tuple[int, int, str]] = {}
+
+    def digest(self, path: Path) -> Optional[str]:
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        with self._lock:
+            cached = self._hashes.get(path)
+        if cached is not None and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+            return cached[2]
+
+        digest = hashlib.sha256()
+        try:
+            with path.open("rb") as handle:
+                for chunk in iter(lambda: handle.read(1 << 20), b""):
+                    digest.update(chunk)
+        except OSError:
+            return None
+        with self._lock:
+            self._hashes[path] = (stat.st_size, stat.st_mtime_ns, digest.hexdigest())
+        return digest.hexdigest()
+
+
+_FILE_HASHES = _FileHashCache()
+
+
+def _referenced_files(handle: SandboxHandle, code: str) -> Dict[str, Path]:
+    """Workspace files named by string literals in ``code``.
+
+    This is a heuristic: paths assembled at runtime are not seen, so the cache
+    is opt-in and meant for cells that read fixed input files.
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return {}
+
+    root = handle.workspace_host
+    files: Dict[str, Path] = {}
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Constant) or not isinstance(node.value, str):
+            continue
+        literal = node.value
+        if not literal or len(literal) > 4096 or "\n" in literal or "\0" in literal:
+            continue
+        if literal.startswith(handle.workspace_container.rstrip("/") + "/"):
+            literal = literal[len(handle.workspace_container):]
+        candidate = root / literal.lstrip("/")
+        try:
+            resolved = candidate.resolve()
+            resolved.relative_to(root)
+        except (OSError, ValueError):
+            continue
+        if resolved.is_file():
+            files[literal] = resolved
+    return files
+
+
+def _cache_key(handle: SandboxHandle, code: str, libraries: Optional[list[str]]) -> Optional[str]:
+    """Key a run on its code, interpreter and the content of the files it names."""
+    inputs: Dict[str, str] = {}
+    for literal, path in sorted(_referenced_files(handle, code).items()):
+        digest = _FILE_HASHES.digest(path)
+        if digest is None:
+            return None
+        inputs[literal] = digest
+    payload = {
+        "code": hashlib.sha256(code.encode("utf-8")).hexdigest(),
+        "lang": handle.lang,
+        "backend": handle.backend,
+        "image": handle.image,
+        "libraries": sorted(libraries or []),
+        "inputs": inputs,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _cache_path(handle: SandboxHandle, key: str) -> Path:
+    return handle.workspace_host / _CACHE_DIR.lstrip("/") / f"{key}.json"
+
+
+def _load_cached(handle: SandboxHandle, key: str) -> Optional[Dict[str, Any]]:
+    try:
+        with _cache_path(handle, key).open("r", encoding="utf-8") as handle_file:
+            return json.load(handle_file)
+    except (OSError, ValueError):
+        return None
+
+
+def _store_cached(handle: SandboxHandle, key: str, response: Dict[str, Any]) -> None:
+    path = _cache_path(handle, key)
+    tmp_path = path.with_name(f".{path.name}.{uuid4().hex}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path.write_text(json.dumps(response), encoding="utf-8")
+        os.replace(tmp_path, path)
+    except (OSError, TypeError, ValueError):
+        logger.warning("Failed to cache execute_code result %s", key, exc_info=True)
+        tmp_path.unlink(missing_ok=True)
+
+
+@dataclass(frozen=True)
+class _TimedOutRun:
+    """Stand-in result for a container run killed after its timeout."""
+
+    stdout: str
+    stderr: str
+    exit_code: Optional[int] = None
+    timed_out: bool = True
+
+
+def _recover_from_timeout(sandbox_id: str, handle: SandboxHandle, timeout: float) -> _TimedOutRun:
+    """Stop a run that exceeded its timeout and leave the sandbox usable.
+
+    Stateful kernels are interrupted (llm-sandbox already sent SIGINT), keeping
+    their variables. Stateless containers are restarted so the runaway process
+    cannot keep burning CPU in the background.
+    """
+    message = f"Execution timed out after {timeout} seconds and was stopped."
+    if handle.stateful:
+        return _TimedOutRun(stdout="", stderr=f"{message} Kernel state was kept.")
+
+    logger.warning("Restarting sandbox %s after a timed-out run", sandbox_id)
+    try:
+        handle.session.close()
+        handle.session.open()
+    except Exception:
+        logger.warning("Failed to restart sandbox %s", sandbox_id, exc_info=True)
+        return _TimedOutRun(stdout="", stderr=f"{message} The sandbox could not be restarted; delete it.")
+    return _TimedOutRun(stdout="", stderr=f"{message} The sandbox was restarted.")
+
+
+def _interrupt_handle(handle: SandboxHandle) -> bool:
+    """Stop the code running in a sandbox, if its session supports it."""
+    if handle.stateful:
+        interrupt = getattr(handle.session, "_interrupt_runner", None)
+    else:
+        # LocalSandboxSession kills in-flight workers; Docker containers have
+        # their processes killed through the exec API.
+        interrupt = getattr(handle.session, "interrupt", None)
+        if interrupt is None:
+            return container_exec.kill_processes(handle.session)
+    if interrupt is None:
+        return False
+    interrupt()
+    return True
+
+
+class BatchJob(TypedDict, total=False):
+    """One execute_code_batch job: code plus either a sandbox_id or a sandbox spec."""
+
+    code: Required[str]
+    sandbox_id: str
+    lang: str
+    backend: str
+    image: str
+    libraries: list[str]
+    timeout: float
+
+
+_SpecKey = Tuple[str, Optional[str], Optional[str], Tuple[str, ...]]
+
+
+class _BatchPool:
+    """Sandboxes opened for spec jobs of one batch, reused across jobs with the same spec."""
+
+    def __init__(self, settings: Settings) -> None:
+        self.settings = settings
+        self._idle: Dict[_SpecKey, List[Tuple[str, SandboxHandle]]] = {}
+        self._all: List[Tuple[str, SandboxHandle]] = []
+        self._lock = threading.Lock()
+
+    def acquire(self, job: BatchJob) -> Tuple[_SpecKey, str, SandboxHandle]:
+        key: _SpecKey = (
+            job.get("lang", "python"),
+            job.get("backend"),
+            job.get("image"),
+            tuple(job.get("libraries") or ()),
+        )
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                sandbox_id, handle = idle.pop()
+                return key, sandbox_id, handle
+
+        lang, backend, image, libraries = key
+        handle = _open_handle(self.settings, lang, backend, image, list(libraries) or None)
+        sandbox_id = uuid4().hex
+        with self._lock:
+            self._all.append((sandbox_id, handle))
+        return key, sandbox_id, handle
+
+    def release(self, key: _SpecKey, sandbox_id: str, handle: SandboxHandle) -> None:
+        with self._lock:
+            self._idle.setdefault(key, []).append((sandbox_id, handle))
+
+    def close(self) -> None:
+        with self._lock:
+            handles, self._all, self._idle = self._all, [], {}
+        for sandbox_id, handle in handles:
+            _close_handle(sandbox_id, handle)
+
+
 # --------------------------------------------------------------------------------------
 # Tool descriptions (fixed)
 # --------------------------------------------------------------------------------------
@@ -64,14 +985,22 @@ _CREATE_SANDBOX_DESC = """Create a persistent llm-sandbox session and return its
 
 Args:
 - lang: language runtime (default: python)
-- backend: optional sandbox backend identifier
+- backend: optional sandbox backend identifier; "local" runs Python in local
+  worker processes (trusted deployments only, no package installation)
 - image: optional container image identifier
 - libraries: optional list of libraries to preinstall or enable
+- stateful: keep a persistent Python kernel so variables, imports and loaded
+  data survive between execute_code calls (default: false)
+- timeout: default wall-clock limit in seconds for each run in this sandbox
+- memory_limit_mb: optional memory cap for the sandbox
+- cpu_limit: optional CPU cap in cores (container backends)
 
 Returns:
 - sandbox_id
 - workspace_host
 - workspace_container
+- stateful
+- metrics: {startup_s} seconds spent starting the sandbox
 """
 
 _DELETE_SANDBOX_DESC = """Close a previously created llm-sandbox session.
@@ -87,26 +1016,95 @@ Returns:
 
 _EXECUTE_CODE_DESC = """Execute code in a running sandbox.
 
+In a stateful sandbox, variables, imports and loaded data from earlier calls
+remain available.
+
 Args:
 - sandbox_id: identifier returned by create_sandbox
 - code: code string to execute
 - libraries: optional list of libraries for this run
+- timeout: optional wall-clock limit in seconds for this run (overrides the
+  sandbox default)
+- cache: reuse the result of an identical earlier run (same code, sandbox
+  image/libraries and unchanged input files named in the code); only
+  successful runs in stateless sandboxes are cached. Do not cache code whose
+  side effects you need. Defaults to the configured setting (off)
+- stream: send stdout/stderr chunks to the caller as they are produced
+  (default: false)
+- stop_pattern: optional regex (e.g. "Traceback") that stops the run as soon
+  as it appears in stdout or stderr
 
 Returns:
 - stdout, stderr, exit_code, workspace_container
-- plots (if provided)
-- artifacts (if provided)
+- timed_out: true if the run was stopped at its timeout; stdout/stderr then
+  hold whatever output is available
+- Output larger than the configured limit is saved under /analysis/logs/; the
+  response then holds a head/tail excerpt plus stdout_path/stderr_path,
+  stdout_bytes/stderr_bytes and stdout_truncated/stderr_truncated
+- plots, artifacts (if provided): saved under /analysis/artifacts/ and returned
+  as references {path, mime_type, width, height, bytes, sha256}; read the file
+  only when you need its content
+- metrics: {wall_s, install_s, cpu_s, peak_rss_bytes}; install_s is library
+  installation time, wall_s the run itself; null where the backend cannot
+  measure a value
+- cached: true if the result was served from the execution cache
+- stop_match: the text that matched stop_pattern; stopped: true if the run was
+  terminated because of it. The local backend and stateless Docker sandboxes
+  stream and stop immediately; stateful sandboxes and other container
+  backends send their output in one chunk after the run and only report the
+  match
+"""
+
+_RESET_SANDBOX_DESC = """Clear the interpreter state of a stateful sandbox.
+
+Args:
+- sandbox_id: identifier returned by create_sandbox(stateful=True)
+- hard: restart the kernel process instead of clearing its namespace (default: false)
+
+Returns:
+- reset: bool
+- sandbox_id (if reset)
+- error (if not reset)
+"""
+
+_INTERRUPT_SANDBOX_DESC = """Interrupt the code currently running in a stateful sandbox.
+
+The kernel and its variables are kept; the running cell fails with KeyboardInterrupt.
+
+Args:
+- sandbox_id: identifier returned by create_sandbox(stateful=True)
+
+Returns:
+- interrupted: bool
+- sandbox_id (if interrupted)
+- error (if not interrupted)
+"""
+
+_EXECUTE_CODE_BATCH_DESC = """Execute several independent code jobs in parallel.
+
+Use this for parameter sweeps or unrelated analyses instead of many serial
+execute_code calls.
+
+Args:
+- jobs: list of {code, sandbox_id} to run in an existing sandbox, or
+  {code, lang, backend, image, libraries} to run in a temporary sandbox that
+  is pooled for the batch and closed afterwards; each job may set a timeout
+- max_concurrency: optional cap on parallel jobs (default: configured limit or CPU count)
+
+Returns:
+- results: one entry per job, in input order, with the execute_code fields
+  (stdout, stderr, exit_code, ...) plus job index, or error
 """
 
 _LIST_SANDBOXES_DESC = """List active sandboxes and their workspace mappings.
 
 Returns:
-- sandboxes: list of {sandbox_id, workspace_host, workspace_container}
+- sandboxes: list of {sandbox_id, workspace_host, workspace_container, stateful}
 """
 
 
 # --------------------------------------------------------------------------------------
-# Tool implementations (SYNC ONLY, runtime-aware)
+# Tool implementations (sync, runtime-aware)
 # --------------------------------------------------------------------------------------
 
 def _create_sandbox(
@@ -115,40 +1113,42 @@ def _create_sandbox(
     backend: Optional[str] = None,
     image: Optional[str] = None,
     libraries: Optional[list[str]] = None,
+    stateful: bool = False,
+    timeout: Optional[float] = None,
+    memory_limit_mb: Optional[int] = None,
+    cpu_limit: Optional[float] = None,
 ) -> Dict[str, Any]:
     """Create a persistent llm-sandbox session and return its identifier."""
     settings = get_settings(runtime)
 
-    workspace_host = Path(settings.workspace_root).expanduser().resolve()
-    workspace_host.mkdir(parents=True, exist_ok=True)
-    workspace_container = "/workspace"
-
-    session_kwargs: Dict[str, Any] = {
-        "lang": lang,
-        "backend": backend,
-        "image": image,
-        "libraries": libraries,
-    }
-    session_kwargs = {key: value for key, value in session_kwargs.items() if value is not None}
-
-    mount_kwargs = _mount_kwargs(workspace_host, workspace_container)
-    session_kwargs.update(_filter_kwargs(SandboxSession, mount_kwargs))
-    session_kwargs = _filter_kwargs(SandboxSession, session_kwargs)
-
-    session = SandboxSession(**session_kwargs)
-    session.__enter__()
+    handle = _open_handle(
+        settings,
+        lang,
+        backend,
+        image,
+        libraries,
+        stateful,
+        timeout=timeout,
+        memory_limit_mb=memory_limit_mb,
+        cpu_limit=cpu_limit,
+    )
 
     sandbox_id = uuid4().hex
-    _SANDBOXES[sandbox_id] = SandboxHandle(
-        session=session,
-        workspace_host=workspace_host,
-        workspace_container=workspace_container,
+    _SANDBOXES.configure(
+        idle_timeout=settings.sandbox_idle_timeout_s,
+        max_live=settings.sandbox_max_live,
     )
+    _SANDBOXES.add(sandbox_id, handle)
+
+    metrics = {"startup_s": round(handle.startup_s, 6) if handle.startup_s is not None else None}
+    _emit_metrics(settings, "sandbox.create", {"sandbox_id": sandbox_id, "backend": backend, **metrics})
 
     return {
         "sandbox_id": sandbox_id,
-        "workspace_host": str(workspace_host),
-        "workspace_container": workspace_container,
+        "workspace_host": str(handle.workspace_host),
+        "workspace_container": handle.workspace_container,
+        "stateful": stateful,
+        "metrics": metrics,
     }
 
 
@@ -156,11 +1156,13 @@ def _delete_sandbox(runtime: ToolRuntime, sandbox_id: str) -> Dict[str, Any]:
     """Close a previously created llm-sandbox session."""
     _ = get_settings(runtime)
 
-    handle = _SANDBOXES.pop(sandbox_id, None)
+    handle = _SANDBOXES.pop(sandbox_id)
     if handle is None:
         return {"deleted": False, "error": f"No sandbox found for id {sandbox_id}"}
 
-    handle.session.__exit__(None, None, None)
+    # Runs already in progress on this sandbox finish first.
+    with handle.lock:
+        _close_handle(sandbox_id, handle)
     return {"deleted": True, "sandbox_id": sandbox_id}
 
 
@@ -169,32 +1171,141 @@ def _execute_code(
     sandbox_id: str,
     code: str,
     libraries: Optional[list[str]] = None,
+    timeout: Optional[float] = None,
+    cache: Optional[bool] = None,
+    stream: bool = False,
+    stop_pattern: Optional[str] = None,
 ) -> Dict[str, Any]:
     """Execute code in a running sandbox and return stdout/stderr/exit_code."""
-    _ = get_settings(runtime)
+    return _execute(runtime, sandbox_id, code, libraries, timeout, cache, stream, stop_pattern)
+
+
+def _execute(
+    runtime: ToolRuntime,
+    sandbox_id: str,
+    code: str,
+    libraries: Optional[list[str]] = None,
+    timeout: Optional[float] = None,
+    cache: Optional[bool] = None,
+    stream: bool = False,
+    stop_pattern: Optional[str] = None,
+    token: Optional[_RunToken] = None,
+) -> Dict[str, Any]:
+    """execute_code, optionally tied to a ``_RunToken`` the caller can cancel."""
+    settings = get_settings(runtime)
 
     handle = _SANDBOXES.get(sandbox_id)
     if handle is None:
         return {"error": f"No sandbox found for id {sandbox_id}"}
 
-    run_kwargs: Dict[str, Any] = {"libraries": libraries} if libraries is not None else {}
-    run_kwargs = _filter_kwargs(handle.session.run, run_kwargs)
+    try:
+        compiled_stop = re.compile(stop_pattern) if stop_pattern else None
+    except re.error as exc:
+        return {"error": f"Invalid stop_pattern: {exc}"}
+    watcher = _OutputWatcher(runtime, sandbox_id, stream, compiled_stop) if stream or compiled_stop else None
 
-    result = handle.session.run(code, **run_kwargs)
+    # Stateful runs depend on kernel state the key cannot see, so never cache them.
+    use_cache = settings.sandbox_cache_enabled if cache is None else cache
+    key = _cache_key(handle, code, libraries) if use_cache and not handle.stateful else None
+    if key is not None:
+        cached = _load_cached(handle, key)
+        if cached is not None:
+            _emit_metrics(settings, "sandbox.cache_hit", {"sandbox_id": sandbox_id, "backend": handle.backend})
+            return {**cached, "cached": True}
 
-    response: Dict[str, Any] = {
-        "stdout": getattr(result, "stdout", None),
-        "stderr": getattr(result, "stderr", None),
-        "exit_code": getattr(result, "exit_code", None),
-        "workspace_container": handle.workspace_container,
-    }
-    if hasattr(result, "plots"):
-        response["plots"] = getattr(result, "plots")
-    if hasattr(result, "artifacts"):
-        response["artifacts"] = getattr(result, "artifacts")
+    token = token or _RunToken()
+    response = _run_code(settings, sandbox_id, handle, code, libraries, timeout, on_output=watcher, token=token)
+    if watcher is not None and watcher.match is not None:
+        response["stop_match"] = watcher.match
+    if token.cancelled:
+        return response
+    if key is not None and response.get("exit_code") == 0 and not response.get("timed_out"):
+        _store_cached(handle, key, response)
     return response
 
 
+def _execute_code_batch(
+    runtime: ToolRuntime,
+    jobs: list[BatchJob],
+    max_concurrency: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Run independent code jobs in parallel across sandboxes."""
+    settings = get_settings(runtime)
+
+    if not jobs:
+        return {"results": []}
+
+    limit = max_concurrency or settings.sandbox_batch_concurrency or os.cpu_count() or 1
+    pool = _BatchPool(settings)
+
+    def run_job(index: int, job: BatchJob) -> Dict[str, Any]:
+        try:
+            sandbox_id = job.get("sandbox_id")
+            if sandbox_id:
+                handle = _SANDBOXES.get(sandbox_id)
+                if handle is None:
+                    return {"job": index, "error": f"No sandbox found for id {sandbox_id}"}
+                result = _run_code(
+                    settings, sandbox_id, handle, job["code"], job.get("libraries"), job.get("timeout")
+                )
+                return {"job": index, "sandbox_id": sandbox_id, **result}
+
+            key, pooled_id, handle = pool.acquire(job)
+            try:
+                result = _run_code(
+                    settings, pooled_id, handle, job["code"], job.get("libraries"), job.get("timeout")
+                )
+            finally:
+                pool.release(key, pooled_id, handle)
+            return {"job": index, **result}
+        except Exception as exc:
+            logger.warning("Batch job %d failed", index, exc_info=True)
+            return {"job": index, "error": f"{type(exc).__name__}: {exc}"}
+
+    try:
+        with ThreadPoolExecutor(
+            max_workers=min(limit, len(jobs)), thread_name_prefix="sandbox-batch"
+        ) as executor:
+            results = list(executor.map(run_job, range(len(jobs)), jobs))
+    finally:
+        pool.close()
+    return {"results": results}
+
+
+def _reset_sandbox(runtime: ToolRuntime, sandbox_id: str, hard: bool = False) -> Dict[str, Any]:
+    """Clear the interpreter state of a stateful sandbox."""
+    _ = get_settings(runtime)
+
+    handle = _SANDBOXES.get(sandbox_id)
+    if handle is None:
+        return {"reset": False, "error": f"No sandbox found for id {sandbox_id}"}
+    if not handle.stateful:
+        return {"reset": False, "error": f"Sandbox {sandbox_id} is not stateful; every run already starts fresh"}
+
+    with handle.lock:
+        if hard:
+            handle.session.close()
+            handle.session.open()
+            return {"reset": True, "sandbox_id": sandbox_id}
+        result = handle.session.run("%reset -f")
+    if getattr(result, "exit_code", 0) != 0:
+        return {"reset": False, "error": getattr(result, "stderr", None) or "Kernel reset failed"}
+    return {"reset": True, "sandbox_id": sandbox_id}
+
+
+def _interrupt_sandbox(runtime: ToolRuntime, sandbox_id: str) -> Dict[str, Any]:
+    """Interrupt the code currently running in a stateful sandbox."""
+    _ = get_settings(runtime)
+
+    handle = _SANDBOXES.get(sandbox_id)
+    if handle is None:
+        return {"interrupted": False, "error": f"No sandbox found for id {sandbox_id}"}
+
+    if not _interrupt_handle(handle):
+        return {"interrupted": False, "error": f"Sandbox {sandbox_id} does not support interrupts"}
+    return {"interrupted": True, "sandbox_id": sandbox_id}
+
+
 def _list_sandboxes(runtime: ToolRuntime) -> Dict[str, Any]:
     """List active sandboxes and their workspace mappings."""
     _ = get_settings(runtime)
@@ -205,12 +1316,142 @@ def _list_sandboxes(runtime: ToolRuntime) -> Dict[str, Any]:
                 "sandbox_id": sandbox_id,
                 "workspace_host": str(handle.workspace_host),
                 "workspace_container": handle.workspace_container,
+                "stateful": handle.stateful,
             }
             for sandbox_id, handle in _SANDBOXES.items()
         ]
     }
 
 
+# --------------------------------------------------------------------------------------
+# Async tool implementations
+# --------------------------------------------------------------------------------------
+
+# Dedicated pool for blocking session calls so long runs do not starve the
+# event loop's default executor used by other tools.
+_ASYNC_EXECUTOR = ThreadPoolExecutor(thread_name_prefix="sandbox-async")
+
+
+def _emit_progress(runtime: ToolRuntime, tool: str, status: str, **payload: Any) -> None:
+    """Send a progress event on the graph's custom stream, if one is attached."""
+    writer = getattr(runtime, "stream_writer", None)
+    if writer is None:
+        return
+    try:
+        writer({"type": "sandbox_progress", "tool": tool, "status": status, **payload})
+    except Exception:
+        logger.debug("Failed to emit sandbox progress event", exc_info=True)
+
+
+async def _offload(
+    runtime: ToolRuntime,
+    tool: str,
+    call: Callable[[], Dict[str, Any]],
+    on_cancel: Callable[["Future[Dict[str, Any]]"], None],
+    *,
+    drop_queued: bool = True,
+    **payload: Any,
+) -> Dict[str, Any]:
+    """Run a blocking tool call on the sandbox executor, streaming progress.
+
+    On cancellation, work that has not started is dropped (unless
+    ``drop_queued`` is False, in which case it still runs); otherwise
+    ``on_cancel`` receives the running future so the caller can stop or clean
+    up after it. The cancellation is always re-raised.
+    """
+    work = _ASYNC_EXECUTOR.submit(call)
+    waiter = asyncio.wrap_future(work)
+    started = time.perf_counter()
+    _emit_progress(runtime, tool, "started", **payload)
+    try:
+        while True:
+            done, _ = await asyncio.wait({waiter}, timeout=_PROGRESS_INTERVAL_S)
+            if done:
+                break
+            _emit_progress(runtime, tool, "running", elapsed_s=round(time.perf_counter() - started, 3), **payload)
+    except asyncio.CancelledError:
+        _emit_progress(runtime, tool, "cancelled", **payload)
+        if not (drop_queued and work.cancel()):
+            on_cancel(work)
+        raise
+    result = waiter.result()
+    _emit_progress(runtime, tool, "finished", elapsed_s=round(time.perf_counter() - started, 3), **payload)
+    return result
+
+
+async def _acreate_sandbox(
+    runtime: ToolRuntime,
+    lang: str = "python",
+    backend: Optional[str] = None,
+    image: Optional[str] = None,
+    libraries: Optional[list[str]] = None,
+    stateful: bool = False,
+    timeout: Optional[float] = None,
+    memory_limit_mb: Optional[int] = None,
+    cpu_limit: Optional[float] = None,
+) -> Dict[str, Any]:
+    """Async create_sandbox; a sandbox finishing after cancellation is closed."""
+
+    def discard(work: "Future[Dict[str, Any]]") -> None:
+        def cleanup(done: "Future[Dict[str, Any]]") -> None:
+            if done.exception() is not None:
+                return
+            sandbox_id = done.result()["sandbox_id"]
+            handle = _SANDBOXES.pop(sandbox_id)
+            if handle is not None:
+                _close_handle(sandbox_id, handle)
+
+        work.add_done_callback(cleanup)
+
+    call = partial(
+        _create_sandbox,
+        runtime,
+        lang,
+        backend,
+        image,
+        libraries,
+        stateful,
+        timeout,
+        memory_limit_mb,
+        cpu_limit,
+    )
+    return await _offload(runtime, "create_sandbox", call, discard)
+
+
+async def _adelete_sandbox(runtime: ToolRuntime, sandbox_id: str) -> Dict[str, Any]:
+    """Async delete_sandbox; the close completes even if the caller is cancelled."""
+    call = partial(_delete_sandbox, runtime, sandbox_id)
+    # A queued delete still runs after a cancellation, so the sandbox is never leaked.
+    return await _offload(
+        runtime, "delete_sandbox", call, lambda work: None, drop_queued=False, sandbox_id=sandbox_id
+    )
+
+
+async def _aexecute_code(
+    runtime: ToolRuntime,
+    sandbox_id: str,
+    code: str,
+    libraries: Optional[list[str]] = None,
+    timeout: Optional[float] = None,
+    cache: Optional[bool] = None,
+    stream: bool = False,
+    stop_pattern: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Async execute_code; cancelling the call interrupts the running code."""
+
+    token = _RunToken()
+
+    def interrupt(work: "Future[Dict[str, Any]]") -> None:
+        if not token.cancel():
+            logger.warning(
+                "Sandbox %s cannot be interrupted; the cancelled run continues until its timeout",
+                sandbox_id,
+            )
+
+    call = partial(_execute, runtime, sandbox_id, code, libraries, timeout, cache, stream, stop_pattern, token)
+    return await _offload(runtime, "execute_code", call, interrupt, sandbox_id=sandbox_id)
+
+
 # --------------------------------------------------------------------------------------
 # Public tool objects (ONLY exports)
 # --------------------------------------------------------------------------------------
@@ -219,18 +1460,39 @@ create_sandbox = StructuredTool.from_function(
     name="create_sandbox",
     description=_CREATE_SANDBOX_DESC,
     func=_create_sandbox,
+    coroutine=_acreate_sandbox,
 )
 
 delete_sandbox = StructuredTool.from_function(
     name="delete_sandbox",
     description=_DELETE_SANDBOX_DESC,
     func=_delete_sandbox,
+    coroutine=_adelete_sandbox,
 )
 
 execute_code = StructuredTool.from_function(
     name="execute_code",
     description=_EXECUTE_CODE_DESC,
     func=_execute_code,
+    coroutine=_aexecute_code,
+)
+
+execute_code_batch = StructuredTool.from_function(
+    name="execute_code_batch",
+    description=_EXECUTE_CODE_BATCH_DESC,
+    func=_execute_code_batch,
+)
+
+reset_sandbox = StructuredTool.from_function(
+    name="reset_sandbox",
+    description=_RESET_SANDBOX_DESC,
+    func=_reset_sandbox,
+)
+
+interrupt_sandbox = StructuredTool.from_function(
+    name="interrupt_sandbox",
+    description=_INTERRUPT_SANDBOX_DESC,
+    func=_interrupt_sandbox,
 )
 
 list_sandboxes = StructuredTool.from_function(
@@ -243,5 +1505,8 @@ __all__ = [
     "create_sandbox",
     "delete_sandbox",
     "execute_code",
+    "execute_code_batch",
+    "reset_sandbox",
+    "interrupt_sandbox",
     "list_sandboxes",
 ]
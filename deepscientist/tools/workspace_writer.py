@@ -0,0 +1,157 @@
+"""Incremental, append-only writes to workspace files.
+
+``WorkspaceWriter`` streams chunks to the end of a file without rereading or
+rewriting what is already there. ``fsync`` calls are batched with a
+``SyncBatcher``: the first write to a file is synced right away, later ones
+once enough bytes are pending or the interval since the last sync has passed.
+Bytes still pending at the end of a burst are synced by a timer when the
+interval runs out, and writers sync on close unless told not to.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Pending bytes that force an fsync regardless of the interval.
+SYNC_MAX_BYTES = 4 << 20
+
+
+class SyncBatcher:
+    """Decide when pending writes to a file should be fsynced.
+
+    Shared between writers so that bursts of small appends to the same file,
+    e.g. one tool call per log entry, result in one fsync per interval. Keys
+    are file paths: writes left pending are fsynced through the path by a
+    timer once the interval has passed.
+    """
+
+    def __init__(self, interval_s: float, max_bytes: int = SYNC_MAX_BYTES) -> None:
+        self.interval_s = interval_s
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # key -> (pending bytes, monotonic time of the last sync)
+        self._state: Dict[str, Tuple[int, float]] = {}
+        self._timers: Dict[str, threading.Timer] = {}
+
+    def record(self, key: str, written: int) -> bool:
+        """Add ``written`` pending bytes for ``key``; return True if a sync is due."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._state.get(key)
+            pending = written + (entry[0] if entry is not None else 0)
+            # A file that was never synced is due right away.
+            if entry is None or pending >= self.max_bytes or now - entry[1] >= self.interval_s:
+                self._state[key] = (0, now)
+                return True
+            self._state[key] = (pending, entry[1])
+            if key not in self._timers:
+                timer = threading.Timer(entry[1] + self.interval_s - now, self._deferred_sync, args=(key,))
+                timer.daemon = True
+                self._timers[key] = timer
+                timer.start()
+            return False
+
+    def synced(self, key: str) -> None:
+        with self._lock:
+            self._state[key] = (0, time.monotonic())
+            timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+
+    def flush(self) -> None:
+        """Sync every file with pending writes now."""
+        with self._lock:
+            keys = [key for key, (pending, _) in self._state.items() if pending]
+        for key in keys:
+            self._deferred_sync(key)
+
+    def _deferred_sync(self, key: str) -> None:
+        with self._lock:
+            timer = self._timers.pop(key, None)
+            pending, _ = self._state.get(key, (0, 0.0))
+            if not pending:
+                return
+            self._state[key] = (0, time.monotonic())
+        if timer is not None:
+            timer.cancel()  # No-op when called from the timer itself.
+        try:
+            fd = os.open(key, os.O_RDONLY | getattr(os, "O_NOFOLLOW", 0))
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        except OSError:
+            logger.warning("Deferred fsync of %s failed", key, exc_info=True)
+
+
+class WorkspaceWriter:
+    """Append text to a file chunk by chunk, fsyncing in batches.
+
+    Use as a context manager; ``close`` flushes and fsyncs whatever is pending.
+    With ``truncate=True`` the file is emptied first, which turns the writer
+    into a streaming replacement for a whole-file write.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        truncate: bool = False,
+        batcher: Optional[SyncBatcher] = None,
+        sync_on_close: bool = True,
+    ) -> None:
+        self.path = path
+        self.batcher = batcher or SyncBatcher(interval_s=1.0)
+        self.sync_on_close = sync_on_close
+        self.bytes_written = 0
+        self._key = str(path)
+        self._dirty = False
+        path.parent.mkdir(parents=True, exist_ok=True)
+        flags = os.O_WRONLY | os.O_CREAT | os.O_APPEND | getattr(os, "O_NOFOLLOW", 0)
+        if truncate:
+            flags |= os.O_TRUNC
+        self._fd = os.open(path, flags, 0o644)
+
+    def __enter__(self) -> "WorkspaceWriter":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def write(self, chunk: str) -> int:
+        """Append ``chunk`` and return the number of bytes written."""
+        data = chunk.encode("utf-8")
+        view = memoryview(data)
+        while view:
+            written = os.write(self._fd, view)
+            view = view[written:]
+        self.bytes_written += len(data)
+        self._dirty = True
+        if self.batcher.record(self._key, len(data)):
+            self.sync()
+        return len(data)
+
+    def sync(self) -> None:
+        os.fsync(self._fd)
+        self._dirty = False
+        self.batcher.synced(self._key)
+
+    def close(self) -> None:
+        if self._fd < 0:
+            return
+        try:
+            if self._dirty and self.sync_on_close:
+                self.sync()
+        finally:
+            os.close(self._fd)
+            self._fd = -1
+
+
+__all__ = ["SyncBatcher", "WorkspaceWriter"]
@@ -0,0 +1,253 @@
+"""Unit tests for dataset tool functions.
+
+These tests run the ingestion tools against small files in a temporary
+workspace and require the optional ``datasets`` dependencies.
+"""
+
+import json
+
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+
+# Check if the dataset tools and their optional dependencies can be imported
+try:
+    import pandas as pd
+    import pyarrow.parquet as pq
+    import deepscientist.tools.datasets as datasets_module
+    from deepscientist.settings import Settings
+    DATASETS_AVAILABLE = True
+except ImportError as e:
+    DATASETS_AVAILABLE = False
+    DATASETS_IMPORT_ERROR = str(e)
+
+
+pytestmark = pytest.mark.skipif(
+    not DATASETS_AVAILABLE,
+    reason=f"Dataset tools import failed: {DATASETS_IMPORT_ERROR if not DATASETS_AVAILABLE else ''}"
+)
+
+
+@pytest.fixture
+def runtime(tmp_path):
+    """Provide a tool runtime carrying Settings rooted at a temp workspace."""
+    with patch.object(Settings, "_try_load_dotenv_from_project_root"):
+        settings = Settings(workspace_root=str(tmp_path))
+    return SimpleNamespace(context={"settings": settings}, tool_call_id="call-1")
+
+
+class TestIngestDataset:
+    """Tests for ingest_dataset."""
+
+    def test_csv_is_converted_with_schema(self, runtime, tmp_path):
+        """A CSV should become a typed Parquet file plus a schema sidecar."""
+        (tmp_path / "uploads").mkdir()
+        (tmp_path / "uploads" / "Sales 2024.csv").write_text("region,units,price\nnorth,3,1.5\nsouth,4,2.0\n")
+
+        result = datasets_module._ingest_dataset(runtime, "/uploads/Sales 2024.csv")
+
+        assert result["dataset"] == "sales-2024"
+        assert result["cached"] is False
+        table = result["tables"][0]
+        assert table["path"] == "/datasets/sales-2024.parquet"
+        assert table["rows"] == 2
+        assert [(column["name"], column["type"]) for column in table["columns"]] == [
+            ("region", "string"),
+            ("units", "int64"),
+            ("price", "double"),
+        ]
+        assert pq.read_table(tmp_path / "datasets" / "sales-2024.parquet", columns=["units"]).column(0).to_pylist() == [3, 4]
+        stored = json.loads((tmp_path / "datasets" / "sales-2024.schema.json").read_text())
+        assert stored["tables"] == result["tables"]
+
+    def test_unchanged_file_is_not_converted_again(self, runtime, tmp_path):
+        """Re-ingesting an unchanged file should return the stored result."""
+        (tmp_path / "data.csv").write_text("a\n1\n")
+        datasets_module._ingest_dataset(runtime, "/data.csv")
+
+        with patch.object(datasets_module, "_convert") as convert:
+            result = datasets_module._ingest_dataset(runtime, "/data.csv")
+
+        convert.assert_not_called()
+        assert result["cached"] is True
+
+    def test_late_type_conflict_falls_back_to_strings(self, runtime, tmp_path, monkeypatch):
+        """A value that breaks the inferred type in a later block should not fail ingestion."""
+        monkeypatch.setattr(datasets_module, "_CSV_BLOCK_SIZE", 1 << 10)
+        (tmp_path / "ids.csv").write_text("id,value\n" + "1,2\n" * 2000 + "x-1,3\n")
+
+        result = datasets_module._ingest_dataset(runtime, "/ids.csv")
+
+        columns = {column["name"]: column["type"] for column in result["tables"][0]["columns"]}
+        assert columns == {"id": "string", "value": "int64"}
+        assert result["tables"][0]["rows"] == 2001
+
+    def test_excel_sheets_become_separate_tables(self, runtime, tmp_path):
+        """Each sheet of a workbook should be ingested as its own table."""
+        pytest.importorskip("openpyxl")
+        with pd.ExcelWriter(tmp_path / "book.xlsx") as writer:
+            pd.DataFrame({"x": [1, 2]}).to_excel(writer, sheet_name="Raw Data", index=False)
+            pd.DataFrame({"y": ["a"]}).to_excel(writer, sheet_name="Notes", index=False)
+
+        result = datasets_module._ingest_dataset(runtime, "/book.xlsx")
+
+        assert [table["path"] for table in result["tables"]] == [
+            "/datasets/book--raw-data.parquet",
+            "/datasets/book--notes.parquet",
+        ]
+
+    def test_rejects_unsupported_and_traversal_paths(self, runtime, tmp_path):
+        """Unsupported types and paths escaping the workspace should return errors."""
+        (tmp_path / "notes.docx").write_text("x")
+
+        assert "Unsupported file type" in datasets_module._ingest_dataset(runtime, "/notes.docx")["error"]
+        assert "traversal" in datasets_module._ingest_dataset(runtime, "/../etc/passwd")["error"]
+
+    def test_refuses_symlink_escape(self, runtime, tmp_path):
+        """A symlinked directory cannot expose files outside the workspace."""
+        outside = tmp_path.parent / f"{tmp_path.name}-outside"
+        outside.mkdir()
+        (outside / "secret.csv").write_text("a,b\n1,2\n")
+        (tmp_path / "link").symlink_to(outside)
+
+        for tool in (datasets_module._ingest_dataset, datasets_module._profile_dataset):
+            assert "outside the workspace" in tool(runtime, "/link/secret.csv")["error"]
+        assert not (tmp_path / "datasets").exists()
+
+
+class TestProfileDataset:
+    """Tests for profile_dataset."""
+
+    def test_profile_statistics(self, runtime, tmp_path):
+        """The profile should report counts, null rates, ranges and sketches."""
+        values = list(range(1, 1001))
+        frame = pd.DataFrame({"n": values, "group": [f"g{i % 10}" if i % 4 else None for i in values]})
+        frame.to_csv(tmp_path / "data.csv", index=False)
+
+        result = datasets_module._profile_dataset(runtime, "/data.csv")
+
+        assert result["rows"] == 1000
+        n, group = result["columns"]
+        assert (n["min"], n["max"], n["null_rate"]) == (1, 1000, 0.0)
+        assert 450 <= n["approx_quantiles"]["p50"] <= 550
+        assert 950 <= n["approx_distinct"] <= 1050
+        assert group["null_rate"] == pytest.approx(0.25)
+        assert group["approx_distinct"] in range(8, 12)
+        assert group["approx_quantiles"]["p50"] is None
+
+    def test_profile_section_preserves_notes(self, runtime, tmp_path):
+        """Re-profiling should replace only the generated section of the notes."""
+        (tmp_path / "data.jsonl").write_text('{"a": 1}\n{"a": 2}\n')
+        notes = tmp_path / "datasets" / "data.md"
+        notes.parent.mkdir()
+        notes.write_text("# Data\n\nHand-written description.\n")
+
+        datasets_module._profile_dataset(runtime, "/data.jsonl")
+        (tmp_path / "data.jsonl").write_text('{"a": 1}\n{"a": 2}\n{"a": 3}\n')
+        result = datasets_module._profile_dataset(runtime, "/data.jsonl")
+
+        text = notes.read_text()
+        assert result["notes_path"] == "/datasets/data.md"
+        assert "Hand-written description." in text
+        assert text.count(datasets_module._PROFILE_START) == 1
+        assert "rows: 3" in text
+
+    def test_profile_uses_ingested_parquet(self, runtime, tmp_path):
+        """An up-to-date ingestion should be profiled from its Parquet copy."""
+        (tmp_path / "data.csv").write_text("a\n1\n2\n")
+        datasets_module._ingest_dataset(runtime, "/data.csv")
+
+        with patch.object(datasets_module, "_profile_source", wraps=datasets_module._profile_source) as profile:
+            datasets_module._profile_dataset(runtime, "/data.csv")
+
+        assert profile.call_args.args[:2] == ("parquet", tmp_path.resolve() / "datasets" / "data.parquet")
+
+    def test_excel_sheet_is_streamed(self, runtime, tmp_path):
+        """Excel sheets should be profiled through the streaming reader."""
+        pytest.importorskip("openpyxl")
+        with pd.ExcelWriter(tmp_path / "book.xlsx") as writer:
+            pd.DataFrame({"x": [1, 2, 3]}).to_excel(writer, sheet_name="First", index=False)
+            pd.DataFrame({"y": [1.5, None]}).to_excel(writer, sheet_name="Second", index=False)
+
+        result = datasets_module._profile_dataset(runtime, "/book.xlsx", sheet="Second")
+
+        assert result["rows"] == 2
+        assert result["columns"][0]["name"] == "y"
+        assert result["columns"][0]["null_rate"] == 0.5
+
+
+class TestQueryDataset:
+    """Tests for query_dataset."""
+
+    @pytest.fixture(autouse=True)
+    def _require_duckdb(self):
+        pytest.importorskip("duckdb")
+
+    def _write_sales(self, tmp_path):
+        datasets = tmp_path / "datasets"
+        datasets.mkdir(exist_ok=True)
+        pd.DataFrame({"region": ["n", "s", "n"], "units": [1, 2, 3]}).to_parquet(datasets / "sales-2024.parquet")
+
+    def test_aggregation_over_parquet_view(self, runtime, tmp_path):
+        """Files under /datasets/ should be queryable as views."""
+        self._write_sales(tmp_path)
+
+        result = datasets_module._query_dataset(
+            runtime, "SELECT region, sum(units) AS total FROM sales_2024 GROUP BY region ORDER BY region"
+        )
+
+        assert result["columns"] == ["region", "total"]
+        assert result["rows"] == [["n", 4], ["s", 2]]
+        assert result["truncated"] is False
+        assert result["tables"] == ["sales_2024"]
+
+    def test_rows_are_limited(self, runtime, tmp_path):
+        """Results beyond the limit should be cut off and flagged."""
+        self._write_sales(tmp_path)
+
+        result = datasets_module._query_dataset(runtime, "SELECT * FROM sales_2024", limit=2)
+
+        assert result["row_count"] == 2
+        assert result["truncated"] is True
+
+    def test_only_single_select_is_allowed(self, runtime, tmp_path):
+        """Writes and multiple statements should be rejected."""
+        self._write_sales(tmp_path)
+
+        copy = datasets_module._query_dataset(runtime, "COPY sales_2024 TO 'datasets/out.csv'")
+        multi = datasets_module._query_dataset(runtime, "SELECT 1; SELECT 2")
+
+        assert "single SELECT" in copy["error"]
+        assert "single SELECT" in multi["error"]
+        assert not (tmp_path / "datasets" / "out.csv").exists()
+
+    @pytest.mark.parametrize(
+        "path", ["datasets/sales-2024.parquet", "/datasets/sales-2024.parquet", "/datasets/*.parquet"]
+    )
+    def test_dataset_files_can_be_read_by_path(self, runtime, tmp_path, path):
+        """read_parquet on a /datasets/ path, as documented, should work under the sandboxing settings."""
+        self._write_sales(tmp_path)
+
+        result = datasets_module._query_dataset(runtime, f"SELECT sum(units) AS total FROM read_parquet('{path}')")
+
+        assert result.get("error") is None
+        assert result["rows"] == [[6]]
+
+    def test_relative_paths_cannot_escape_datasets(self, runtime, tmp_path):
+        """Path rewriting must not open files outside /datasets/."""
+        self._write_sales(tmp_path)
+        (tmp_path / "secret.csv").write_text("a\n1\n")
+
+        result = datasets_module._query_dataset(runtime, "SELECT * FROM read_csv_auto('datasets/../secret.csv')")
+
+        assert "Query failed" in result["error"]
+
+    def test_files_outside_datasets_are_not_readable(self, runtime, tmp_path):
+        """The engine should not read files outside /datasets/."""
+        self._write_sales(tmp_path)
+        (tmp_path / "secret.csv").write_text("a\n1\n")
+
+        result = datasets_module._query_dataset(runtime, f"SELECT * FROM read_csv_auto('{tmp_path / 'secret.csv'}')")
+
+        assert "Query failed" in result["error"]
@@ -0,0 +1,138 @@
+"""Unit tests for document tool functions.
+
+These tests run PDF ingestion against small generated PDFs in a temporary
+workspace and require the optional ``documents`` dependencies.
+"""
+
+import json
+
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+
+# Check if the document tools and their optional dependencies can be imported
+try:
+    import pypdf  # noqa: F401
+    import deepscientist.tools.documents as documents_module
+    from deepscientist.settings import Settings
+    DOCUMENTS_AVAILABLE = True
+except ImportError as e:
+    DOCUMENTS_AVAILABLE = False
+    DOCUMENTS_IMPORT_ERROR = str(e)
+
+
+pytestmark = pytest.mark.skipif(
+    not DOCUMENTS_AVAILABLE,
+    reason=f"Document tools import failed: {DOCUMENTS_IMPORT_ERROR if not DOCUMENTS_AVAILABLE else ''}"
+)
+
+
+def _make_pdf(path, page_texts, title="Test Document"):
+    """Write a minimal PDF with one line of Helvetica text per page."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in below
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        f"<< /Title ({title}) >>".encode(),
+    ]
+    kids = []
+    for text in page_texts:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_id = len(objects)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>".encode()
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R /Info 4 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    path.write_bytes(bytes(out))
+
+
+@pytest.fixture
+def runtime(tmp_path):
+    """Provide a tool runtime carrying Settings rooted at a temp workspace."""
+    with patch.object(Settings, "_try_load_dotenv_from_project_root"):
+        settings = Settings(workspace_root=str(tmp_path), pdf_ingest_workers=2)
+    return SimpleNamespace(context={"settings": settings}, tool_call_id="call-1")
+
+
+class TestIngestPdf:
+    """Tests for ingest_pdf."""
+
+    def test_pages_are_extracted_in_parallel_and_written(self, runtime, tmp_path):
+        """All pages should be extracted and written as JSON and text."""
+        _make_pdf(tmp_path / "Report.pdf", [f"Page number {i}" for i in range(1, 13)])
+
+        result = documents_module._ingest_pdf(runtime, "/Report.pdf")
+
+        assert result["page_count"] == 12
+        assert result["pages_extracted"] == 12
+        assert result["metadata"]["title"] == "Test Document"
+        document = json.loads((tmp_path / "datasets" / "report.pdf.json").read_text())
+        assert [page["text"] for page in document["pages"]] == [f"Page number {i}" for i in range(1, 13)]
+        text = (tmp_path / "datasets" / "report.txt").read_text()
+        assert text.startswith("--- page 1 ---\n\nPage number 1")
+        assert result["text_path"] == "/datasets/report.txt"
+
+    def test_second_run_uses_page_cache(self, runtime, tmp_path):
+        """Re-ingesting the same file should not parse any page again."""
+        _make_pdf(tmp_path / "a.pdf", ["alpha", "beta"])
+        documents_module._ingest_pdf(runtime, "/a.pdf")
+
+        with patch.object(documents_module, "_extract_page_range") as extract:
+            result = documents_module._ingest_pdf(runtime, "/a.pdf", slug="copy")
+
+        extract.assert_not_called()
+        assert (result["pages_extracted"], result["pages_cached"]) == (0, 2)
+        assert (tmp_path / "datasets" / "copy.txt").is_file()
+
+    def test_page_ranges_are_bounded(self):
+        """Missing pages should be grouped into contiguous bounded ranges."""
+        indices = [0, 1, 2, 5, 6] + list(range(10, 30))
+
+        ranges = documents_module._page_ranges(indices)
+
+        assert ranges[:2] == [(0, 3), (5, 7)]
+        assert all(stop - start <= documents_module._PAGES_PER_TASK for start, stop in ranges)
+        assert sum(stop - start for start, stop in ranges) == len(indices)
+
+    def test_rejects_missing_and_non_pdf_files(self, runtime, tmp_path):
+        """Missing files and other file types should return errors."""
+        (tmp_path / "notes.txt").write_text("x")
+
+        assert "File not found" in documents_module._ingest_pdf(runtime, "/missing.pdf")["error"]
+        assert "Not a PDF" in documents_module._ingest_pdf(runtime, "/notes.txt")["error"]
+
+    def test_refuses_symlink_escape(self, runtime, tmp_path):
+        """A symlinked directory cannot expose PDFs outside the workspace."""
+        outside = tmp_path.parent / f"{tmp_path.name}-outside"
+        outside.mkdir()
+        _make_pdf(outside / "secret.pdf", ["secret"])
+        (tmp_path / "link").symlink_to(outside)
+
+        result = documents_module._ingest_pdf(runtime, "/link/secret.pdf")
+
+        assert "outside the workspace" in result["error"]
+        assert not (tmp_path / "datasets").exists()
+
+    def test_pages_are_extracted_in_non_forking_pool(self, runtime, tmp_path):
+        """Page extraction uses worker_pool (forkserver or spawn), not a forked pool."""
+        _make_pdf(tmp_path / "a.pdf", [f"page {i}" for i in range(1, 13)])
+
+        with patch.object(documents_module, "worker_pool", wraps=documents_module.worker_pool) as pool:
+            result = documents_module._ingest_pdf(runtime, "/a.pdf")
+
+        pool.assert_called_once_with(2)
+        assert result["pages_extracted"] == 12
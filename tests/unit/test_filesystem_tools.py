@@ -0,0 +1,610 @@
+"""Unit tests for filesystem tool functions.
+
+These tests run the filesystem tools against a temporary workspace.
+"""
+
+import os
+import threading
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+
+# Check if the filesystem tools can be imported
+try:
+    import deepscientist.backends.dir_cache as dir_cache
+    import deepscientist.tools.filesystem as filesystem_module
+    from deepagents.backends.filesystem import FilesystemBackend
+    import deepscientist.backends.grep_search as grep_search
+    import deepscientist.backends.line_index as line_index
+    import deepscientist.tools.workspace_writer as workspace_writer
+    from deepscientist.backends import ScratchpadBackend
+    from deepscientist.settings import Settings
+    FILESYSTEM_AVAILABLE = True
+except ImportError as e:
+    FILESYSTEM_AVAILABLE = False
+    FILESYSTEM_IMPORT_ERROR = str(e)
+
+
+pytestmark = pytest.mark.skipif(
+    not FILESYSTEM_AVAILABLE,
+    reason=f"Filesystem tools import failed: {FILESYSTEM_IMPORT_ERROR if not FILESYSTEM_AVAILABLE else ''}"
+)
+
+
+def _make_settings(root):
+    with patch.object(Settings, "_try_load_dotenv_from_project_root"):
+        return Settings(workspace_root=str(root))
+
+
+@pytest.fixture
+def runtime(tmp_path):
+    """Provide a tool runtime carrying Settings rooted at a temp workspace."""
+    return SimpleNamespace(context={"settings": _make_settings(tmp_path)}, tool_call_id="call-1")
+
+
+@pytest.fixture(autouse=True)
+def clear_backends():
+    """Start every test with an empty backend registry."""
+    filesystem_module._BACKENDS.clear()
+    yield
+    filesystem_module._BACKENDS.clear()
+
+
+class TestBackendRegistry:
+    """Tests for the shared FilesystemBackend registry."""
+
+    def test_backend_is_reused_per_root(self, tmp_path):
+        """Calls with the same workspace root should share one backend."""
+        first = filesystem_module._backend(_make_settings(tmp_path))
+        second = filesystem_module._backend(_make_settings(f"{tmp_path}/"))
+
+        assert first is second
+
+    def test_changed_workspace_root_gets_new_backend(self, runtime, tmp_path):
+        """Changing settings.workspace_root should switch to the new root."""
+        settings = runtime.context["settings"]
+        first = filesystem_module._backend(settings)
+
+        settings.workspace_root = str(tmp_path / "other")
+        second = filesystem_module._backend(settings)
+
+        assert second is not first
+        assert (tmp_path / "other").is_dir()
+
+    def test_backend_is_built_once(self, runtime):
+        """Repeated tool calls should not rebuild the backend or recreate the root."""
+        filesystem_module._ls(runtime, "/")
+
+        with patch.object(filesystem_module, "LockingFilesystemBackend") as backend_cls, \
+             patch.object(filesystem_module.Path, "mkdir") as mkdir:
+            filesystem_module._ls(runtime, "/")
+            filesystem_module._read_file(runtime, "/missing.txt")
+
+        backend_cls.assert_not_called()
+        mkdir.assert_not_called()
+
+
+class TestFilesystemTools:
+    """Tests for the filesystem tool implementations."""
+
+    def test_write_then_read_file(self, runtime, tmp_path):
+        """write_file and read_file should round-trip through the workspace."""
+        filesystem_module._write_file(runtime, "/notes/a.txt", "hello\nworld")
+
+        assert (tmp_path / "notes" / "a.txt").read_text() == "hello\nworld"
+        assert "world" in filesystem_module._read_file(runtime, "/notes/a.txt")
+
+    def test_path_traversal_is_rejected(self, runtime):
+        """Paths escaping the workspace should be refused."""
+        with pytest.raises(ValueError):
+            filesystem_module._read_file(runtime, "/../etc/passwd")
+
+
+class TestGrepIndex:
+    """Tests for the trigram index behind grep."""
+
+    def _index(self, runtime):
+        return filesystem_module._BACKENDS.index(runtime.context["settings"])
+
+    def test_candidates_are_narrowed_by_trigrams(self, runtime, tmp_path):
+        """Only files containing every trigram of the literal are candidates."""
+        (tmp_path / "a.txt").write_text("alpha beta\n")
+        (tmp_path / "b.txt").write_text("gamma delta\n")
+        index = self._index(runtime)
+        index.refresh()
+
+        assert index.candidates("beta") == ["a.txt"]
+        assert index.candidates("zzz") == []
+
+    def test_refresh_only_reindexes_changed_files(self, runtime, tmp_path):
+        """Unchanged files are skipped; changed and deleted files are updated."""
+        (tmp_path / "a.txt").write_text("alpha\n")
+        (tmp_path / "b.txt").write_text("beta\n")
+        index = self._index(runtime)
+
+        assert index.refresh() == 2
+        assert index.refresh() == 0
+
+        (tmp_path / "a.txt").write_text("omega\n")
+        (tmp_path / "b.txt").unlink()
+        assert index.refresh() == 1
+        assert index.candidates("omega") == ["a.txt"]
+        assert index.candidates("beta") == []
+
+    def test_indexed_grep_matches_backend_scan(self, runtime, tmp_path):
+        """Index-backed results equal a full backend scan, including scope and glob."""
+        (tmp_path / "src").mkdir()
+        (tmp_path / "src" / "a.py").write_text("import os\nvalue = 1\n")
+        (tmp_path / "src" / "b.txt").write_text("value = 2\n")
+        (tmp_path / "c.py").write_text("value = 3\n")
+        settings = runtime.context["settings"]
+        backend = FilesystemBackend(root_dir=str(tmp_path), virtual_mode=True)
+
+        for pattern in ["value", r"val\w+ = [13]"]:
+            for path, glob in [(None, None), ("/src", None), ("/", "*.py")]:
+                found = filesystem_module._search_workspace(settings, pattern, path, glob)
+                expected = backend.grep_raw(pattern, path=path, glob=glob)
+                key = lambda match: (match["path"], match["line"])
+                assert sorted(found, key=key) == sorted(expected, key=key)
+
+    def test_regex_patterns_skip_the_index(self, runtime):
+        """Patterns the index cannot narrow never touch it."""
+        settings = runtime.context["settings"]
+
+        with patch.object(filesystem_module._BACKENDS.caches(settings), "index") as index:
+            filesystem_module._search_workspace(settings, "val.e", None, None)
+            filesystem_module._search_workspace(settings, "va", None, None)
+
+        index.assert_not_called()
+
+    def test_grep_tool_finds_written_file(self, runtime):
+        """grep should see files written after the index was built."""
+        filesystem_module._grep(runtime, "needle")
+        filesystem_module._write_file(runtime, "/notes/a.txt", "hay\nneedle\n")
+
+        assert filesystem_module._grep(runtime, "needle", output_mode="content").count("needle") == 1
+
+
+class TestGrepSearch:
+    """Tests for the mmap/regex grep engine."""
+
+    def test_reports_matching_lines_once(self, tmp_path):
+        """Each matching line is reported once with its line number."""
+        (tmp_path / "a.txt").write_text("foo foo\nbar\r\nfoo\n")
+
+        matches = grep_search.search_files(tmp_path, ["a.txt"], "fo+")
+
+        assert matches == [
+            {"path": "/a.txt", "line": 1, "text": "foo foo"},
+            {"path": "/a.txt", "line": 3, "text": "foo"},
+        ]
+
+    def test_matches_do_not_span_lines(self, tmp_path):
+        """A pattern that only matches across a newline is not a line match."""
+        (tmp_path / "a.txt").write_text("end\nstart\n")
+
+        assert grep_search.search_files(tmp_path, ["a.txt"], r"end\s+start") == []
+
+    def test_first_match_only_stops_per_file(self, tmp_path):
+        """files_with_matches mode needs only the first matching line."""
+        (tmp_path / "a.txt").write_text("x1\nx2\nx3\n")
+
+        matches = grep_search.search_files(tmp_path, ["a.txt"], "x", first_match_only=True)
+
+        assert [match["line"] for match in matches] == [1]
+
+    def test_large_files_are_memory_mapped_and_searched_in_parallel(self, tmp_path):
+        """Big searches use mmap and a worker pool with the same results."""
+        for name in ("a.txt", "b.txt"):
+            (tmp_path / name).write_bytes(b"filler\n" * 2000 + b"needle here\n")
+
+        with patch.object(grep_search, "_MMAP_MIN_BYTES", 1024), \
+             patch.object(grep_search, "_PARALLEL_MIN_BYTES", 1024), \
+             patch.object(grep_search, "_BATCH_BYTES", 1024):
+            matches = grep_search.search_files(tmp_path, ["a.txt", "b.txt"], "needle", max_workers=2)
+
+        assert matches == [
+            {"path": "/a.txt", "line": 2001, "text": "needle here"},
+            {"path": "/b.txt", "line": 2001, "text": "needle here"},
+        ]
+
+    def test_invalid_regex_is_reported(self, runtime):
+        """grep returns an error message for patterns that do not compile."""
+        assert filesystem_module._grep(runtime, "(", regex=True).startswith("Invalid regex pattern")
+
+    def test_grep_is_literal_by_default(self, runtime, tmp_path):
+        """Metacharacters match themselves unless regex is set."""
+        (tmp_path / "a.txt").write_text("f(x) = a.c\nabc\n")
+
+        literal = filesystem_module._grep(runtime, "a.c", output_mode="content")
+        assert "a.c" in literal and "abc" not in literal
+        assert "f(x)" in filesystem_module._grep(runtime, "f(x)", output_mode="content")
+        assert "abc" in filesystem_module._grep(runtime, "a.c", output_mode="content", regex=True)
+
+    def test_literal_patterns_with_metacharacters_use_the_index(self, runtime, tmp_path):
+        """A literal search is narrowed by trigram even if it contains regex syntax."""
+        (tmp_path / "a.txt").write_text("f(x) = 1\n")
+        settings = runtime.context["settings"]
+        index = filesystem_module._BACKENDS.caches(settings).index(1 << 20)
+
+        with patch.object(index, "candidates", wraps=index.candidates) as candidates:
+            matches = filesystem_module._search_workspace(settings, "f(x)", None, None, literal=True)
+
+        candidates.assert_called_once_with("f(x)")
+        assert [match["text"] for match in matches] == ["f(x) = 1"]
+
+    def test_parallel_searches_share_a_non_forking_pool(self, runtime, tmp_path):
+        """Large greps reuse the workspace's pool, whose workers are not forked."""
+        for name in ("a.txt", "b.txt"):
+            (tmp_path / name).write_bytes(b"filler\n" * 200 + b"needle here\n")
+        settings = runtime.context["settings"]
+        settings.grep_workers = 2
+        caches = filesystem_module._BACKENDS.caches(settings)
+
+        with patch.object(grep_search, "_PARALLEL_MIN_BYTES", 1024), \
+             patch.object(grep_search, "_BATCH_BYTES", 1024), \
+             patch.object(grep_search, "worker_pool", wraps=grep_search.worker_pool) as own_pool:
+            first = filesystem_module._search_workspace(settings, "needle", None, None, literal=True)
+            second = filesystem_module._search_workspace(settings, "needle", None, None, literal=True)
+
+        own_pool.assert_not_called()
+        assert first == second and len(first) == 2
+        assert caches.pool() is caches.pool()
+        assert caches.pool()._mp_context.get_start_method() != "fork"
+
+
+class TestLineIndex:
+    """Tests for paged reads through the sparse line-offset index."""
+
+    @pytest.fixture(autouse=True)
+    def small_index(self):
+        """Index tiny files with a short stride so tests stay fast."""
+        with patch.object(line_index, "INDEX_MIN_BYTES", 1), patch.object(line_index, "STRIDE", 4):
+            yield
+
+    def test_pages_match_backend_read(self, runtime, tmp_path):
+        """Every page equals what the backend returns for the same range."""
+        (tmp_path / "log.txt").write_text("".join(f"line {i}\r\n" for i in range(1, 23)) + "tail")
+        backend = FilesystemBackend(root_dir=str(tmp_path), virtual_mode=True)
+
+        for offset, limit in [(0, 5), (3, 4), (4, 4), (7, 100), (22, 1), (23, 1)]:
+            expected = backend.read("/log.txt", offset=offset, limit=limit)
+            assert filesystem_module._read_file(runtime, "/log.txt", offset, limit) == expected
+
+    def test_symlinked_directories_cannot_page_outside_files(self, runtime, tmp_path):
+        """Paths resolving outside the workspace are never indexed or read."""
+        outside = tmp_path.parent / f"{tmp_path.name}-outside"
+        outside.mkdir()
+        (outside / "secret.txt").write_text("secret\n" * 10)
+        (tmp_path / "link").symlink_to(outside)
+
+        assert line_index.LineIndexCache(tmp_path).read("link/secret.txt", 0, 5) is None
+        with pytest.raises(ValueError):
+            filesystem_module._read_file(runtime, "/link/secret.txt", 0, 5)
+
+    def test_index_is_persisted_and_reused(self, runtime, tmp_path):
+        """A fresh cache loads the stored index instead of rescanning the file."""
+        (tmp_path / "log.txt").write_text("a\nb\nc\nd\ne\n")
+        filesystem_module._read_file(runtime, "/log.txt", 4, 1)
+
+        cache = line_index.LineIndexCache(tmp_path)
+        with patch.object(line_index, "build_line_index") as build:
+            assert "e" in cache.read("log.txt", 4, 1)
+        build.assert_not_called()
+
+    def test_index_is_rebuilt_when_file_changes(self, runtime, tmp_path):
+        """Changing the file's size or mtime invalidates its index."""
+        path = tmp_path / "log.txt"
+        path.write_text("a\nb\n")
+        filesystem_module._read_file(runtime, "/log.txt", 0, 10)
+
+        path.write_text("a\nb\nc\nd\ne\nf\n")
+        assert "f" in filesystem_module._read_file(runtime, "/log.txt", 5, 1)
+
+
+class TestAppendAndStreamingWrites:
+    """Tests for append_file and the streaming WorkspaceWriter."""
+
+    def test_append_file_creates_and_extends(self, runtime, tmp_path):
+        """append_file creates missing files and only adds the new content."""
+        first = filesystem_module._append_file(runtime, "/logs/run.md", "# Run\n")
+        second = filesystem_module._append_file(runtime, "/logs/run.md", "step 1\n")
+
+        assert (tmp_path / "logs" / "run.md").read_text() == "# Run\nstep 1\n"
+        assert first == "Appended 6 bytes to /logs/run.md"
+        assert second == "Appended 7 bytes to /logs/run.md"
+
+    def test_append_file_refuses_symlink_escape(self, runtime, tmp_path):
+        """A symlinked directory cannot redirect appends outside the workspace."""
+        outside = tmp_path.parent / f"{tmp_path.name}-outside"
+        outside.mkdir()
+        (tmp_path / "link").symlink_to(outside)
+
+        result = filesystem_module._append_file(runtime, "/link/f.txt", "x")
+
+        assert "outside root directory" in result
+        assert not (outside / "f.txt").exists()
+
+    def test_append_file_batches_fsync(self, runtime):
+        """The first append is synced; further appends within the interval share a deferred fsync."""
+        settings = runtime.context["settings"]
+        settings.workspace_fsync_interval_s = 3600.0
+        batcher = filesystem_module._append_sync(settings)
+        batcher.flush()  # Appends left pending by other tests.
+
+        with patch.object(workspace_writer.os, "fsync") as fsync:
+            for i in range(5):
+                filesystem_module._append_file(runtime, "/log.txt", f"{i}\n")
+            assert fsync.call_count == 1
+
+            batcher.flush()
+            assert fsync.call_count == 2
+
+        settings.workspace_fsync_interval_s = 0.0
+        with patch.object(workspace_writer.os, "fsync") as fsync:
+            filesystem_module._append_file(runtime, "/log.txt", "5\n")
+
+        fsync.assert_called_once()
+        # Each interval has its own batcher; none is reconfigured by a call.
+        assert filesystem_module._append_sync(settings) is not batcher
+        assert batcher.interval_s == 3600.0
+
+    def test_pending_appends_are_synced_when_interval_ends(self, tmp_path):
+        """The last write of a burst is fsynced by a timer even if the writer never syncs it."""
+        batcher = workspace_writer.SyncBatcher(interval_s=0.05)
+        synced = threading.Event()
+
+        with patch.object(workspace_writer.os, "fsync") as fsync:
+            for chunk in ["a", "b"]:
+                with workspace_writer.WorkspaceWriter(tmp_path / "log.txt", batcher=batcher, sync_on_close=False) as writer:
+                    writer.write(chunk)
+            assert fsync.call_count == 1
+            fsync.side_effect = lambda fd: synced.set()
+
+            assert synced.wait(5)
+
+        assert fsync.call_count == 2
+
+    def test_writer_streams_chunks_and_syncs_on_close(self, tmp_path):
+        """Chunks are appended in order and the file is synced when closed."""
+        batcher = workspace_writer.SyncBatcher(interval_s=3600.0, max_bytes=8)
+
+        with patch.object(workspace_writer.os, "fsync") as fsync:
+            with workspace_writer.WorkspaceWriter(tmp_path / "out.txt", batcher=batcher) as writer:
+                writer.write("abc")
+                assert fsync.call_count == 1  # first write to the file
+                writer.write("defghij")
+                assert fsync.call_count == 1
+                writer.write("k")
+                assert fsync.call_count == 2  # max_bytes reached
+                writer.write("l")
+
+        assert (tmp_path / "out.txt").read_text() == "abcdefghijkl"
+        assert writer.bytes_written == 12
+        assert fsync.call_count == 3
+
+    def test_writer_truncate_replaces_content(self, tmp_path):
+        """truncate=True streams a replacement for the whole file."""
+        (tmp_path / "out.txt").write_text("old content")
+
+        with workspace_writer.WorkspaceWriter(tmp_path / "out.txt", truncate=True) as writer:
+            writer.write("new")
+
+        assert (tmp_path / "out.txt").read_text() == "new"
+
+
+class TestScratchpadPaths:
+    """Disk tools leave the in-memory /scratchpad/ route alone."""
+
+    def test_disk_tools_reject_scratchpad_paths(self, runtime, tmp_path):
+        """append_file and multi_edit cannot clobber scratchpad notes on flush."""
+        scratchpad = ScratchpadBackend(persist_dir=tmp_path / ".cache" / "scratchpad", flush_interval_s=3600.0)
+        try:
+            scratchpad.write("/notes.md", "step 1\n")
+
+            appended = filesystem_module._append_file(runtime, "/scratchpad/notes.md", "step 2\n")
+            edited = filesystem_module._multi_edit(
+                runtime, "/scratchpad/notes.md", [{"old_string": "step 1", "new_string": "x"}]
+            )
+            scratchpad.edit("/notes.md", "step 1", "step 1 (done)")
+            scratchpad.flush()
+        finally:
+            scratchpad.close()
+
+        assert appended.startswith("Error: append_file cannot modify '/scratchpad/notes.md'")
+        assert edited.startswith("Error: multi_edit cannot modify '/scratchpad/notes.md'")
+        assert not (tmp_path / "scratchpad").exists()
+        persisted = tmp_path / ".cache" / "scratchpad" / "notes.md"
+        assert persisted.read_text(encoding="utf-8") == "step 1 (done)\n"
+
+
+class TestMultiEdit:
+    """Tests for applying several replacements in one pass."""
+
+    def test_applies_edits_in_order(self, runtime, tmp_path):
+        """Edits run sequentially and each sees the previous result."""
+        (tmp_path / "plan.md").write_text("# Plan\n- todo A\n- todo B\n- todo B\n")
+
+        result = filesystem_module._multi_edit(runtime, "/plan.md", [
+            {"old_string": "todo A", "new_string": "done A"},
+            {"old_string": "todo B", "new_string": "todo C", "replace_all": True},
+            {"old_string": "done A", "new_string": "done A (verified)"},
+        ])
+
+        assert (tmp_path / "plan.md").read_text() == "# Plan\n- done A (verified)\n- todo C\n- todo C\n"
+        assert result.splitlines() == [
+            "Applied 3 edit(s) to '/plan.md' (4 replacement(s)):",
+            "- edit 1: replaced 1 instance(s)",
+            "- edit 2: replaced 2 instance(s)",
+            "- edit 3: replaced 1 instance(s)",
+        ]
+
+    def test_failed_edit_leaves_file_unchanged(self, runtime, tmp_path):
+        """One failing edit aborts the whole batch and every failure is reported."""
+        (tmp_path / "plan.md").write_text("a b b\n")
+
+        result = filesystem_module._multi_edit(runtime, "/plan.md", [
+            {"old_string": "a", "new_string": "x"},
+            {"old_string": "b", "new_string": "y"},
+            {"old_string": "missing", "new_string": "z"},
+        ])
+
+        assert (tmp_path / "plan.md").read_text() == "a b b\n"
+        lines = result.splitlines()
+        assert lines[0] == "No changes made to '/plan.md'; 2 of 3 edit(s) failed:"
+        assert lines[1] == "- edit 1: replaced 1 instance(s)"
+        assert "appears 2 times" in lines[2]
+        assert "String not found" in lines[3]
+
+    def test_refuses_symlink_escape(self, runtime, tmp_path):
+        """A symlinked directory cannot redirect the rewrite outside the workspace."""
+        outside = tmp_path.parent / f"{tmp_path.name}-outside"
+        outside.mkdir()
+        (outside / "f.txt").write_text("a\n")
+        (tmp_path / "link").symlink_to(outside)
+
+        result = filesystem_module._multi_edit(runtime, "/link/f.txt", [{"old_string": "a", "new_string": "b"}])
+
+        assert "outside root directory" in result
+        assert (outside / "f.txt").read_text() == "a\n"
+
+    def test_missing_file_is_reported(self, runtime):
+        """Editing a file that does not exist returns an error."""
+        result = filesystem_module._multi_edit(runtime, "/nope.md", [{"old_string": "a", "new_string": "b"}])
+
+        assert result == "Error: File '/nope.md' not found"
+
+
+class TestDirectoryTreeCache:
+    """Tests for the cached directory tree behind ls and glob."""
+
+    def test_ls_reports_size_and_mtime(self, runtime, tmp_path):
+        """ls lists files with their size and directories with a trailing slash."""
+        (tmp_path / "data").mkdir()
+        (tmp_path / "data" / "a.csv").write_text("x,y\n")
+        (tmp_path / "data" / "raw").mkdir()
+
+        listing = filesystem_module._ls(runtime, "/data")
+
+        assert "/data/a.csv (4 bytes, modified " in listing
+        assert "/data/raw/ (dir, modified " in listing
+
+    def test_glob_matches_backend(self, runtime, tmp_path):
+        """glob results equal the backend's recursive glob."""
+        (tmp_path / "src" / "pkg").mkdir(parents=True)
+        for name in ("a.py", "src/b.py", "src/pkg/c.py", "src/pkg/d.txt", ".hidden.py"):
+            (tmp_path / name).write_text("")
+        backend = filesystem_module._backend(runtime.context["settings"])
+
+        for pattern, path in [("*.py", "/"), ("pkg/*", "/src"), ("**/*.txt", "/"), ("*", "/src")]:
+            expected = sorted(info["path"] for info in backend.glob_info(pattern, path=path))
+            assert filesystem_module._glob(runtime, pattern, path) == str(expected)
+
+    def test_listings_are_served_from_memory(self, tmp_path):
+        """A second listing of an unchanged directory does not rescan it."""
+        (tmp_path / "a.txt").write_text("a")
+        tree = dir_cache.DirectoryTree(tmp_path)
+        tree.list("")
+
+        with patch.object(dir_cache.os, "scandir") as scandir:
+            assert [info.name for info in tree.list("")] == ["a.txt"]
+        scandir.assert_not_called()
+        tree.close()
+
+    @pytest.mark.parametrize("use_inotify", [True, False])
+    def test_external_changes_are_picked_up(self, tmp_path, use_inotify):
+        """Files created or resized outside the tools show up (inotify or mtime polling)."""
+        (tmp_path / "sub").mkdir()
+        tree = dir_cache.DirectoryTree(tmp_path, use_inotify=use_inotify)
+        assert tree.list("sub") == []
+
+        (tmp_path / "sub" / "new.txt").write_text("hello")
+        if not use_inotify:
+            os.utime(tmp_path / "sub", ns=(0, 0))  # Coarse mtime clocks may not tick.
+
+        assert [(info.name, info.size) for info in tree.list("sub")] == [("new.txt", 5)]
+        tree.close()
+
+    def test_watch_failure_falls_back_to_polling(self, tmp_path):
+        """Running out of inotify watches switches the tree to mtime polling."""
+        tree = dir_cache.DirectoryTree(tmp_path)
+        if not tree.watching:
+            pytest.skip("inotify not available")
+
+        with patch.object(dir_cache._Inotify, "add_watch", side_effect=OSError(28, "No space left")):
+            tree.list("")
+
+        assert not tree.watching
+        (tmp_path / "a.txt").write_text("a")
+        os.utime(tmp_path, ns=(0, 0))
+        assert [info.name for info in tree.list("")] == ["a.txt"]
+
+    def test_change_during_scan_is_not_lost(self, tmp_path):
+        """A file created right after the directory is read still shows up on the next listing."""
+        tree = dir_cache.DirectoryTree(tmp_path)
+        if not tree.watching:
+            pytest.skip("inotify not available")
+        scan = tree._scan
+
+        def scan_then_create(rel_dir):
+            listing = scan(rel_dir)
+            (tmp_path / "late.txt").write_text("late")
+            return listing
+
+        with patch.object(tree, "_scan", side_effect=scan_then_create):
+            assert tree.list("") == []
+
+        assert [info.name for info in tree.list("")] == ["late.txt"]
+        tree.close()
+
+    def test_missing_directory_keeps_watching(self, tmp_path):
+        """Listing a path that does not exist does not give up on inotify."""
+        tree = dir_cache.DirectoryTree(tmp_path)
+        if not tree.watching:
+            pytest.skip("inotify not available")
+
+        assert tree.list("missing") is None
+        assert tree.watching
+        tree.close()
+
+
+class TestConcurrentWrites:
+    """Tests for locked read-modify-write cycles in the filesystem tools."""
+
+    def test_parallel_edits_do_not_lose_updates(self, runtime, tmp_path):
+        """Concurrent multi_edit and append_file calls on one file all land."""
+        (tmp_path / "index.md").write_text("END")
+
+        def worker(number):
+            filesystem_module._multi_edit(
+                runtime,
+                "/index.md",
+                [{"old_string": "END", "new_string": f"entry {number}\nEND"}],
+            )
+            filesystem_module._append_file(runtime, "/index.md", f"\nappended {number}")
+
+        threads = [threading.Thread(target=worker, args=(number,)) for number in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        content = (tmp_path / "index.md").read_text()
+        for number in range(16):
+            assert f"entry {number}\n" in content
+            assert f"appended {number}" in content
+
+    def test_edit_replaces_file_atomically(self, runtime, tmp_path):
+        """edit_file writes a new inode via rename and keeps the file mode."""
+        target = tmp_path / "notes.md"
+        target.write_text("alpha")
+        target.chmod(0o600)
+        inode = target.stat().st_ino
+
+        filesystem_module._edit_file(runtime, "/notes.md", "alpha", "beta")
+
+        assert target.read_text() == "beta"
+        assert target.stat().st_ino != inode
+        assert target.stat().st_mode & 0o777 == 0o600
+        assert not [path for path in tmp_path.iterdir() if path.name.endswith(".tmp")]
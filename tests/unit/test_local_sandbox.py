@@ -0,0 +1,142 @@
+"""Unit tests for the local-subprocess sandbox backend.
+
+These tests start real local Python worker processes; no container runtime is needed.
+"""
+
+import subprocess
+import sys
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+
+# Check if the local backend can be imported
+try:
+    import deepscientist.tools.local_sandbox as local_sandbox
+    from deepscientist.tools.local_sandbox import LocalSandboxSession
+    LOCAL_SANDBOX_AVAILABLE = True
+except ImportError as e:
+    LOCAL_SANDBOX_AVAILABLE = False
+    LOCAL_SANDBOX_IMPORT_ERROR = str(e)
+
+
+pytestmark = [
+    pytest.mark.skipif(
+        not LOCAL_SANDBOX_AVAILABLE,
+        reason=f"Local sandbox import failed: {LOCAL_SANDBOX_IMPORT_ERROR if not LOCAL_SANDBOX_AVAILABLE else ''}"
+    ),
+    pytest.mark.skipif(sys.platform == "win32", reason="Local backend requires POSIX rlimits"),
+]
+
+
+@pytest.fixture
+def session(tmp_path):
+    with LocalSandboxSession(workdir=str(tmp_path), pool_size=1) as local_session:
+        yield local_session
+
+
+class TestLocalSandboxSession:
+    """Tests for LocalSandboxSession."""
+
+    def test_run_returns_stdout_stderr_and_exit_code(self, session):
+        """Should mirror the llm-sandbox ConsoleOutput contract."""
+        result = session.run("import sys\nprint('out')\nprint('err', file=sys.stderr)\nsys.exit(3)")
+
+        assert result.stdout == "out\n"
+        assert result.stderr == "err\n"
+        assert result.exit_code == 3
+
+    def test_run_uses_workspace_as_cwd(self, session, tmp_path):
+        """Relative paths should resolve inside the workspace."""
+        (tmp_path / "data.csv").write_text("a,b\n")
+
+        result = session.run("print(open('data.csv').read().strip())")
+
+        assert result.stdout == "a,b\n"
+
+    def test_runs_do_not_share_state(self, session):
+        """Every run should start in a fresh worker."""
+        session.run("x = 1")
+
+        result = session.run("print('x' in globals())")
+
+        assert result.stdout == "False\n"
+
+    def test_timeout_kills_worker_and_keeps_partial_output(self, session):
+        """A run past its timeout should be killed and report what it printed."""
+        result = session.run("print('started', flush=True)\nwhile True: pass", timeout=1)
+
+        assert result.timed_out is True
+        assert result.stdout == "started\n"
+        assert "timed out" in result.stderr
+
+    def test_timeout_keeps_resource_usage(self, session):
+        """Killing a run must leave the worker for _reap, which collects its usage."""
+        result = session.run("while True: pass", timeout=1)
+
+        assert result.timed_out is True
+        assert result.cpu_s is not None and result.cpu_s > 0
+        assert result.peak_rss_bytes is not None
+
+    def test_stop_keeps_resource_usage(self, session):
+        """A run stopped from on_output still reports its usage."""
+        result = session.run(
+            "import time\nprint('go', flush=True)\ntime.sleep(30)",
+            on_output=lambda name, text: "go" in text,
+        )
+
+        assert result.stopped is True
+        assert result.cpu_s is not None
+        assert result.peak_rss_bytes is not None
+
+    def test_kill_after_exit_leaves_usage_to_reap(self):
+        """_kill on a worker that already exited must not reap it."""
+        worker = subprocess.Popen(
+            [sys.executable, "-c", "sum(range(10**6))"], start_new_session=True
+        )
+        time.sleep(1)  # Exited, not yet reaped.
+
+        local_sandbox._kill(worker)
+        exit_code, rusage = local_sandbox._reap(worker)
+
+        assert exit_code == 0
+        assert rusage is not None
+
+    def test_timeout_covers_writing_the_code(self, tmp_path):
+        """A worker that never reads its code still times out instead of blocking the caller."""
+        with patch.object(local_sandbox, "_WORKER_BOOTSTRAP", "import time; time.sleep(60)"):
+            with LocalSandboxSession(workdir=str(tmp_path), pool_size=1) as stuck:
+                started = time.monotonic()
+                # Far more than a pipe buffer holds.
+                result = stuck.run("#" * (8 << 20), timeout=1)
+
+        assert result.timed_out is True
+        assert time.monotonic() - started < 10
+
+    def test_close_kills_running_workers(self, tmp_path):
+        """close() stops runs in progress, not only the idle workers."""
+        local_session = LocalSandboxSession(workdir=str(tmp_path), pool_size=1)
+        local_session.open()
+        results = []
+        runner = threading.Thread(target=lambda: results.append(local_session.run("import time\ntime.sleep(30)")))
+        runner.start()
+        deadline = time.monotonic() + 5
+        while not local_session._running and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        started = time.monotonic()
+        local_session.close()
+        runner.join(10)
+
+        assert not runner.is_alive()
+        assert time.monotonic() - started < 10
+        assert results[0].exit_code != 0
+
+    def test_missing_library_is_reported(self, session):
+        """Libraries are not installed locally; missing ones should fail fast."""
+        result = session.run("print(1)", libraries=["definitely-not-installed-package"])
+
+        assert result.exit_code == 1
+        assert "definitely-not-installed-package" in result.stderr
@@ -0,0 +1,227 @@
+"""Unit tests for the locking filesystem backend and per-path locks."""
+
+import multiprocessing
+import sys
+import threading
+from unittest.mock import patch
+
+import pytest
+
+
+# Check if the locking backend can be imported
+try:
+    import deepscientist.backends.dir_cache as dir_cache
+    import deepscientist.backends.line_index as line_index
+    import deepscientist.backends.locking as locking
+    import deepscientist.backends.workspace_cache as workspace_cache
+    from deepagents.backends.filesystem import FilesystemBackend
+    from deepscientist.backends import LockingFilesystemBackend, path_locks
+    from deepscientist.backends.grep_index import TrigramIndex
+    from deepscientist.backends.workspace_cache import close_workspace_caches
+    LOCKING_AVAILABLE = True
+except ImportError as e:
+    LOCKING_AVAILABLE = False
+    LOCKING_IMPORT_ERROR = str(e)
+
+
+pytestmark = pytest.mark.skipif(
+    not LOCKING_AVAILABLE,
+    reason=f"Locking backend import failed: {LOCKING_IMPORT_ERROR if not LOCKING_AVAILABLE else ''}"
+)
+
+
+@pytest.fixture(autouse=True)
+def close_caches(tmp_path):
+    """Close the directory tree and grep index each test's backends share."""
+    yield
+    close_workspace_caches(tmp_path)
+
+
+def _hold_in_child(root, rel_path, acquired, release):
+    with path_locks(root).hold(rel_path):
+        acquired.set()
+        release.wait(10)
+
+
+class TestPathLocks:
+    """Exclusive locks per path across threads and processes."""
+
+    def test_locks_are_shared_per_root(self, tmp_path):
+        assert path_locks(tmp_path) is path_locks(f"{tmp_path}/")
+        assert LockingFilesystemBackend(root_dir=tmp_path).locks is path_locks(tmp_path)
+
+    def test_absolute_and_relative_paths_share_a_lock(self, tmp_path):
+        locks = path_locks(tmp_path)
+        assert locks._key(tmp_path / "a" / "b.md") == locks._key("a/b.md") == "a/b.md"
+
+    def test_threads_are_serialized(self, tmp_path):
+        """Unlocked read-increment-write cycles would lose updates here."""
+        counter = tmp_path / "counter.txt"
+        counter.write_text("0")
+        locks = path_locks(tmp_path)
+
+        def increment():
+            for _ in range(50):
+                with locks.hold("counter.txt"):
+                    locking.replace_file(counter, str(int(counter.read_text()) + 1))
+
+        threads = [threading.Thread(target=increment) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert counter.read_text() == "400"
+        assert locks._locks == {}
+
+    @pytest.mark.skipif(
+        not LOCKING_AVAILABLE or locking.fcntl is None or sys.platform != "linux",
+        reason="needs fcntl and fork",
+    )
+    def test_other_processes_are_excluded(self, tmp_path):
+        context = multiprocessing.get_context("fork")
+        acquired, release = context.Event(), context.Event()
+        child = context.Process(target=_hold_in_child, args=(tmp_path, "shared.md", acquired, release))
+        child.start()
+        try:
+            assert acquired.wait(10)
+            got_lock = threading.Event()
+
+            def take():
+                with path_locks(tmp_path).hold("shared.md"):
+                    got_lock.set()
+
+            waiter = threading.Thread(target=take)
+            waiter.start()
+            assert not got_lock.wait(0.3)
+            release.set()
+            assert got_lock.wait(10)
+            waiter.join()
+        finally:
+            release.set()
+            child.join(10)
+
+
+class TestLockingFilesystemBackend:
+    """Writes and edits go through temp file + rename."""
+
+    def test_write_refuses_existing_file(self, tmp_path):
+        backend = LockingFilesystemBackend(root_dir=tmp_path, virtual_mode=True)
+
+        assert backend.write("/a/new.md", "one").error is None
+        result = backend.write("/a/new.md", "two")
+
+        assert "already exists" in result.error
+        assert (tmp_path / "a" / "new.md").read_text() == "one"
+
+    def test_edit_matches_filesystem_backend(self, tmp_path):
+        backend = LockingFilesystemBackend(root_dir=tmp_path, virtual_mode=True)
+        backend.write("/notes.md", "x x")
+
+        assert "not found" in backend.edit("/missing.md", "x", "y").error
+        assert "appears 2 times" in backend.edit("/notes.md", "x", "y").error
+        result = backend.edit("/notes.md", "x", "y", replace_all=True)
+
+        assert result.error is None
+        assert result.occurrences == 2
+        assert (tmp_path / "notes.md").read_text() == "y y"
+
+    def test_replace_file_syncs_data_and_directory(self, tmp_path):
+        target = tmp_path / "notes.md"
+        synced = []
+        real_fsync = locking.os.fsync
+
+        def record(fd):
+            synced.append(locking.os.readlink(f"/proc/self/fd/{fd}"))
+            real_fsync(fd)
+
+        with patch.object(locking.os, "fsync", side_effect=record):
+            locking.replace_file(target, "content")
+
+        assert target.read_text() == "content"
+        assert len(synced) == 2
+        assert synced[0].endswith(".tmp")
+        assert synced[1] == str(tmp_path)
+
+
+class TestCachedReads:
+    """ls, glob, grep and large reads through the backend protocol use the shared caches."""
+
+    def _workspace(self, root):
+        (root / "src").mkdir()
+        (root / "src" / "a.py").write_text("import os\nvalue = 1\n")
+        (root / "src" / "b.txt").write_text("value = 2\n")
+        (root / "c.py").write_text("value = 3\n")
+
+    def test_backends_on_one_root_share_caches(self, tmp_path):
+        first = LockingFilesystemBackend(root_dir=tmp_path, virtual_mode=True)
+        second = LockingFilesystemBackend(root_dir=f"{tmp_path}/", virtual_mode=True)
+
+        assert first.caches is second.caches
+
+    def test_grep_matches_filesystem_backend(self, tmp_path):
+        self._workspace(tmp_path)
+        backend = LockingFilesystemBackend(root_dir=tmp_path, virtual_mode=True)
+        reference = FilesystemBackend(root_dir=tmp_path, virtual_mode=True)
+        key = lambda match: (match["path"], match["line"])
+
+        for pattern, path, glob in [("value", None, None), (r"val\w+ = [13]", "/src", None), ("value", "/", "*.py")]:
+            found = backend.grep_raw(pattern, path=path, glob=glob)
+            assert sorted(found, key=key) == sorted(reference.grep_raw(pattern, path=path, glob=glob), key=key)
+        assert backend.grep_raw("value", path="/missing") == []
+        assert backend.grep_raw("(").startswith("Invalid regex pattern")
+
+    def test_literal_grep_uses_trigram_index(self, tmp_path):
+        self._workspace(tmp_path)
+        backend = LockingFilesystemBackend(root_dir=tmp_path, virtual_mode=True)
+
+        with patch.object(TrigramIndex, "candidates", autospec=True, return_value=["c.py"]) as candidates:
+            matches = backend.grep_raw("value")
+        candidates.assert_called_once()
+        assert [match["path"] for match in matches] == ["/c.py"]
+
+        unindexed = LockingFilesystemBackend(root_dir=tmp_path, virtual_mode=True, grep_index=False)
+        with patch.object(TrigramIndex, "candidates") as candidates:
+            assert len(unindexed.grep_raw("value")) == 3
+        candidates.assert_not_called()
+
+    def test_grep_workers_are_passed_to_search(self, tmp_path):
+        self._workspace(tmp_path)
+        backend = LockingFilesystemBackend(root_dir=tmp_path, virtual_mode=True, grep_workers=2)
+
+        with patch.object(workspace_cache, "search_files", return_value=[]) as search:
+            backend.grep_raw("value")
+
+        assert search.call_args.kwargs["max_workers"] == 2
+
+    def test_large_reads_are_paged_by_line_index(self, tmp_path):
+        (tmp_path / "big.txt").write_text("".join(f"line {i}\n" for i in range(100)))
+        backend = LockingFilesystemBackend(root_dir=tmp_path, virtual_mode=True)
+        expected = FilesystemBackend(root_dir=tmp_path, virtual_mode=True).read("/big.txt", offset=37, limit=5)
+
+        with patch.object(line_index, "INDEX_MIN_BYTES", 1), patch.object(line_index, "STRIDE", 4), \
+             patch.object(line_index, "build_line_index", wraps=line_index.build_line_index) as build:
+            assert backend.read("/big.txt", offset=37, limit=5) == expected
+        build.assert_called_once()
+
+    def test_listings_match_filesystem_backend(self, tmp_path):
+        self._workspace(tmp_path)
+        backend = LockingFilesystemBackend(root_dir=tmp_path, virtual_mode=True)
+        reference = FilesystemBackend(root_dir=tmp_path, virtual_mode=True)
+
+        for path in ["/", "/src", "/missing"]:
+            assert backend.ls_info(path) == reference.ls_info(path)
+        for pattern, path in [("*.py", "/"), ("**/*.txt", "/"), ("*", "/src")]:
+            assert backend.glob_info(pattern, path) == reference.glob_info(pattern, path)
+
+    def test_listings_are_cached_and_refreshed_on_write(self, tmp_path):
+        self._workspace(tmp_path)
+        backend = LockingFilesystemBackend(root_dir=tmp_path, virtual_mode=True, use_inotify=False)
+        backend.glob_info("*.py")
+
+        with patch.object(dir_cache.os, "scandir") as scandir:
+            assert [info["path"] for info in backend.glob_info("*.py")] == ["/c.py", "/src/a.py"]
+        scandir.assert_not_called()
+
+        backend.write("/src/d.py", "value = 4\n")
+        assert "/src/d.py" in [info["path"] for info in backend.ls_info("/src")]
@@ -30,8 +30,9 @@ class TestOrchestratorCreation:
         with patch("deepscientist.orchestrator.agent.init_chat_model") as mock_init_model, \
              patch("deepscientist.orchestrator.agent.create_deep_agent") as mock_deep_agent, \
              patch("deepscientist.orchestrator.agent.InMemoryStore") as mock_store, \
-             patch("deepscientist.orchestrator.agent.FilesystemBackend") as mock_fs_backend, \
+             patch("deepscientist.orchestrator.agent.LockingFilesystemBackend") as mock_fs_backend, \
              patch("deepscientist.orchestrator.agent.CompositeBackend") as mock_composite, \
+             patch("deepscientist.orchestrator.agent.scratchpad_backend") as mock_scratchpad, \
              patch("deepscientist.orchestrator.agent.create_file_upload_subagent") as mock_file_upload, \
              patch("deepscientist.orchestrator.agent.create_planning_subagent") as mock_planning, \
              patch("deepscientist.orchestrator.agent.create_literature_subagent") as mock_literature, \
@@ -53,6 +54,7 @@ class TestOrchestratorCreation:
                 "store": mock_store,
                 "fs_backend": mock_fs_backend,
                 "composite": mock_composite,
+                "scratchpad": mock_scratchpad,
                 "file_upload": mock_file_upload,
                 "planning": mock_planning,
                 "literature": mock_literature,
@@ -141,9 +143,12 @@ class TestOrchestratorCreation:
         
         agent = create_orchestrator_agent()
 
-        # Check FilesystemBackend was created with custom root
+        # Check LockingFilesystemBackend was created with custom root
         call_kwargs = mock_dependencies["fs_backend"].call_args[1]
         assert call_kwargs["root_dir"] == "/custom/workspace"
+        assert mock_dependencies["fs_backend"].call_count == 1  # Shared by / and /memories/
+        scratchpad_args = mock_dependencies["scratchpad"].call_args[0]
+        assert str(scratchpad_args[0]) == "/custom/workspace/.cache/scratchpad"
 
     def test_create_orchestrator_with_model_profile(self, mock_dependencies, clean_env):
         """Should use fraction-based limits when model has profile."""
@@ -0,0 +1,803 @@
+"""Unit tests for sandbox tool functions.
+
+These tests exercise the sandbox tool implementations against a fake
+llm-sandbox session, so no container runtime is required.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+
+# Check if the sandbox tools can be imported
+try:
+    import deepscientist.tools.sandbox as sandbox_module
+    from deepscientist.settings import Settings
+    SANDBOX_AVAILABLE = True
+except ImportError as e:
+    SANDBOX_AVAILABLE = False
+    SANDBOX_IMPORT_ERROR = str(e)
+
+
+pytestmark = pytest.mark.skipif(
+    not SANDBOX_AVAILABLE,
+    reason=f"Sandbox tools import failed: {SANDBOX_IMPORT_ERROR if not SANDBOX_AVAILABLE else ''}"
+)
+
+
+class FakeSession:
+    """Minimal stand-in for an llm-sandbox session."""
+
+    instances = []
+
+    def __init__(self, lang="python", backend=None, image=None, libraries=None):
+        self.lang = lang
+        self.runs = []
+        self.is_open = False
+        self.open_count = 0
+        self.interrupted = False
+        FakeSession.instances.append(self)
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def open(self):
+        self.is_open = True
+        self.open_count += 1
+
+    def close(self):
+        self.is_open = False
+
+    def run(self, code, libraries=None, timeout=None):
+        self.runs.append(code)
+        return SimpleNamespace(stdout=f"ran {len(self.runs)}", stderr="", exit_code=0)
+
+
+class FakeInteractiveSession(FakeSession):
+    """Fake stateful session exposing the kernel interrupt hook."""
+
+    def _interrupt_runner(self):
+        self.interrupted = True
+
+
+@pytest.fixture
+def runtime(tmp_path):
+    """Provide a tool runtime carrying Settings rooted at a temp workspace."""
+    with patch.object(Settings, "_try_load_dotenv_from_project_root"):
+        settings = Settings(workspace_root=str(tmp_path))
+    return SimpleNamespace(context={"settings": settings}, tool_call_id="call-1")
+
+
+@pytest.fixture(autouse=True)
+def fake_sessions():
+    """Replace llm-sandbox session classes and clear the registry."""
+    FakeSession.instances = []
+    with patch.object(sandbox_module, "SandboxSession", FakeSession), \
+         patch.object(sandbox_module, "InteractiveSandboxSession", FakeInteractiveSession):
+        yield
+    sandbox_module._SANDBOXES.close_all()
+
+
+class TestStatefulSandbox:
+    """Tests for the persistent-kernel execution mode."""
+
+    def test_create_stateful_uses_interactive_session(self, runtime):
+        """Should back stateful sandboxes with an interactive session."""
+        created = sandbox_module._create_sandbox(runtime, stateful=True)
+
+        assert created["stateful"] is True
+        assert isinstance(FakeSession.instances[-1], FakeInteractiveSession)
+
+    def test_reset_clears_kernel_namespace(self, runtime):
+        """Soft reset should run the IPython reset magic."""
+        sandbox_id = sandbox_module._create_sandbox(runtime, stateful=True)["sandbox_id"]
+
+        result = sandbox_module._reset_sandbox(runtime, sandbox_id)
+
+        assert result == {"reset": True, "sandbox_id": sandbox_id}
+        assert FakeSession.instances[-1].runs == ["%reset -f"]
+
+    def test_hard_reset_restarts_session(self, runtime):
+        """Hard reset should reopen the kernel session."""
+        sandbox_id = sandbox_module._create_sandbox(runtime, stateful=True)["sandbox_id"]
+
+        sandbox_module._reset_sandbox(runtime, sandbox_id, hard=True)
+
+        assert FakeSession.instances[-1].open_count == 2
+
+    def test_reset_rejects_stateless_sandbox(self, runtime):
+        """Stateless sandboxes have nothing to reset."""
+        sandbox_id = sandbox_module._create_sandbox(runtime)["sandbox_id"]
+
+        result = sandbox_module._reset_sandbox(runtime, sandbox_id)
+
+        assert result["reset"] is False
+
+    def test_interrupt_stateful_sandbox(self, runtime):
+        """Interrupt should signal the kernel runner."""
+        sandbox_id = sandbox_module._create_sandbox(runtime, stateful=True)["sandbox_id"]
+
+        result = sandbox_module._interrupt_sandbox(runtime, sandbox_id)
+
+        assert result["interrupted"] is True
+        assert FakeSession.instances[-1].interrupted is True
+
+
+class TestOutputSpill:
+    """Tests for spilling large stdout/stderr to workspace files."""
+
+    def test_small_output_is_returned_inline(self, runtime):
+        """Output under the limit should be returned verbatim."""
+        sandbox_id = sandbox_module._create_sandbox(runtime)["sandbox_id"]
+
+        result = sandbox_module._execute_code(runtime, sandbox_id, "print('hi')")
+
+        assert result["stdout"] == "ran 1"
+        assert "stdout_path" not in result
+
+    def test_large_output_is_spilled_with_excerpt(self, runtime, tmp_path):
+        """Output over the limit should be written to /analysis/logs/ with head/tail."""
+        settings = runtime.context["settings"]
+        settings.sandbox_output_limit_bytes = 100
+        settings.sandbox_output_excerpt_bytes = 10
+        sandbox_id = sandbox_module._create_sandbox(runtime)["sandbox_id"]
+        big = "HEAD" + "x" * 1000 + "TAIL"
+        FakeSession.instances[-1].run = lambda code, **kw: SimpleNamespace(
+            stdout=big, stderr="", exit_code=0
+        )
+
+        result = sandbox_module._execute_code(runtime, sandbox_id, "print(df)")
+
+        assert result["stdout_truncated"] is True
+        assert result["stdout_bytes"] == len(big)
+        assert result["stdout"].startswith("HEAD")
+        assert result["stdout"].endswith("TAIL")
+        assert result["stdout_path"].startswith("/analysis/logs/")
+        spilled = tmp_path / result["stdout_path"].lstrip("/")
+        assert spilled.read_text() == big
+        assert result["stderr"] == ""
+
+
+class TestArtifactStore:
+    """Tests for persisting plots and artifacts as workspace references."""
+
+    PNG_1x2 = (
+        b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR"
+        b"\x00\x00\x00\x01\x00\x00\x00\x02\x08\x02\x00\x00\x00"
+    )
+
+    def test_plots_are_written_content_addressed(self, runtime, tmp_path):
+        """Plots should be stored on disk and returned as lightweight references."""
+        import base64
+
+        sandbox_id = sandbox_module._create_sandbox(runtime)["sandbox_id"]
+        plot = SimpleNamespace(
+            format=SimpleNamespace(value="png"),
+            content_base64=base64.b64encode(self.PNG_1x2).decode(),
+            width=None,
+            height=None,
+        )
+        FakeSession.instances[-1].run = lambda code, **kw: SimpleNamespace(
+            stdout="", stderr="", exit_code=0, plots=[plot, plot]
+        )
+
+        result = sandbox_module._execute_code(runtime, sandbox_id, "plt.show()")
+
+        first, second = result["plots"]
+        assert first == second
+        assert first["path"] == f"/analysis/artifacts/{first['sha256']}.png"
+        assert first["mime_type"] == "image/png"
+        assert (first["width"], first["height"]) == (1, 2)
+        assert (tmp_path / first["path"].lstrip("/")).read_bytes() == self.PNG_1x2
+        assert "content_base64" not in first
+
+    def test_undecodable_plot_is_stored_unchanged(self, runtime, tmp_path):
+        """A plot PIL cannot decode must not lose the execution result."""
+        import base64
+
+        pytest.importorskip("PIL")
+        runtime.context["settings"].sandbox_plot_max_dim = 1
+        sandbox_id = sandbox_module._create_sandbox(runtime)["sandbox_id"]
+        plot = SimpleNamespace(
+            format=SimpleNamespace(value="png"),
+            content_base64=base64.b64encode(self.PNG_1x2).decode(),  # Truncated: no pixel data.
+            width=None,
+            height=None,
+        )
+        FakeSession.instances[-1].run = lambda code, **kw: SimpleNamespace(
+            stdout="done", stderr="", exit_code=0, plots=[plot]
+        )
+
+        result = sandbox_module._execute_code(runtime, sandbox_id, "plt.show()")
+
+        assert result["stdout"] == "done"
+        (stored,) = result["plots"]
+        assert (stored["width"], stored["height"]) == (1, 2)
+        assert (tmp_path / stored["path"].lstrip("/")).read_bytes() == self.PNG_1x2
+
+
+class TestSandboxRegistry:
+    """Tests for the thread-safe sandbox registry."""
+
+    def test_evicts_least_recently_used_over_capacity(self, runtime):
+        """Creating more sandboxes than allowed should close the LRU one."""
+        runtime.context["settings"].sandbox_max_live = 2
+        first = sandbox_module._create_sandbox(runtime)["sandbox_id"]
+        second = sandbox_module._create_sandbox(runtime)["sandbox_id"]
+        sandbox_module._execute_code(runtime, first, "x = 1")
+
+        third = sandbox_module._create_sandbox(runtime)["sandbox_id"]
+
+        assert first in sandbox_module._SANDBOXES
+        assert second not in sandbox_module._SANDBOXES
+        assert third in sandbox_module._SANDBOXES
+        assert FakeSession.instances[1].is_open is False
+
+    def test_reap_idle_closes_expired_sandboxes(self, runtime):
+        """Sandboxes idle past the timeout should be closed by the reaper."""
+        runtime.context["settings"].sandbox_idle_timeout_s = 0.0
+        sandbox_id = sandbox_module._create_sandbox(runtime)["sandbox_id"]
+
+        reaped = sandbox_module._SANDBOXES.reap_idle()
+
+        assert reaped == [sandbox_id]
+        assert FakeSession.instances[-1].is_open is False
+
+    def test_busy_sandbox_is_not_reaped(self, runtime):
+        """A sandbox that is running code must survive reaping."""
+        runtime.context["settings"].sandbox_idle_timeout_s = 0.0
+        sandbox_id = sandbox_module._create_sandbox(runtime)["sandbox_id"]
+        handle = sandbox_module._SANDBOXES.get(sandbox_id)
+
+        with handle.lock:
+            assert sandbox_module._SANDBOXES.reap_idle() == []
+
+    @pytest.mark.parametrize("trigger", ["reap", "evict"])
+    def test_close_holds_the_sandbox_lock(self, runtime, trigger):
+        """Reaping and eviction close a session only while holding its handle's lock."""
+        settings = runtime.context["settings"]
+        settings.sandbox_idle_timeout_s = 0.0
+        settings.sandbox_max_live = 1
+        sandbox_id = sandbox_module._create_sandbox(runtime)["sandbox_id"]
+        handle = sandbox_module._SANDBOXES.get(sandbox_id)
+        locked_while_closing = []
+        close = handle.session.close
+        handle.session.close = lambda: locked_while_closing.append(handle.lock.locked()) or close()
+
+        if trigger == "reap":
+            sandbox_module._SANDBOXES.reap_idle()
+        else:
+            sandbox_module._create_sandbox(runtime)
+
+        assert locked_while_closing == [True]
+        assert not handle.lock.locked()
+        # A caller that looked the handle up earlier finds it closed.
+        result = sandbox_module._run_code(settings, sandbox_id, handle, "x = 1")
+        assert "closed" in result["error"]
+
+    def test_delete_waits_for_running_code(self, runtime):
+        """delete_sandbox must not close a session while another caller's run is in flight."""
+        sandbox_id = sandbox_module._create_sandbox(runtime)["sandbox_id"]
+        session = FakeSession.instances[-1]
+        started, release = threading.Event(), threading.Event()
+        open_during_run = []
+
+        def slow_run(code, **kwargs):
+            started.set()
+            release.wait(5)
+            open_during_run.append(session.is_open)
+            return SimpleNamespace(stdout="done", stderr="", exit_code=0)
+
+        session.run = slow_run
+        runner = threading.Thread(target=sandbox_module._execute_code, args=(runtime, sandbox_id, "work()"))
+        runner.start()
+        assert started.wait(5)
+
+        deleter = threading.Thread(target=sandbox_module._delete_sandbox, args=(runtime, sandbox_id))
+        deleter.start()
+        deleter.join(0.2)
+        assert deleter.is_alive()
+        assert session.is_open
+
+        release.set()
+        runner.join(5)
+        deleter.join(5)
+        assert open_during_run == [True]
+        assert session.is_open is False
+
+    def test_run_after_delete_reports_closed_sandbox(self, runtime):
+        """A run that obtained the handle before deletion does not touch the closed session."""
+        sandbox_id = sandbox_module._create_sandbox(runtime)["sandbox_id"]
+        handle = sandbox_module._SANDBOXES.get(sandbox_id)
+        sandbox_module._delete_sandbox(runtime, sandbox_id)
+
+        result = sandbox_module._run_code(runtime.context["settings"], sandbox_id, handle, "x = 1")
+
+        assert "closed" in result["error"]
+        assert FakeSession.instances[-1].runs == []
+
+
+class TestExecuteCodeBatch:
+    """Tests for parallel batch execution."""
+
+    def test_results_follow_job_order(self, runtime):
+        """Results should be returned per job in input order."""
+        sandbox_id = sandbox_module._create_sandbox(runtime)["sandbox_id"]
+        jobs = [
+            {"sandbox_id": sandbox_id, "code": "a"},
+            {"code": "b"},
+            {"sandbox_id": "missing", "code": "c"},
+        ]
+
+        results = sandbox_module._execute_code_batch(runtime, jobs)["results"]
+
+        assert [r["job"] for r in results] == [0, 1, 2]
+        assert results[0]["sandbox_id"] == sandbox_id
+        assert results[1]["exit_code"] == 0
+        assert "No sandbox found" in results[2]["error"]
+
+    def test_spec_jobs_share_pooled_sandboxes(self, runtime):
+        """Spec jobs should reuse temporary sandboxes and close them afterwards."""
+        jobs = [{"code": f"run({i})"} for i in range(6)]
+
+        results = sandbox_module._execute_code_batch(runtime, jobs, max_concurrency=2)["results"]
+
+        assert all(r["exit_code"] == 0 for r in results)
+        assert 1 <= len(FakeSession.instances) <= 2
+        assert sum(len(s.runs) for s in FakeSession.instances) == 6
+        assert not any(s.is_open for s in FakeSession.instances)
+        assert len(sandbox_module._SANDBOXES) == 0
+
+
+class TestLocalBackend:
+    """Tests for create_sandbox(backend="local")."""
+
+    def test_local_backend_runs_in_workspace(self, runtime, tmp_path):
+        """The local backend should keep the execute_code contract."""
+        created = sandbox_module._create_sandbox(runtime, backend="local")
+        (tmp_path / "hello.txt").write_text("hello")
+
+        result = sandbox_module._execute_code(runtime, created["sandbox_id"], "print(open('hello.txt').read())")
+
+        assert created["workspace_container"] == str(tmp_path.resolve())
+        assert result["stdout"] == "hello\n"
+        assert result["exit_code"] == 0
+
+
+class TestExecutionTimeouts:
+    """Tests for per-run and per-sandbox timeouts."""
+
+    def test_timeout_precedence(self, runtime):
+        """Per-call timeout beats the sandbox default, which beats settings."""
+        seen = []
+        sandbox_id = sandbox_module._create_sandbox(runtime, timeout=30)["sandbox_id"]
+        FakeSession.instances[-1].run = lambda code, timeout=None: seen.append(timeout) or SimpleNamespace(
+            stdout="", stderr="", exit_code=0
+        )
+
+        sandbox_module._execute_code(runtime, sandbox_id, "a")
+        sandbox_module._execute_code(runtime, sandbox_id, "b", timeout=5)
+
+        assert seen == [30, 5]
+
+    def test_container_timeout_restarts_sandbox(self, runtime):
+        """A timed-out stateless run should be reported and the sandbox restarted."""
+        from llm_sandbox.exceptions import SandboxTimeoutError
+
+        sandbox_id = sandbox_module._create_sandbox(runtime)["sandbox_id"]
+        session = FakeSession.instances[-1]
+
+        def hang(code, timeout=None):
+            raise SandboxTimeoutError("timed out", timeout_duration=timeout)
+
+        session.run = hang
+
+        result = sandbox_module._execute_code(runtime, sandbox_id, "while True: pass", timeout=1)
+
+        assert result["timed_out"] is True
+        assert result["exit_code"] is None
+        assert "timed out" in result["stderr"]
+        assert session.open_count == 2
+        assert sandbox_id in sandbox_module._SANDBOXES
+
+    def test_local_timeout_returns_partial_output(self, runtime):
+        """The local backend should report partial output of a killed run."""
+        sandbox_id = sandbox_module._create_sandbox(runtime, backend="local")["sandbox_id"]
+
+        result = sandbox_module._execute_code(
+            runtime, sandbox_id, "print('step 1', flush=True)\nwhile True: pass", timeout=1
+        )
+
+        assert result["timed_out"] is True
+        assert result["stdout"] == "step 1\n"
+
+
+class TestExecutionMetrics:
+    """Tests for sandbox timing and resource telemetry."""
+
+    def test_metrics_are_returned_and_exported(self, runtime):
+        """create_sandbox and execute_code should report timings and call the hook."""
+        events = []
+        runtime.context["settings"].sandbox_metrics_hook = lambda event, payload: events.append((event, payload))
+
+        created = sandbox_module._create_sandbox(runtime)
+        result = sandbox_module._execute_code(runtime, created["sandbox_id"], "print(1)")
+
+        assert created["metrics"]["startup_s"] >= 0
+        assert result["metrics"]["wall_s"] >= 0
+        assert result["metrics"]["install_s"] is None
+        assert [event for event, _ in events] == ["sandbox.create", "sandbox.execute"]
+        assert events[1][1]["sandbox_id"] == created["sandbox_id"]
+
+    def test_install_is_timed_separately(self, runtime):
+        """Sessions with install() should have libraries installed outside the timed run."""
+        sandbox_id = sandbox_module._create_sandbox(runtime)["sandbox_id"]
+        session = FakeSession.instances[-1]
+        installed = []
+        session.install = installed.append
+
+        result = sandbox_module._execute_code(runtime, sandbox_id, "import numpy", libraries=["numpy"])
+
+        assert installed == [["numpy"]]
+        assert result["metrics"]["install_s"] >= 0
+
+    def test_failing_hook_does_not_fail_the_run(self, runtime):
+        """Errors raised by the metrics hook should be swallowed."""
+        def broken(event, payload):
+            raise RuntimeError("boom")
+
+        runtime.context["settings"].sandbox_metrics_hook = broken
+        sandbox_id = sandbox_module._create_sandbox(runtime)["sandbox_id"]
+
+        assert sandbox_module._execute_code(runtime, sandbox_id, "x")["exit_code"] == 0
+
+    def test_local_backend_reports_cpu_and_peak_rss(self, runtime):
+        """The local backend should measure CPU time and peak RSS of the worker."""
+        sandbox_id = sandbox_module._create_sandbox(runtime, backend="local")["sandbox_id"]
+
+        metrics = sandbox_module._execute_code(runtime, sandbox_id, "sum(range(10**6))")["metrics"]
+
+        assert metrics["cpu_s"] is not None
+        assert metrics["peak_rss_bytes"] > 0
+
+
+class TestExecutionCache:
+    """Tests for the opt-in execute_code result cache."""
+
+    def test_identical_run_is_served_from_cache(self, runtime):
+        """A repeated cell should not reach the session."""
+        sandbox_id = sandbox_module._create_sandbox(runtime)["sandbox_id"]
+        session = FakeSession.instances[-1]
+
+        first = sandbox_module._execute_code(runtime, sandbox_id, "print(1)", cache=True)
+        second = sandbox_module._execute_code(runtime, sandbox_id, "print(1)", cache=True)
+
+        assert len(session.runs) == 1
+        assert "cached" not in first
+        assert second["cached"] is True
+        assert second["stdout"] == first["stdout"]
+
+    def test_changed_input_file_invalidates_entry(self, runtime, tmp_path):
+        """Editing a file named in the code should force a rerun."""
+        data = tmp_path / "data.csv"
+        data.write_text("a\n1\n")
+        sandbox_id = sandbox_module._create_sandbox(runtime)["sandbox_id"]
+        session = FakeSession.instances[-1]
+        code = "print(open('/workspace/data.csv').read())"
+
+        sandbox_module._execute_code(runtime, sandbox_id, code, cache=True)
+        data.write_text("a\n2\n")
+        result = sandbox_module._execute_code(runtime, sandbox_id, code, cache=True)
+
+        assert len(session.runs) == 2
+        assert "cached" not in result
+
+    def test_failed_and_stateful_runs_are_not_cached(self, runtime):
+        """Only successful stateless runs should be memoized."""
+        sandbox_id = sandbox_module._create_sandbox(runtime)["sandbox_id"]
+        session = FakeSession.instances[-1]
+        session.run = lambda code, timeout=None: session.runs.append(code) or SimpleNamespace(
+            stdout="", stderr="boom", exit_code=1
+        )
+        sandbox_module._execute_code(runtime, sandbox_id, "fail()", cache=True)
+        sandbox_module._execute_code(runtime, sandbox_id, "fail()", cache=True)
+
+        stateful_id = sandbox_module._create_sandbox(runtime, stateful=True)["sandbox_id"]
+        kernel = FakeSession.instances[-1]
+        sandbox_module._execute_code(runtime, stateful_id, "x", cache=True)
+        sandbox_module._execute_code(runtime, stateful_id, "x", cache=True)
+
+        assert len(session.runs) == 2
+        assert len(kernel.runs) == 2
+
+
+class TestAsyncTools:
+    """Tests for the async sandbox tool variants."""
+
+    def test_async_execute_streams_progress(self, runtime):
+        """The async variant should return the sync result and emit progress events."""
+        events = []
+        runtime.stream_writer = events.append
+
+        async def scenario():
+            created = await sandbox_module._acreate_sandbox(runtime)
+            result = await sandbox_module._aexecute_code(runtime, created["sandbox_id"], "print(1)")
+            deleted = await sandbox_module._adelete_sandbox(runtime, created["sandbox_id"])
+            return result, deleted
+
+        result, deleted = asyncio.run(scenario())
+
+        assert result["stdout"] == "ran 1"
+        assert deleted["deleted"] is True
+        assert [(event["tool"], event["status"]) for event in events] == [
+            ("create_sandbox", "started"),
+            ("create_sandbox", "finished"),
+            ("execute_code", "started"),
+            ("execute_code", "finished"),
+            ("delete_sandbox", "started"),
+            ("delete_sandbox", "finished"),
+        ]
+        assert sandbox_module.execute_code.coroutine is sandbox_module._aexecute_code
+
+    def test_cancel_interrupts_running_code(self, runtime):
+        """Cancelling an async run should stop the code and leave the sandbox usable."""
+        sandbox_id = sandbox_module._create_sandbox(runtime, backend="local")["sandbox_id"]
+
+        async def scenario():
+            task = asyncio.create_task(
+                sandbox_module._aexecute_code(runtime, sandbox_id, "while True: pass", timeout=30)
+            )
+            await asyncio.sleep(0.5)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        started = time.monotonic()
+        asyncio.run(scenario())
+        result = sandbox_module._execute_code(runtime, sandbox_id, "print('ok')")
+
+        assert result["stdout"] == "ok\n"
+        assert time.monotonic() - started < 10
+
+    def test_cancel_only_interrupts_its_own_run(self, runtime):
+        """Cancelling a call waiting for a busy sandbox must not interrupt the other caller's run."""
+        sandbox_id = sandbox_module._create_sandbox(runtime, stateful=True)["sandbox_id"]
+        kernel = FakeSession.instances[-1]
+        started, release = threading.Event(), threading.Event()
+        original_run = kernel.run
+
+        def run(code, **kwargs):
+            if code == "slow()":
+                started.set()
+                release.wait(5)
+            return original_run(code, **kwargs)
+
+        kernel.run = run
+        first = threading.Thread(target=sandbox_module._execute_code, args=(runtime, sandbox_id, "slow()"))
+        first.start()
+        assert started.wait(5)
+
+        async def scenario():
+            task = asyncio.create_task(sandbox_module._aexecute_code(runtime, sandbox_id, "second()"))
+            await asyncio.sleep(0.2)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(scenario())
+        release.set()
+        first.join(5)
+
+        assert kernel.interrupted is False
+        time.sleep(0.2)  # Let the cancelled call reach the sandbox lock.
+        assert kernel.runs == ["slow()"]
+
+    def test_cancel_kills_stateless_container_run(self, runtime):
+        """Stateless container runs are stopped through the Docker exec API."""
+        sandbox_id = sandbox_module._create_sandbox(runtime)["sandbox_id"]
+        session = FakeSession.instances[-1]
+        killed = threading.Event()
+        execs = []
+        api = SimpleNamespace(
+            exec_create=lambda container_id, cmd, **kw: execs.append((container_id, cmd, kw)) or {"Id": "exec-1"},
+            exec_start=lambda exec_id: killed.set(),
+        )
+        session.container = SimpleNamespace(id="container-1", client=SimpleNamespace(api=api))
+        session.run = lambda code, **kw: killed.wait(5) and SimpleNamespace(stdout="", stderr="", exit_code=137)
+
+        async def scenario():
+            task = asyncio.create_task(sandbox_module._aexecute_code(runtime, sandbox_id, "while True: pass"))
+            await asyncio.sleep(0.2)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(scenario())
+
+        assert killed.wait(5)
+        assert execs == [("container-1", ["sh", "-c", "kill -9 -1"], {"user": "root"})]
+
+    def test_cancelled_queued_delete_still_closes(self, runtime):
+        """A delete cancelled while waiting for an executor thread still closes the sandbox."""
+        sandbox_id = sandbox_module._create_sandbox(runtime)["sandbox_id"]
+        session = FakeSession.instances[-1]
+        executor = ThreadPoolExecutor(max_workers=1)
+        release = threading.Event()
+        executor.submit(release.wait, 5)
+
+        async def scenario():
+            task = asyncio.create_task(sandbox_module._adelete_sandbox(runtime, sandbox_id))
+            await asyncio.sleep(0.2)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        with patch.object(sandbox_module, "_ASYNC_EXECUTOR", executor):
+            asyncio.run(scenario())
+            release.set()
+            executor.shutdown(wait=True)
+
+        assert session.is_open is False
+        assert sandbox_id not in sandbox_module._SANDBOXES
+
+
+class TestStreamingOutput:
+    """Tests for execute_code(stream=True, stop_pattern=...)."""
+
+    def test_local_backend_streams_chunks(self, runtime):
+        """Output chunks should reach the stream writer while the code runs."""
+        events = []
+        runtime.stream_writer = events.append
+        sandbox_id = sandbox_module._create_sandbox(runtime, backend="local")["sandbox_id"]
+
+        result = sandbox_module._execute_code(
+            runtime,
+            sandbox_id,
+            "import time\nfor i in range(3):\n    print(i, flush=True)\n    time.sleep(0.1)",
+            stream=True,
+        )
+
+        chunks = [event for event in events if event.get("type") == "sandbox_output"]
+        assert len(chunks) >= 2
+        assert "".join(event["text"] for event in chunks if event["stream"] == "stdout") == result["stdout"]
+
+    def test_stop_pattern_terminates_local_run(self, runtime):
+        """A matching stop pattern should kill the run early."""
+        sandbox_id = sandbox_module._create_sandbox(runtime, backend="local")["sandbox_id"]
+        code = "import time\nprint('ERROR: bad input', flush=True)\ntime.sleep(30)"
+
+        started = time.monotonic()
+        result = sandbox_module._execute_code(runtime, sandbox_id, code, stop_pattern=r"ERROR: .*")
+
+        assert time.monotonic() - started < 10
+        assert result["stopped"] is True
+        assert result["stop_match"] == "ERROR: bad input"
+        assert result["stdout"].startswith("ERROR: bad input")
+
+    def test_container_backend_degrades_to_single_chunk(self, runtime):
+        """Sessions without live output should stream once and report matches."""
+        events = []
+        runtime.stream_writer = events.append
+        sandbox_id = sandbox_module._create_sandbox(runtime)["sandbox_id"]
+
+        result = sandbox_module._execute_code(runtime, sandbox_id, "x", stream=True, stop_pattern="ran")
+
+        assert [event["text"] for event in events if event.get("type") == "sandbox_output"] == ["ran 1"]
+        assert result["stop_match"] == "ran"
+        assert "stopped" not in result
+
+    @staticmethod
+    def _docker_session(session, chunks):
+        """Give a fake session a Docker container whose exec streams ``chunks`` until killed."""
+        killed = threading.Event()
+        calls = {"copied": [], "commands": []}
+
+        def exec_create(container_id, cmd, **kwargs):
+            if cmd == ["sh", "-c", "kill -9 -1"]:
+                return {"Id": "kill"}
+            calls["commands"].append((cmd, kwargs))
+            return {"Id": "run"}
+
+        def exec_start(exec_id, stream=False, demux=False):
+            if exec_id == "kill":
+                killed.set()
+                return b""
+
+            def output():
+                for chunk in chunks:
+                    if killed.is_set():
+                        return
+                    yield chunk
+                killed.wait(5)  # The code keeps running until it is killed.
+
+            return output()
+
+        api = SimpleNamespace(
+            exec_create=exec_create,
+            exec_start=exec_start,
+            exec_inspect=lambda exec_id: {"ExitCode": 137 if killed.is_set() else 0},
+        )
+        session.container = SimpleNamespace(id="container-1", client=SimpleNamespace(api=api))
+        session.config = SimpleNamespace(workdir="/sandbox", skip_environment_setup=True)
+        session.using_existing_container = False
+        session.language_handler = SimpleNamespace(
+            name="python",
+            file_extension="py",
+            get_execution_commands=lambda code_file, runtime_context=None: [f"python {code_file}"],
+        )
+        session.copy_to_runtime = lambda src, dest: calls["copied"].append(open(src).read())
+        return killed, calls
+
+    def test_stop_pattern_kills_docker_run(self, runtime):
+        """Stateless Docker runs stream chunks live and stop as soon as the pattern appears."""
+        events = []
+        runtime.stream_writer = events.append
+        sandbox_id = sandbox_module._create_sandbox(runtime)["sandbox_id"]
+        session = FakeSession.instances[-1]
+        killed, calls = self._docker_session(
+            session, [(b"step 1\n", None), (None, b"ERROR: bad input\n"), (b"never\n", None)]
+        )
+
+        started = time.monotonic()
+        result = sandbox_module._execute_code(
+            runtime, sandbox_id, "work()", stream=True, stop_pattern=r"ERROR: .*", timeout=30
+        )
+
+        assert time.monotonic() - started < 5
+        assert killed.is_set()
+        assert result["stopped"] is True
+        assert result["stop_match"] == "ERROR: bad input"
+        assert result["stdout"] == "step 1\n"
+        assert [event["text"] for event in events if event.get("type") == "sandbox_output"] == [
+            "step 1\n",
+            "ERROR: bad input\n",
+        ]
+        assert calls["copied"] == ["work()"]
+        (command, options), = calls["commands"]
+        assert command.startswith("python /sandbox/") and command.endswith(".py")
+        assert options["environment"] == {"PYTHONUNBUFFERED": "1"}
+        assert session.runs == []
+
+    def test_docker_stream_enforces_timeout(self, runtime):
+        """A streamed run past its timeout is killed and keeps its partial output."""
+        sandbox_id = sandbox_module._create_sandbox(runtime)["sandbox_id"]
+        session = FakeSession.instances[-1]
+        killed, _ = self._docker_session(session, [(b"started\n", None)])
+
+        result = sandbox_module._execute_code(runtime, sandbox_id, "loop()", stream=True, timeout=0.3)
+
+        assert killed.is_set()
+        assert result["timed_out"] is True
+        assert result["stdout"] == "started\n"
+        assert "timed out" in result["stderr"]
+
+    def test_docker_timeout_keeps_output_without_streaming(self, runtime):
+        """Stateless Docker runs go through the exec API even when nobody streams them."""
+        sandbox_id = sandbox_module._create_sandbox(runtime)["sandbox_id"]
+        session = FakeSession.instances[-1]
+        killed, _ = self._docker_session(session, [(b"step 1\n", None)])
+
+        result = sandbox_module._execute_code(runtime, sandbox_id, "loop()", timeout=0.3)
+
+        assert killed.is_set()
+        assert result["timed_out"] is True
+        assert result["stdout"] == "step 1\n"
+        assert session.runs == []
+
+    def test_invalid_stop_pattern_is_rejected(self, runtime):
+        """A malformed regex should be reported instead of running the code."""
+        sandbox_id = sandbox_module._create_sandbox(runtime)["sandbox_id"]
+
+        result = sandbox_module._execute_code(runtime, sandbox_id, "x", stop_pattern="(")
+
+        assert "Invalid stop_pattern" in result["error"]
+        assert FakeSession.instances[-1].runs == []
@@ -0,0 +1,259 @@
+"""Unit tests for the in-memory scratchpad backend."""
+
+import threading
+
+import pytest
+from unittest.mock import patch
+
+
+# Check if the scratchpad backend can be imported
+try:
+    import deepscientist.backends.locking as locking
+    from deepscientist.backends import ScratchpadBackend, scratchpad_backend
+    SCRATCHPAD_AVAILABLE = True
+except ImportError as e:
+    SCRATCHPAD_AVAILABLE = False
+    SCRATCHPAD_IMPORT_ERROR = str(e)
+
+
+pytestmark = pytest.mark.skipif(
+    not SCRATCHPAD_AVAILABLE,
+    reason=f"Scratchpad backend import failed: {SCRATCHPAD_IMPORT_ERROR if not SCRATCHPAD_AVAILABLE else ''}"
+)
+
+
+@pytest.fixture
+def make_backend(tmp_path):
+    backends = []
+
+    def factory(**kwargs):
+        kwargs.setdefault("flush_interval_s", 3600.0)
+        backend = ScratchpadBackend(**kwargs)
+        backends.append(backend)
+        return backend
+
+    yield factory
+    for backend in backends:
+        backend.close()
+
+
+class TestScratchpadBackend:
+    """Reads, writes and edits served from memory."""
+
+    def test_write_read_edit_round_trip(self, make_backend):
+        backend = make_backend()
+
+        assert backend.write("/notes.md", "alpha\nbeta").error is None
+        assert "beta" in backend.read("/notes.md")
+
+        result = backend.edit("/notes.md", "beta", "gamma")
+        assert result.error is None
+        assert result.occurrences == 1
+        assert result.files_update is None
+        assert "gamma" in backend.read("/notes.md")
+        assert "beta" not in backend.read("/notes.md")
+
+    def test_write_existing_file_errors(self, make_backend):
+        backend = make_backend()
+        backend.write("/notes.md", "one")
+
+        result = backend.write("/notes.md", "two")
+
+        assert result.error is not None
+        assert "already exists" in result.error
+        assert "one" in backend.read("/notes.md")
+
+    def test_rejects_paths_escaping_root(self, make_backend):
+        backend = make_backend()
+
+        assert backend.write("/../outside.md", "x").error is not None
+        assert "not found" in backend.read("/../outside.md")
+
+    def test_ls_glob_and_grep(self, make_backend):
+        backend = make_backend()
+        backend.write("/a.md", "needle here")
+        backend.write("/sub/b.py", "no match")
+        backend.write("/sub/deeper/c.py", "needle again")
+
+        listing = backend.ls_info("/")
+        assert [(info["path"], info["is_dir"]) for info in listing] == [("/a.md", False), ("/sub/", True)]
+
+        assert [info["path"] for info in backend.glob_info("*.py")] == ["/sub/b.py", "/sub/deeper/c.py"]
+
+        matches = backend.grep_raw("needle")
+        assert sorted(match["path"] for match in matches) == ["/a.md", "/sub/deeper/c.py"]
+
+
+class TestScratchpadPersistence:
+    """LRU eviction and write-behind flushing."""
+
+    def test_flush_persists_and_new_instance_recovers(self, tmp_path, make_backend):
+        backend = make_backend(persist_dir=tmp_path)
+        backend.write("/plan/draft.md", "step 1")
+        assert not (tmp_path / "plan" / "draft.md").exists()
+
+        backend.flush()
+
+        assert (tmp_path / "plan" / "draft.md").read_text(encoding="utf-8") == "step 1"
+        recovered = make_backend(persist_dir=tmp_path)
+        assert "step 1" in recovered.read("/plan/draft.md")
+
+    def test_background_flush(self, tmp_path, make_backend):
+        backend = make_backend(persist_dir=tmp_path, flush_interval_s=0.05)
+        backend.write("/log.md", "entry")
+
+        backend.close()
+
+        assert (tmp_path / "log.md").read_text(encoding="utf-8") == "entry"
+
+    def test_eviction_persists_and_reloads(self, tmp_path, make_backend):
+        backend = make_backend(persist_dir=tmp_path, max_bytes=10)
+        backend.write("/old.md", "0123456789")
+        backend.write("/new.md", "abcdefghij")
+
+        # The least recently used file was written out before leaving memory.
+        assert "/old.md" not in backend._files
+        assert (tmp_path / "old.md").read_text(encoding="utf-8") == "0123456789"
+
+        assert "0123456789" in backend.read("/old.md")
+        assert "/old.md" in backend._files
+        assert "/new.md" not in backend._files
+
+    def test_eviction_without_persist_dir_drops_files(self, make_backend):
+        backend = make_backend(max_bytes=10)
+        backend.write("/old.md", "0123456789")
+        backend.write("/new.md", "abcdefghij")
+
+        assert "not found" in backend.read("/old.md")
+        assert "abcdefghij" in backend.read("/new.md")
+
+    def test_stale_flush_does_not_overwrite_newer_content(self, tmp_path, make_backend):
+        backend = make_backend(persist_dir=tmp_path)
+        backend.write("/notes.md", "v1")
+        backend.edit("/notes.md", "v1", "v2")
+        backend.flush()
+
+        # A snapshot of an older version arriving late is ignored.
+        backend._persist("/notes.md", 1, "v1")
+
+        assert (tmp_path / "notes.md").read_text(encoding="utf-8") == "v2"
+
+    def test_change_during_flush_stays_pending(self, tmp_path, make_backend):
+        backend = make_backend(persist_dir=tmp_path)
+        backend.write("/notes.md", "v1")
+        persist = backend._persist
+
+        def edit_then_persist(path, version, content):
+            backend.edit("/notes.md", "v1", "v2")
+            persist(path, version, content)
+
+        with patch.object(backend, "_persist", side_effect=edit_then_persist):
+            backend.flush()
+
+        assert (tmp_path / "notes.md").read_text(encoding="utf-8") == "v1"
+        assert "/notes.md" in backend._dirty
+        backend.flush()
+        assert (tmp_path / "notes.md").read_text(encoding="utf-8") == "v2"
+        assert not backend._dirty
+
+    def test_eviction_during_flush_keeps_content(self, tmp_path, make_backend):
+        backend = make_backend(persist_dir=tmp_path, max_bytes=10)
+        backend.write("/notes.md", "0123456789")
+        persist = backend._persist
+        seen = []
+
+        def evict_then_persist(path, version, content):
+            if path == "/notes.md" and not seen:
+                # Another write pushes the file out of memory mid-flush.
+                backend.write("/other.md", "abcdefghij")
+                seen.append(backend.read("/notes.md"))
+            persist(path, version, content)
+
+        with patch.object(backend, "_persist", side_effect=evict_then_persist):
+            backend.flush()
+
+        assert "0123456789" in seen[0]
+        assert (tmp_path / "notes.md").read_text(encoding="utf-8") == "0123456789"
+
+    def test_failed_flush_stays_pending(self, tmp_path, make_backend):
+        backend = make_backend(persist_dir=tmp_path)
+        backend.write("/notes.md", "v1")
+
+        with patch.object(backend, "_persist", side_effect=OSError("disk full")):
+            backend.flush()
+
+        assert "/notes.md" in backend._dirty
+        backend.flush()
+        assert (tmp_path / "notes.md").read_text(encoding="utf-8") == "v1"
+
+    def test_persist_fsyncs_before_replacing(self, tmp_path, make_backend):
+        backend = make_backend(persist_dir=tmp_path)
+        backend.write("/notes.md", "v1")
+
+        with patch.object(locking.os, "fsync", wraps=locking.os.fsync) as fsync:
+            backend.flush()
+
+        # The temp file before the rename and the directory after it.
+        assert fsync.call_count == 2
+        assert (tmp_path / "notes.md").read_text(encoding="utf-8") == "v1"
+
+    def test_eviction_writes_outside_the_lock(self, tmp_path, make_backend):
+        backend = make_backend(persist_dir=tmp_path, max_bytes=10)
+        backend.write("/old.md", "0123456789")
+        persist = backend._persist
+        seen = []
+        checked = threading.Event()
+
+        def persist_checking_lock(path, version, content):
+            if not checked.is_set():
+                checked.set()
+                # Another thread can use the backend while the eviction is written.
+                reader = threading.Thread(target=lambda: seen.append(backend.read("/old.md")))
+                reader.start()
+                reader.join(5)
+                assert not reader.is_alive()
+            persist(path, version, content)
+
+        with patch.object(backend, "_persist", side_effect=persist_checking_lock):
+            backend.write("/new.md", "abcdefghij")
+
+        assert "0123456789" in seen[0]
+        assert (tmp_path / "old.md").read_text(encoding="utf-8") == "0123456789"
+        assert not backend._dirty
+
+    def test_failed_eviction_write_keeps_content(self, tmp_path, make_backend):
+        backend = make_backend(persist_dir=tmp_path, max_bytes=10)
+        backend.write("/old.md", "0123456789")
+
+        with patch.object(backend, "_persist", side_effect=OSError("disk full")):
+            backend.write("/new.md", "abcdefghij")
+
+        assert "/old.md" in backend._dirty
+        assert "0123456789" in backend.read("/old.md")
+        backend.flush()
+        assert (tmp_path / "old.md").read_text(encoding="utf-8") == "0123456789"
+
+
+class TestSharedScratchpad:
+    """One backend per persist directory."""
+
+    def test_same_directory_shares_backend(self, tmp_path):
+        first = scratchpad_backend(tmp_path / "pad", flush_interval_s=3600.0)
+        try:
+            assert scratchpad_backend(tmp_path / "pad" / ".." / "pad") is first
+            assert scratchpad_backend(tmp_path / "other", flush_interval_s=3600.0) is not first
+        finally:
+            first.close()
+            scratchpad_backend(tmp_path / "other").close()
+
+    def test_closed_backend_is_replaced(self, tmp_path):
+        first = scratchpad_backend(tmp_path, flush_interval_s=3600.0)
+        first.write("/notes.md", "kept")
+        first.close()
+
+        second = scratchpad_backend(tmp_path, flush_interval_s=3600.0)
+        try:
+            assert second is not first
+            assert "kept" in second.read("/notes.md")
+        finally:
+            second.close()